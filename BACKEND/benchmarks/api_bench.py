@@ -0,0 +1,329 @@
+# En backend/benchmarks/api_bench.py
+#
+# Benchmark de los flujos principales de la API, sin red ni servicios externos: la app corre
+# en el mismo proceso (httpx + ASGITransport) contra SQLite (aiosqlite), un MongoDB en memoria
+# (benchmarks/standins.py), el LLM stub, un Mercado Pago stub y el servidor SMTP local de
+# benchmarks/stub_servers.py. Reporta, por escenario y por endpoint, requests por segundo y
+# latencias p50/p95/p99 en un JSON estable para poder comparar corridas.
+#
+# Uso (desde la carpeta BACKEND):
+#   python -m benchmarks.api_bench --requests 300 --concurrency 16 --output bench.json
+#   python -m benchmarks.api_bench --baseline bench.json --tolerancia 0.25   # sale con 1 si hay regresiones
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import platform
+import tempfile
+import contextlib
+from collections import defaultdict
+from datetime import date
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# La app lee su configuración al importarse: valores de relleno para lo que no se usa
+# (Mongo se reemplaza por el stand-in antes de correr).
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("DB_NOSQL_URI", "mongodb://127.0.0.1:1")
+os.environ.setdefault("DB_NOSQL_NAME", "benchmark")
+
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from main import app
+from database.database import get_db, get_db_read, get_db_nosql
+from database.models import Base, Categoria, Producto, Gasto, Orden
+from routers import checkout_router
+from services import conversation_writer, email_service, llm_client
+from utils.security import create_access_token, get_password_hash
+from benchmarks.stub_servers import StubSMTPServer
+from benchmarks.standins import InMemoryMongo, StubMercadoPagoSDK
+from benchmarks.catalog_retrieval_bench import COLORES, MATERIALES, PRENDAS, TALLES
+
+BENCHMARK_VERSION = 1
+PASSWORD = "benchmark-123"
+
+
+def percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(round(p / 100 * (len(valores) - 1))))]
+
+
+class Recorder:
+    """Latencias (en segundos) y errores de cada endpoint, agrupados por escenario."""
+
+    def __init__(self):
+        self.latencias = defaultdict(list)
+        self.errores = defaultdict(int)
+        self.activo = True
+
+    async def request(self, client: AsyncClient, method: str, url: str, endpoint: str, **kwargs):
+        start = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        if self.activo:
+            self.latencias[endpoint].append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                self.errores[endpoint] += 1
+        return response
+
+
+# --- Escenarios: cada uno es una "iteración" de un usuario (uno o más requests) ---
+
+async def catalogo(rec: Recorder, client: AsyncClient, ctx: dict, i: int):
+    rnd = ctx["rnd"]
+    params = {"limit": 20, "skip": rnd.randint(0, 4) * 20}
+    if i % 2:
+        params["color"] = rnd.choice(COLORES)
+    await rec.request(client, "GET", "/api/products/", "GET /api/products/", params=params)
+    await rec.request(client, "GET", f"/api/products/{rnd.randint(1, ctx['productos'])}", "GET /api/products/{product_id}")
+
+
+async def carrito(rec: Recorder, client: AsyncClient, ctx: dict, i: int):
+    product_id = ctx["rnd"].randint(1, ctx["productos"])
+    headers = {"X-Guest-Session-ID": f"invitado-{i % 50}"}
+    item = {"product_id": product_id, "quantity": 1, "price": 1000.0, "name": f"Producto {product_id}"}
+    await rec.request(client, "POST", "/api/cart/items", "POST /api/cart/items", json=item, headers=headers)
+    await rec.request(client, "DELETE", f"/api/cart/items/{product_id}", "DELETE /api/cart/items/{product_id}", headers=headers)
+
+
+async def login(rec: Recorder, client: AsyncClient, ctx: dict, i: int):
+    data = {"username": "cliente@bench.com", "password": PASSWORD}
+    await rec.request(client, "POST", "/api/auth/login", "POST /api/auth/login", data=data)
+
+
+async def checkout_webhook(rec: Recorder, client: AsyncClient, ctx: dict, i: int):
+    body = {"type": "payment", "data": {"id": str(100_000 + i)}}
+    await rec.request(client, "POST", "/api/checkout/webhook", "POST /api/checkout/webhook", json=body)
+
+
+async def chatbot(rec: Recorder, client: AsyncClient, ctx: dict, i: int):
+    rnd = ctx["rnd"]
+    pregunta = f"¿Tienen {rnd.choice(PRENDAS).lower()} {rnd.choice(COLORES)} en talle {rnd.choice(TALLES)}? ({i})"
+    body = {"sesion_id": f"bench-{i % 40}", "pregunta": pregunta}
+    await rec.request(client, "POST", "/api/chatbot/query", "POST /api/chatbot/query", json=body)
+
+
+async def admin_dashboard(rec: Recorder, client: AsyncClient, ctx: dict, i: int):
+    headers = ctx["admin_headers"]
+    for url in (
+        "/api/admin/metrics/kpis",
+        "/api/admin/metrics/products",
+        "/api/admin/charts/sales-over-time",
+        "/api/admin/charts/expenses-by-category",
+    ):
+        await rec.request(client, "GET", url, f"GET {url}", headers=headers)
+
+
+# nombre -> (función, fracción de --requests que corre). El login es caro a propósito (bcrypt).
+ESCENARIOS = {
+    "catalogo": (catalogo, 1.0),
+    "carrito": (carrito, 1.0),
+    "login": (login, 0.2),
+    "checkout_webhook": (checkout_webhook, 1.0),
+    "chatbot": (chatbot, 1.0),
+    "admin_dashboard": (admin_dashboard, 0.5),
+}
+
+
+# --- Datos y servicios de prueba ---
+
+async def preparar(args, tmpdir: str) -> dict:
+    rnd = random.Random(args.seed)
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tmpdir, 'bench.db')}", connect_args={"timeout": 30})
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with session_factory() as db:
+        categorias = [Categoria(nombre=prenda) for prenda in PRENDAS]
+        db.add_all(categorias)
+        await db.flush()
+        for i in range(args.productos):
+            prenda, color = rnd.choice(PRENDAS), rnd.choice(COLORES)
+            db.add(Producto(
+                nombre=f"{prenda} {color} {i}", precio=rnd.randint(10, 200) * 1000, stock=rnd.randint(0, 50),
+                descripcion=f"{prenda} de {rnd.choice(MATERIALES)} en color {color}.",
+                material=rnd.choice(MATERIALES), color=color, talle=rnd.choice(TALLES),
+                sku=f"SKU-{i}", url=f"producto-{i}", categoria_id=categorias[PRENDAS.index(prenda)].id,
+            ))
+        for i in range(200):
+            db.add(Orden(user_id=f"user-{i % 30}", total=rnd.randint(5, 100) * 1000))
+            db.add(Gasto(descripcion=f"Gasto {i}", monto=rnd.randint(1, 50) * 1000, categoria=rnd.choice(["Envíos", "Telas", "Publicidad"]),
+                         fecha=date(2025, 1 + i % 12, 1 + i % 28)))
+        await db.commit()
+
+    mongo = InMemoryMongo()
+    hashed = get_password_hash(PASSWORD)
+    for email, role in (("cliente@bench.com", "user"), ("admin@bench.com", "admin")):
+        await mongo.users.insert_one({"email": email, "name": "Bench", "last_name": role, "role": role, "hashed_password": hashed})
+
+    smtp = await StubSMTPServer(message_latency=args.smtp_ms / 1000).start()
+    originales = {
+        "smtp": (email_service.SMTP_SERVER, email_service.SMTP_PORT, email_service.SMTP_STARTTLS, email_service.EMAIL_SENDER, email_service.EMAIL_PASSWORD),
+    }
+    checkout_router.set_mp_sdk(StubMercadoPagoSDK(latency_ms=args.mp_ms))
+    email_service.SMTP_SERVER, email_service.SMTP_PORT, email_service.SMTP_STARTTLS = "127.0.0.1", smtp.port, False
+    email_service.EMAIL_SENDER, email_service.EMAIL_PASSWORD = "tienda@void.test", "secreto"
+    llm_client.set_llm_client(llm_client.LLMClient(llm_client.StubBackend(latency_ms=args.llm_ms)))
+
+    async def override_get_db():
+        async with session_factory() as session:
+            yield session
+
+    async def override_get_db_nosql():
+        yield mongo
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_db_read] = override_get_db
+    app.dependency_overrides[get_db_nosql] = override_get_db_nosql
+    conversation_writer.set_session_factory(session_factory)
+
+    return {
+        "rnd": rnd,
+        "engine": engine,
+        "smtp": smtp,
+        "originales": originales,
+        "productos": args.productos,
+        "admin_headers": {"Authorization": f"Bearer {create_access_token({'sub': 'admin@bench.com'})}"},
+    }
+
+
+async def limpiar(ctx: dict):
+    app.dependency_overrides.clear()
+    await conversation_writer.flush(include_incomplete=True)
+    conversation_writer.set_session_factory(conversation_writer.AsyncSessionLocal)
+    llm_client.set_llm_client(None)
+    checkout_router.set_mp_sdk(None)
+    (email_service.SMTP_SERVER, email_service.SMTP_PORT, email_service.SMTP_STARTTLS,
+     email_service.EMAIL_SENDER, email_service.EMAIL_PASSWORD) = ctx["originales"]["smtp"]
+    await ctx["smtp"].stop()
+    await ctx["engine"].dispose()
+
+
+# --- Ejecución y reporte ---
+
+async def correr_escenario(client: AsyncClient, ctx: dict, funcion, iteraciones: int, args) -> dict:
+    rec = Recorder()
+    rec.activo = False
+    for i in range(args.warmup):
+        await funcion(rec, client, ctx, -1 - i)
+    rec.activo = True
+
+    siguiente = iter(range(iteraciones))
+
+    async def usuario():
+        for i in siguiente:
+            await funcion(rec, client, ctx, i)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(usuario() for _ in range(min(args.concurrency, iteraciones))))
+    segundos = time.perf_counter() - start
+
+    endpoints = {}
+    for endpoint, latencias in sorted(rec.latencias.items()):
+        endpoints[endpoint] = {
+            "requests": len(latencias),
+            "errores": rec.errores[endpoint],
+            "requests_por_segundo": round(len(latencias) / segundos, 1),
+            "p50_ms": round(percentil(latencias, 50) * 1000, 2),
+            "p95_ms": round(percentil(latencias, 95) * 1000, 2),
+            "p99_ms": round(percentil(latencias, 99) * 1000, 2),
+            "max_ms": round(max(latencias) * 1000, 2),
+        }
+    return {
+        "iteraciones": iteraciones,
+        "segundos": round(segundos, 3),
+        "iteraciones_por_segundo": round(iteraciones / segundos, 1),
+        "endpoints": endpoints,
+    }
+
+
+def comparar(resultado: dict, baseline: dict, tolerancia: float) -> list:
+    """Endpoints cuyo p95 empeoró más que `tolerancia` (0.2 = 20%) respecto de la corrida base."""
+    regresiones = []
+    for escenario, datos in resultado["escenarios"].items():
+        base = baseline.get("escenarios", {}).get(escenario, {}).get("endpoints", {})
+        for endpoint, actual in datos["endpoints"].items():
+            anterior = base.get(endpoint)
+            if anterior and anterior["p95_ms"] > 0 and actual["p95_ms"] > anterior["p95_ms"] * (1 + tolerancia):
+                regresiones.append({
+                    "escenario": escenario, "endpoint": endpoint,
+                    "p95_ms_base": anterior["p95_ms"], "p95_ms": actual["p95_ms"],
+                    "variacion": round(actual["p95_ms"] / anterior["p95_ms"] - 1, 3),
+                })
+            if anterior is not None and actual["errores"] > anterior["errores"]:
+                regresiones.append({"escenario": escenario, "endpoint": endpoint, "errores_base": anterior["errores"], "errores": actual["errores"]})
+    return regresiones
+
+
+async def main_async(args) -> dict:
+    seleccionados = args.escenarios.split(",") if args.escenarios else list(ESCENARIOS)
+    desconocidos = set(seleccionados) - set(ESCENARIOS)
+    if desconocidos:
+        raise SystemExit(f"Escenarios desconocidos: {', '.join(sorted(desconocidos))}")
+
+    resultado = {
+        "benchmark": "api",
+        "version": BENCHMARK_VERSION,
+        "parametros": {k: v for k, v in vars(args).items() if k not in ("output", "baseline")},
+        "entorno": {"python": platform.python_version(), "plataforma": platform.platform()},
+        "escenarios": {},
+    }
+    with tempfile.TemporaryDirectory() as tmpdir:
+        ctx = await preparar(args, tmpdir)
+        flusher = asyncio.create_task(conversation_writer.conversation_flusher())
+        try:
+            async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+                for nombre in seleccionados:
+                    funcion, fraccion = ESCENARIOS[nombre]
+                    iteraciones = max(1, int(args.requests * fraccion))
+                    resultado["escenarios"][nombre] = await correr_escenario(client, ctx, funcion, iteraciones, args)
+        finally:
+            flusher.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await flusher
+            await limpiar(ctx)
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200, help="Iteraciones por escenario (login y admin corren una fracción)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Usuarios simultáneos")
+    parser.add_argument("--warmup", type=int, default=5, help="Iteraciones previas que no se miden")
+    parser.add_argument("--escenarios", help=f"Lista separada por comas (por defecto, todos: {','.join(ESCENARIOS)})")
+    parser.add_argument("--productos", type=int, default=500)
+    parser.add_argument("--llm-ms", type=int, default=50, help="Latencia del LLM stub")
+    parser.add_argument("--mp-ms", type=int, default=20, help="Latencia de Mercado Pago stub (bloquea, como el SDK real)")
+    parser.add_argument("--smtp-ms", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--baseline", help="JSON de una corrida anterior para comparar")
+    parser.add_argument("--tolerancia", type=float, default=0.2, help="Empeoramiento de p95 tolerado respecto del baseline")
+    parser.add_argument("--output", help="Archivo donde guardar el resultado en JSON (por defecto, stdout)")
+    args = parser.parse_args()
+
+    # La app loguea y hace print de cada email enviado: lo mandamos a stderr para no ensuciar el JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        resultado = asyncio.run(main_async(args))
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            resultado["regresiones"] = comparar(resultado, json.load(f), args.tolerancia)
+
+    salida = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(salida)
+    print(salida)
+    if resultado.get("regresiones"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# En backend/benchmarks/catalog_retrieval_bench.py
+#
+# Evaluación offline del modo "retrieval" del chatbot contra el catálogo completo.
+# No necesita base de datos ni red: arma un catálogo sintético, genera preguntas a partir
+# de productos conocidos y mide tamaño de prompt, latencia de armado y recall@k.
+#
+# Uso (desde la carpeta BACKEND):
+#   python -m benchmarks.catalog_retrieval_bench --productos 2000 --consultas 300 --top-k 8
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import statistics
+from collections import namedtuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from services.catalog_search import CatalogIndex
+from services.ia_services import render_catalog, get_chatbot_system_prompt, build_prompt
+
+ProductoFake = namedtuple("ProductoFake", "id nombre precio descripcion material color talle")
+
+PRENDAS = ["Remera", "Buzo", "Campera", "Pantalón", "Camisa", "Vestido", "Pollera", "Jean", "Chaleco", "Sweater"]
+ESTILOS = ["Oversize", "Slim", "Clásica", "Urbana", "Minimal", "Cropped", "Boxy", "Vintage", "Técnica", "Lounge"]
+COLORES = ["negro", "blanco", "gris", "azul", "verde", "beige", "bordó", "marrón", "crudo", "celeste"]
+MATERIALES = ["algodón", "lino", "lana", "denim", "cuero", "seda", "poliéster", "modal"]
+TALLES = ["XS", "S", "M", "L", "XL"]
+
+
+def catalogo_sintetico(n: int, seed: int):
+    rnd = random.Random(seed)
+    productos = []
+    for i in range(n):
+        prenda, estilo = rnd.choice(PRENDAS), rnd.choice(ESTILOS)
+        color, material = rnd.choice(COLORES), rnd.choice(MATERIALES)
+        productos.append(ProductoFake(
+            id=i,
+            nombre=f"{prenda} {estilo} {i}",
+            precio=f"{rnd.randint(10, 200) * 1000}.00",
+            descripcion=f"{prenda} de {material} en color {color}, corte {estilo.lower()}, ideal para todos los días.",
+            material=material,
+            color=color,
+            talle=rnd.choice(TALLES),
+        ))
+    return productos
+
+
+def percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(round(p / 100 * (len(valores) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--productos", type=int, default=2000)
+    parser.add_argument("--consultas", type=int, default=300)
+    parser.add_argument("--top-k", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Archivo donde guardar el resultado en JSON (por defecto, stdout)")
+    args = parser.parse_args()
+
+    productos = catalogo_sintetico(args.productos, args.seed)
+    system_prompt = get_chatbot_system_prompt()
+
+    start = time.perf_counter()
+    index = CatalogIndex(productos)
+    build_seconds = time.perf_counter() - start
+    full_catalog = render_catalog(productos)
+
+    rnd = random.Random(args.seed + 1)
+    full_chars, full_ms, retr_chars, retr_ms, hits = [], [], [], [], 0
+    for _ in range(args.consultas):
+        # El cliente no conoce el nombre exacto: pregunta por tipo de prenda, estilo y color.
+        # Cuenta como acierto cualquier producto seleccionado que cumpla las tres cosas.
+        objetivo = rnd.choice(productos)
+        prenda, estilo = objetivo.nombre.split(" ")[:2]
+        pregunta = f"¿Tenés alguna {prenda.lower()} {estilo.lower()} en {objetivo.color}?"
+
+        start = time.perf_counter()
+        prompt = build_prompt(f"{system_prompt}\n\n{full_catalog}", [], pregunta)
+        full_ms.append((time.perf_counter() - start) * 1000)
+        full_chars.append(len(prompt))
+
+        start = time.perf_counter()
+        seleccion = index.search(pregunta, args.top_k)
+        prompt = build_prompt(f"{system_prompt}\n\n{render_catalog(seleccion)}", [], pregunta)
+        retr_ms.append((time.perf_counter() - start) * 1000)
+        retr_chars.append(len(prompt))
+        hits += any(p.nombre.startswith(f"{prenda} {estilo} ") and p.color == objetivo.color for p in seleccion)
+
+    def resumen(chars, ms):
+        return {
+            "prompt_chars_avg": round(statistics.mean(chars)),
+            "prompt_tokens_aprox_avg": round(statistics.mean(chars) / 4),
+            "armado_ms_p50": round(percentil(ms, 50), 3),
+            "armado_ms_p95": round(percentil(ms, 95), 3),
+        }
+
+    resultado = {
+        "benchmark": "catalog_retrieval",
+        "productos": args.productos,
+        "consultas": args.consultas,
+        "top_k": args.top_k,
+        "indice_build_ms": round(build_seconds * 1000, 2),
+        "full": resumen(full_chars, full_ms),
+        "retrieval": {**resumen(retr_chars, retr_ms), "hit_rate_at_k": round(hits / args.consultas, 3)},
+    }
+    resultado["reduccion_prompt"] = round(1 - resultado["retrieval"]["prompt_chars_avg"] / resultado["full"]["prompt_chars_avg"], 3)
+
+    salida = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(salida)
+    print(salida)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# En backend/benchmarks/email_backlog_bench.py
+#
+# Cuánto tarda el worker de emails en vaciar un backlog, contra servidores IMAP y SMTP
+# locales (benchmarks/stub_servers.py), el LLM stub y una base SQLite en memoria.
+# Compara el modo secuencial (una respuesta y un envío a la vez, conexión SMTP nueva por envío, como
+# el worker original) con el pipeline concurrente con sesiones SMTP reutilizadas.
+#
+# Uso (desde la carpeta BACKEND):
+#   python -m benchmarks.email_backlog_bench --emails 200 --llm-ms 200 --smtp-handshake-ms 150
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from database.models import Base
+from services import llm_client
+from workers import email_responder
+from workers.imap_client import AsyncIMAPClient
+from benchmarks.stub_servers import StubIMAPServer, StubSMTPServer, make_message
+
+
+async def correr(modo: str, args) -> dict:
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+    imap_server = await StubIMAPServer().start()
+    smtp_server = await StubSMTPServer(
+        connect_latency=args.smtp_handshake_ms / 1000, message_latency=args.smtp_send_ms / 1000
+    ).start()
+    for i in range(args.emails):
+        imap_server.deliver(make_message(f"cliente{i}@test.com", f"Consulta {i}", f"¿Tienen stock del producto {i}?"))
+    email_responder.EMAIL_ACCOUNT = imap_server.user
+
+    llm = llm_client.LLMClient(llm_client.StubBackend(latency_ms=args.llm_ms), max_concurrency=args.llm_concurrency)
+
+    async def generar(db_session, msg):
+        return email_responder.build_reply(msg, await llm.generate(f"Usuario: {email_responder.get_email_body(msg)}"))
+
+    secuencial = modo == "secuencial"
+    sesiones = [
+        email_responder.SMTPSession("127.0.0.1", smtp_server.port, "tienda", "secreto", start_tls=False, reuse=not secuencial)
+        for _ in range(1 if secuencial else args.enviadores)
+    ]
+    imap = AsyncIMAPClient("127.0.0.1", imap_server.port, use_ssl=False)
+    await imap.connect()
+    await imap.login(imap_server.user, imap_server.password)
+    await imap.select("INBOX")
+
+    start = time.perf_counter()
+    procesados = await email_responder.process_emails(
+        imap, sesiones, generator=generar, session_factory=session_factory,
+        generate_concurrency=1 if secuencial else args.generadores,
+    )
+    segundos = time.perf_counter() - start
+
+    for smtp in sesiones:
+        await smtp.close()
+    await imap.logout()
+    await imap_server.stop()
+    await smtp_server.stop()
+    await engine.dispose()
+
+    return {
+        "emails": procesados,
+        "enviados": len(smtp_server.messages),
+        "conexiones_smtp": smtp_server.connections,
+        "segundos": round(segundos, 3),
+        "emails_por_segundo": round(procesados / segundos, 2) if segundos else None,
+    }
+
+
+async def main_async(args):
+    resultado = {
+        "benchmark": "email_backlog",
+        "parametros": {k: v for k, v in vars(args).items() if k != "output"},
+    }
+    for modo in ("secuencial", "pipeline"):
+        resultado[modo] = await correr(modo, args)
+    resultado["aceleracion"] = round(resultado["secuencial"]["segundos"] / resultado["pipeline"]["segundos"], 1)
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--emails", type=int, default=100)
+    parser.add_argument("--llm-ms", type=int, default=100, help="Latencia del LLM stub por respuesta")
+    parser.add_argument("--llm-concurrency", type=int, default=8)
+    parser.add_argument("--smtp-handshake-ms", type=int, default=100, help="Costo de conectar + TLS + login")
+    parser.add_argument("--smtp-send-ms", type=int, default=5)
+    parser.add_argument("--generadores", type=int, default=8)
+    parser.add_argument("--enviadores", type=int, default=2)
+    parser.add_argument("--output", help="Archivo donde guardar el resultado en JSON (por defecto, stdout)")
+    args = parser.parse_args()
+
+    salida = json.dumps(asyncio.run(main_async(args)), indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(salida)
+    print(salida)
+
+
+if __name__ == "__main__":
+    main()
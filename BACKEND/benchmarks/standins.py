@@ -0,0 +1,309 @@
+# En backend/benchmarks/standins.py
+#
+# Reemplazos locales de los servicios externos para correr los benchmarks sin red:
+# - InMemoryMongo: base MongoDB en memoria con la interfaz asíncrona de Motor, limitada a
+#   las operaciones que usan los routers (find_one, find, insert_one, update_one,
+#   count_documents, ...) y a los operadores de filtro y update más comunes.
+# - StubMercadoPagoSDK: imita `mercadopago.SDK` (payment().get / preference().create) con
+#   una latencia fija. Igual que el SDK real, bloquea el hilo mientras "espera la red".
+
+import copy
+import time
+import itertools
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+
+_MISSING = object()
+
+
+# --- MongoDB en memoria ---
+
+def _get_path(doc, path: str):
+    """Valores en `path` ("items.product_id"), entrando en las listas como hace Mongo."""
+    valores = [doc]
+    for parte in path.split("."):
+        siguientes = []
+        for valor in valores:
+            if isinstance(valor, list):
+                siguientes.extend(v.get(parte, _MISSING) for v in valor if isinstance(v, dict))
+            elif isinstance(valor, dict):
+                siguientes.append(valor.get(parte, _MISSING))
+        valores = siguientes
+    return [v for v in valores if v is not _MISSING]
+
+
+def _match_value(valores: list, condicion) -> bool:
+    if isinstance(condicion, dict) and condicion and all(k.startswith("$") for k in condicion):
+        return all(_match_operator(valores, op, arg) for op, arg in condicion.items())
+    return any(v == condicion or (isinstance(v, list) and condicion in v) for v in valores)
+
+
+def _match_operator(valores: list, op: str, arg) -> bool:
+    if op == "$ne":
+        return not _match_value(valores, arg)
+    if op == "$nin":
+        return not any(_match_value(valores, a) for a in arg)
+    if op == "$in":
+        return any(_match_value(valores, a) for a in arg)
+    if op == "$exists":
+        return bool(valores) == bool(arg)
+    comparaciones = {
+        "$gt": lambda v: v > arg, "$gte": lambda v: v >= arg,
+        "$lt": lambda v: v < arg, "$lte": lambda v: v <= arg,
+    }
+    if op in comparaciones:
+        return any(v is not None and comparaciones[op](v) for v in valores)
+    raise NotImplementedError(f"Operador de filtro no soportado por InMemoryMongo: {op}")
+
+
+def matches(doc: dict, filtro: dict) -> bool:
+    for key, condicion in filtro.items():
+        if key == "$and":
+            if not all(matches(doc, f) for f in condicion):
+                return False
+        elif key == "$or":
+            if not any(matches(doc, f) for f in condicion):
+                return False
+        elif not _match_value(_get_path(doc, key), condicion):
+            return False
+    return True
+
+
+def _positional_index(doc: dict, filtro: dict, campo: str) -> int:
+    """Índice del elemento de `campo` que matcheó el filtro (para updates con "campo.$.x")."""
+    subfiltro = {k[len(campo) + 1:]: v for k, v in filtro.items() if k.startswith(campo + ".")}
+    for i, elemento in enumerate(doc.get(campo, [])):
+        if matches(elemento, subfiltro):
+            return i
+    raise ValueError(f"El operador posicional de '{campo}' no encontró un elemento")
+
+
+def _resolve(doc: dict, path: str, filtro: dict, crear: bool = True):
+    partes = path.split(".")
+    actual = doc
+    for i, parte in enumerate(partes[:-1]):
+        if parte == "$":
+            actual = actual[_positional_index(doc, filtro, ".".join(partes[:i]))]
+            continue
+        if isinstance(actual, list):
+            actual = actual[int(parte)]
+        else:
+            if parte not in actual and crear:
+                actual[parte] = {}
+            actual = actual[parte]
+    return actual, partes[-1]
+
+
+def _apply_update(doc: dict, update: dict, filtro: dict) -> None:
+    for op, campos in update.items():
+        for path, valor in campos.items():
+            padre, clave = _resolve(doc, path, filtro)
+            if op == "$set":
+                padre[clave] = copy.deepcopy(valor)
+            elif op == "$unset":
+                padre.pop(clave, None)
+            elif op == "$inc":
+                padre[clave] = padre.get(clave, 0) + valor
+            elif op == "$push":
+                padre.setdefault(clave, []).append(copy.deepcopy(valor))
+            elif op == "$pull":
+                lista = padre.get(clave, [])
+                if isinstance(valor, dict):
+                    padre[clave] = [e for e in lista if not (isinstance(e, dict) and matches(e, valor))]
+                else:
+                    padre[clave] = [e for e in lista if e != valor]
+            else:
+                raise NotImplementedError(f"Operador de update no soportado por InMemoryMongo: {op}")
+
+
+class _Result:
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class InMemoryCursor:
+    def __init__(self, docs: List[dict], projection: Optional[dict] = None):
+        self._docs = docs
+        self._projection = projection
+        self._skip = 0
+        self._limit = 0
+
+    def sort(self, key, direction: int = 1):
+        claves = key if isinstance(key, list) else [(key, direction)]
+        for campo, sentido in reversed(claves):
+            self._docs.sort(key=lambda d: (_get_path(d, campo) or [None])[0], reverse=sentido < 0)
+        return self
+
+    def skip(self, n: int):
+        self._skip = n
+        return self
+
+    def limit(self, n: int):
+        self._limit = n
+        return self
+
+    def _results(self) -> List[dict]:
+        docs = self._docs[self._skip:]
+        if self._limit:
+            docs = docs[:self._limit]
+        return [_project(d, self._projection) for d in docs]
+
+    async def to_list(self, length: Optional[int] = None) -> List[dict]:
+        docs = self._results()
+        return docs[:length] if length else docs
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self._results():
+            yield doc
+
+
+def _project(doc: dict, projection: Optional[dict]) -> dict:
+    doc = copy.deepcopy(doc)
+    if not projection:
+        return doc
+    incluidos = {k for k, v in projection.items() if v}
+    if incluidos:
+        return {k: v for k, v in doc.items() if k in incluidos or (k == "_id" and projection.get("_id", 1))}
+    return {k: v for k, v in doc.items() if k not in projection}
+
+
+class InMemoryCollection:
+    def __init__(self, name: str):
+        self.name = name
+        self._docs: List[dict] = []
+
+    async def create_index(self, *args, **kwargs) -> str:
+        return "stand-in"
+
+    async def insert_one(self, document: dict):
+        doc = copy.deepcopy(document)
+        doc.setdefault("_id", ObjectId())
+        if any(d["_id"] == doc["_id"] for d in self._docs):
+            raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} dup key: {{ _id: {doc['_id']!r} }}")
+        document.setdefault("_id", doc["_id"])
+        self._docs.append(doc)
+        return _Result(inserted_id=doc["_id"], acknowledged=True)
+
+    async def insert_many(self, documents: List[dict]):
+        ids = [(await self.insert_one(d)).inserted_id for d in documents]
+        return _Result(inserted_ids=ids, acknowledged=True)
+
+    async def find_one(self, filtro: Optional[dict] = None, projection: Optional[dict] = None):
+        for doc in self._docs:
+            if matches(doc, filtro or {}):
+                return _project(doc, projection)
+        return None
+
+    def find(self, filtro: Optional[dict] = None, projection: Optional[dict] = None) -> InMemoryCursor:
+        return InMemoryCursor([d for d in self._docs if matches(d, filtro or {})], projection)
+
+    async def count_documents(self, filtro: dict) -> int:
+        return sum(1 for d in self._docs if matches(d, filtro))
+
+    async def update_one(self, filtro: dict, update: dict, upsert: bool = False):
+        for doc in self._docs:
+            if matches(doc, filtro):
+                antes = copy.deepcopy(doc)
+                _apply_update(doc, update, filtro)
+                return _Result(matched_count=1, modified_count=int(doc != antes), upserted_id=None)
+        if not upsert:
+            return _Result(matched_count=0, modified_count=0, upserted_id=None)
+        nuevo = {k: copy.deepcopy(v) for k, v in filtro.items() if not k.startswith("$") and "." not in k}
+        _apply_update(nuevo, update, filtro)
+        resultado = await self.insert_one(nuevo)
+        return _Result(matched_count=0, modified_count=0, upserted_id=resultado.inserted_id)
+
+    async def find_one_and_update(self, filtro: dict, update: dict, return_document: Any = False, **kwargs):
+        for doc in self._docs:
+            if matches(doc, filtro):
+                antes = copy.deepcopy(doc)
+                _apply_update(doc, update, filtro)
+                return copy.deepcopy(doc) if return_document else antes
+        return None
+
+    async def bulk_write(self, operaciones: list, ordered: bool = True):
+        """Solo UpdateOne (lo que usa la asignación masiva de roles)."""
+        matched = modified = 0
+        for op in operaciones:
+            result = await self.update_one(op._filter, op._doc, upsert=bool(op._upsert))
+            matched += result.matched_count
+            modified += result.modified_count
+        return _Result(matched_count=matched, modified_count=modified, acknowledged=True)
+
+    async def delete_one(self, filtro: dict):
+        for i, doc in enumerate(self._docs):
+            if matches(doc, filtro):
+                del self._docs[i]
+                return _Result(deleted_count=1)
+        return _Result(deleted_count=0)
+
+    async def delete_many(self, filtro: dict):
+        antes = len(self._docs)
+        self._docs = [d for d in self._docs if not matches(d, filtro)]
+        return _Result(deleted_count=antes - len(self._docs))
+
+
+class InMemoryMongo:
+    """Base de datos en memoria: `db.users` o `db["users"]` devuelven la colección (se crea sola)."""
+
+    def __init__(self):
+        self._collections: Dict[str, InMemoryCollection] = {}
+
+    def __getitem__(self, name: str) -> InMemoryCollection:
+        if name not in self._collections:
+            self._collections[name] = InMemoryCollection(name)
+        return self._collections[name]
+
+    def __getattr__(self, name: str) -> InMemoryCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    async def command(self, name: str, *args, **kwargs) -> dict:
+        return {"ok": 1.0}
+
+
+# --- Mercado Pago ---
+
+class StubMercadoPagoSDK:
+    """
+    Imita las partes de `mercadopago.SDK` que usa checkout_router. Todos los pagos salen
+    aprobados, con el email `payer_email` y dos items.
+    """
+
+    def __init__(self, latency_ms: float = 0, payer_email: str = "cliente@void.test"):
+        self.latency = latency_ms / 1000
+        self.payer_email = payer_email
+        self._ids = itertools.count(1)
+        self.calls = 0
+
+    def _wait(self):
+        self.calls += 1
+        time.sleep(self.latency)
+
+    def payment(self):
+        return self
+
+    def preference(self):
+        return self
+
+    def get(self, payment_id) -> dict:
+        self._wait()
+        return {"status": 200, "response": {
+            "id": payment_id,
+            "status": "approved",
+            "external_reference": f"user-{payment_id}",
+            "transaction_amount": 15000.0,
+            "payer": {"email": self.payer_email},
+            "additional_info": {"items": [{"title": "Remera", "quantity": "1"}, {"title": "Buzo", "quantity": "2"}]},
+        }}
+
+    def create(self, preference_data: dict) -> dict:
+        self._wait()
+        preference_id = f"pref-{next(self._ids)}"
+        return {"status": 201, "response": {"id": preference_id, "init_point": f"https://mp.stub/{preference_id}"}}
@@ -0,0 +1,139 @@
+# En backend/benchmarks/startup_bench.py
+#
+# Cuánto tarda en arrancar un worker de la app: tiempo de `import main` en un intérprete
+# nuevo (varias corridas), desglose por paquete según `python -X importtime`, qué SDKs pesados
+# quedaron cargados al importar (deberían cargarse recién en el primer uso) y cuánto cuesta
+# el chequeo de esquema del lifespan comparado con el `create_all` que se hacía antes.
+#
+# Uso (desde la carpeta BACKEND):
+#   python -m benchmarks.startup_bench --runs 7 --output startup.json
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import statistics
+import subprocess
+from collections import defaultdict
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, BACKEND_DIR)
+
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from database import migrate
+from database.models import Base
+
+# Módulos que no deberían importarse hasta que se usen
+MODULOS_PESADOS = ("google.generativeai", "grpc", "mercadopago", "motor")
+
+_SCRIPT = """
+import sys, time, json
+start = time.perf_counter()
+import main
+segundos = time.perf_counter() - start
+print(json.dumps({"segundos": segundos, "cargados": [m for m in %r if m in sys.modules]}))
+""" % (MODULOS_PESADOS,)
+
+
+def _env() -> dict:
+    env = dict(os.environ)
+    # Valores de relleno: importar la app no se conecta a nada
+    env.setdefault("SECRET_KEY", "benchmark")
+    env.setdefault("DB_NOSQL_URI", "mongodb://127.0.0.1:1")
+    env.setdefault("DB_NOSQL_NAME", "benchmark")
+    env.setdefault("MERCADOPAGO_TOKEN", "benchmark")
+    env["PYTHONWARNINGS"] = "ignore"
+    return env
+
+
+def importar(importtime: bool = False) -> subprocess.CompletedProcess:
+    comando = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", _SCRIPT]
+    return subprocess.run(comando, cwd=BACKEND_DIR, env=_env(), capture_output=True, text=True, check=True)
+
+
+def desglose(stderr: str, top: int):
+    """Parsea la salida de -X importtime: tiempo propio por paquete y los imports directos más caros."""
+    por_paquete = defaultdict(int)
+    directos = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        partes = line[len("import time:"):].split("|")
+        propio, acumulado, nombre = int(partes[0]), int(partes[1]), partes[2]
+        # Cada nivel de anidamiento agrega dos espacios después del separador
+        profundidad = (len(nombre) - len(nombre.lstrip(" ")) - 1) // 2
+        nombre = nombre.strip()
+        por_paquete[nombre.split(".")[0]] += propio
+        if profundidad == 1:  # imports que hace main directamente
+            directos.append((nombre, acumulado))
+    paquetes = sorted(por_paquete.items(), key=lambda x: x[1], reverse=True)[:top]
+    directos.sort(key=lambda x: x[1], reverse=True)
+    return (
+        {paquete: round(us / 1000, 1) for paquete, us in paquetes},
+        [{"modulo": nombre, "acumulado_ms": round(us / 1000, 1)} for nombre, us in directos[:top]],
+    )
+
+
+async def chequeo_de_esquema(runs: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tmpdir, 'startup.db')}")
+        try:
+            await migrate.upgrade(engine)
+            create_all, ensure = [], []
+            for _ in range(runs):
+                start = time.perf_counter()
+                async with engine.begin() as conn:
+                    await conn.run_sync(Base.metadata.create_all)
+                create_all.append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                await migrate.ensure_schema(engine)
+                ensure.append(time.perf_counter() - start)
+        finally:
+            await engine.dispose()
+    return {
+        "create_all_ms": round(statistics.median(create_all) * 1000, 2),
+        "ensure_schema_ms": round(statistics.median(ensure) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5, help="Corridas de `import main` (cada una en un proceso nuevo)")
+    parser.add_argument("--top", type=int, default=15, help="Cuántos paquetes/módulos mostrar en el desglose")
+    parser.add_argument("--output", help="Archivo donde guardar el resultado en JSON (por defecto, stdout)")
+    args = parser.parse_args()
+
+    importar()  # calienta el cache de bytecode y del sistema de archivos
+    corridas = [json.loads(importar().stdout.strip().splitlines()[-1]) for _ in range(args.runs)]
+    tiempos = [c["segundos"] for c in corridas]
+    por_paquete, directos = desglose(importar(importtime=True).stderr, args.top)
+
+    resultado = {
+        "benchmark": "startup",
+        "parametros": {k: v for k, v in vars(args).items() if k != "output"},
+        "import_main": {
+            "corridas": args.runs,
+            "p50_ms": round(statistics.median(tiempos) * 1000, 1),
+            "min_ms": round(min(tiempos) * 1000, 1),
+            "max_ms": round(max(tiempos) * 1000, 1),
+        },
+        "modulos_pesados_cargados": corridas[-1]["cargados"],
+        "import_propio_por_paquete_ms": por_paquete,
+        "imports_directos_mas_lentos": directos,
+        "esquema_en_el_arranque": asyncio.run(chequeo_de_esquema(args.runs)),
+    }
+
+    salida = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(salida)
+    print(salida)
+
+
+if __name__ == "__main__":
+    main()
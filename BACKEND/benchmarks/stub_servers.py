@@ -0,0 +1,210 @@
+# En backend/benchmarks/stub_servers.py
+
+import asyncio
+import logging
+from email.message import EmailMessage
+from email.utils import format_datetime, make_msgid
+from datetime import datetime, timezone
+from typing import List, Optional
+
+# Servidores locales que imitan lo justo de IMAP y SMTP para probar el worker de emails
+# sin red (tests y benchmarks). Escuchan en 127.0.0.1, en un puerto libre.
+
+logger = logging.getLogger(__name__)
+
+
+def parse_uid_set(uid_set: str, max_uid: int) -> set:
+    """ "1:3,7,9:*" -> {1, 2, 3, 7, 9, ..., max_uid} """
+    uids = set()
+    for parte in uid_set.split(","):
+        if ":" in parte:
+            desde, hasta = parte.split(":")
+            desde = max_uid if desde == "*" else int(desde)
+            hasta = max_uid if hasta == "*" else int(hasta)
+            uids.update(range(min(desde, hasta), max(desde, hasta) + 1))
+        else:
+            uids.add(max_uid if parte == "*" else int(parte))
+    return uids
+
+
+def make_message(sender: str, subject: str, body: str, message_id: Optional[str] = None) -> bytes:
+    msg = EmailMessage()
+    msg["From"] = sender
+    msg["To"] = "tienda@void.test"
+    msg["Subject"] = subject
+    msg["Date"] = format_datetime(datetime.now(timezone.utc))
+    msg["Message-ID"] = message_id or make_msgid(domain="cliente.test")
+    msg.set_content(body)
+    return msg.as_bytes()
+
+
+class StubIMAPServer:
+    """
+    Servidor IMAP en memoria con una sola casilla (INBOX). Soporta CAPABILITY, LOGIN, SELECT,
+    UID SEARCH UNSEEN, UID FETCH, UID STORE +FLAGS (\\Seen), IDLE y LOGOUT.
+    `commands` guarda los comandos recibidos para poder verificar cuántos FETCH se hicieron.
+    """
+
+    def __init__(self, user: str = "tienda@void.test", password: str = "secreto"):
+        self.user = user
+        self.password = password
+        self.messages: List[dict] = []
+        self.commands: List[str] = []
+        self.port: Optional[int] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._idlers: List[asyncio.StreamWriter] = []
+
+    async def start(self) -> "StubIMAPServer":
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        self._server.close()
+        for writer in list(self._idlers):
+            writer.close()
+        await self._server.wait_closed()
+
+    def deliver(self, raw: bytes) -> int:
+        """Agrega un mensaje no leído y avisa a los clientes que están en IDLE."""
+        uid = len(self.messages) + 1
+        self.messages.append({
+            "uid": uid,
+            "raw": raw,
+            "seen": False,
+            "internaldate": datetime.now(timezone.utc).strftime("%d-%b-%Y %H:%M:%S +0000"),
+        })
+        for writer in list(self._idlers):
+            writer.write(f"* {len(self.messages)} EXISTS\r\n".encode())
+        return uid
+
+    def unseen(self) -> List[int]:
+        return [m["uid"] for m in self.messages if not m["seen"]]
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        writer.write(b"* OK IMAP4rev1 stub listo\r\n")
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                tag, _, rest = line.decode().rstrip("\r\n").partition(" ")
+                command = rest.upper()
+                self.commands.append(rest)
+
+                if command == "CAPABILITY":
+                    writer.write(b"* CAPABILITY IMAP4rev1 IDLE\r\n")
+                elif command.startswith("LOGIN"):
+                    _, user, password = rest.split(" ", 2)
+                    if user.strip('"') != self.user or password.strip('"') != self.password:
+                        writer.write(f"{tag} NO credenciales invalidas\r\n".encode())
+                        continue
+                elif command.startswith("SELECT"):
+                    writer.write(f"* {len(self.messages)} EXISTS\r\n".encode())
+                elif command == "UID SEARCH UNSEEN":
+                    writer.write(("* SEARCH " + " ".join(map(str, self.unseen()))).rstrip().encode() + b"\r\n")
+                elif command.startswith("UID FETCH"):
+                    uids = parse_uid_set(rest.split(" ")[2], len(self.messages))
+                    for seq, message in enumerate(self.messages, start=1):
+                        if message["uid"] in uids:
+                            writer.write(
+                                f'* {seq} FETCH (UID {message["uid"]} INTERNALDATE "{message["internaldate"]}" '
+                                f'BODY[] {{{len(message["raw"])}}}\r\n'.encode()
+                            )
+                            writer.write(message["raw"] + b")\r\n")
+                elif command.startswith("UID STORE"):
+                    uids = parse_uid_set(rest.split(" ")[2], len(self.messages))
+                    for message in self.messages:
+                        if message["uid"] in uids and "\\SEEN" in command:
+                            message["seen"] = True
+                elif command == "IDLE":
+                    writer.write(b"+ idling\r\n")
+                    await writer.drain()
+                    self._idlers.append(writer)
+                    try:
+                        await reader.readline()  # DONE
+                    finally:
+                        self._idlers.remove(writer)
+                elif command == "LOGOUT":
+                    writer.write(b"* BYE\r\n" + f"{tag} OK LOGOUT\r\n".encode())
+                    await writer.drain()
+                    break
+                else:
+                    writer.write(f"{tag} BAD comando no soportado\r\n".encode())
+                    continue
+
+                writer.write(f"{tag} OK\r\n".encode())
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+
+class StubSMTPServer:
+    """
+    Servidor SMTP en memoria (sin TLS) que acepta EHLO, AUTH PLAIN/LOGIN, MAIL, RCPT, DATA,
+    RSET, NOOP y QUIT. `connect_latency` simula el costo del handshake TLS + login de un
+    servidor real. `connections` cuenta las conexiones y `messages` guarda lo recibido.
+    """
+
+    def __init__(self, connect_latency: float = 0.0, message_latency: float = 0.0):
+        self.connect_latency = connect_latency
+        self.message_latency = message_latency
+        self.connections = 0
+        self.messages: List[bytes] = []
+        self.port: Optional[int] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> "StubSMTPServer":
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            await asyncio.sleep(self.connect_latency)
+            writer.write(b"220 stub ESMTP\r\n")
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode().strip().upper()
+
+                if command.startswith("EHLO") or command.startswith("HELO"):
+                    writer.write(b"250-stub\r\n250-AUTH PLAIN LOGIN\r\n250 OK\r\n")
+                elif command.startswith("AUTH PLAIN"):
+                    writer.write(b"235 OK\r\n")
+                elif command.startswith("AUTH LOGIN"):
+                    writer.write(b"334 VXNlcm5hbWU6\r\n")
+                    await writer.drain()
+                    await reader.readline()
+                    writer.write(b"334 UGFzc3dvcmQ6\r\n")
+                    await writer.drain()
+                    await reader.readline()
+                    writer.write(b"235 OK\r\n")
+                elif command.startswith(("MAIL", "RCPT", "RSET", "NOOP")):
+                    writer.write(b"250 OK\r\n")
+                elif command == "DATA":
+                    writer.write(b"354 Fin con <CRLF>.<CRLF>\r\n")
+                    await writer.drain()
+                    data = await reader.readuntil(b"\r\n.\r\n")
+                    await asyncio.sleep(self.message_latency)
+                    self.messages.append(data[:-5])
+                    writer.write(b"250 OK\r\n")
+                elif command == "QUIT":
+                    writer.write(b"221 Chau\r\n")
+                    await writer.drain()
+                    break
+                else:
+                    writer.write(b"502 Comando no soportado\r\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
@@ -1,15 +1,24 @@
 # En BACKEND/database/database.py
 
 import os
+import time
+import asyncio
+import logging
+from typing import Optional
 from dotenv import load_dotenv
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy import text
-from motor.motor_asyncio import AsyncIOMotorClient
+
+from database.pool_metrics import InstrumentedQueuePool, MongoPoolListener, instrument_pool, pool_status, mongo_pool_in_use
+from database.query_metrics import MongoCommandListener, instrument_engine
+from utils import metrics
 
 # Carga las variables del archivo .env
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # --- 1. CONFIGURACIÓN DE LA BASE DE DATOS SQL (MySQL) ---
 DB_SQL_USER = os.getenv("DB_SQL_USER")
 DB_SQL_PASS = os.getenv("DB_SQL_PASS")
@@ -18,8 +27,21 @@ DB_SQL_NAME = os.getenv("DB_SQL_NAME")
 
 DATABASE_URL = f"mysql+aiomysql://{DB_SQL_USER}:{DB_SQL_PASS}@{DB_SQL_HOST}/{DB_SQL_NAME}"
 
+# --- Pool de conexiones SQL ---
+# DB_POOL_RECYCLE tiene que ser menor al `wait_timeout` de MySQL para no usar conexiones
+# que el servidor ya cerró; el pre-ping además descarta las que se cortaron por otro motivo.
+SQL_POOL_SETTINGS = {
+    "pool_size": int(os.getenv("DB_POOL_SIZE", 10)),
+    "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", 20)),
+    "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", 30)),
+    "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", 1800)),
+    "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "true").lower() == "true",
+}
+
 # El engine es necesario para el lifespan en main.py y para el chequeo
-engine = create_async_engine(DATABASE_URL)
+engine = create_async_engine(DATABASE_URL, poolclass=InstrumentedQueuePool, **SQL_POOL_SETTINGS)
+instrument_pool(engine)
+instrument_engine(engine)
 
 # Creamos un sessionmaker asíncrono
 AsyncSessionLocal = sessionmaker(
@@ -33,6 +55,93 @@ async def get_db() -> AsyncSession: # type: ignore
     async with AsyncSessionLocal() as session:
         yield session
 
+# --- Réplica de lectura ---
+# Los endpoints que solo leen (catálogo, gráficos del admin, catálogo del chatbot) usan
+# `get_db_read`, que va a la réplica si hay una configurada (DB_SQL_READ_HOST) y está al día.
+# Si la réplica se atrasa más de DB_READ_MAX_LAG_SECONDS, no informa su atraso o no responde,
+# las lecturas vuelven al primario hasta el próximo chequeo (cada DB_READ_LAG_CHECK_SECONDS).
+# Ojo: lo que se escribe en el primario tarda hasta ese atraso en verse en la réplica.
+DB_SQL_READ_HOST = os.getenv("DB_SQL_READ_HOST")
+DB_READ_MAX_LAG_SECONDS = float(os.getenv("DB_READ_MAX_LAG_SECONDS", 5))
+DB_READ_LAG_CHECK_SECONDS = float(os.getenv("DB_READ_LAG_CHECK_SECONDS", 10))
+
+db_read_sessions_total = metrics.counter(
+    "db_read_sessions_total", "Sesiones de solo lectura según adónde fueron", ["destino"]
+)
+db_replica_lag_seconds = metrics.gauge(
+    "db_replica_lag_seconds", "Atraso de la réplica de lectura en el último chequeo (-1 si no se pudo medir)"
+)
+
+if DB_SQL_READ_HOST:
+    READ_DATABASE_URL = (
+        f"mysql+aiomysql://{os.getenv('DB_SQL_READ_USER', DB_SQL_USER)}:{os.getenv('DB_SQL_READ_PASS', DB_SQL_PASS)}"
+        f"@{DB_SQL_READ_HOST}/{DB_SQL_NAME}"
+    )
+    # Pool estándar: los gauges de InstrumentedQueuePool son del pool del primario. Su estado
+    # se ve en /api/admin/metrics/pool.
+    read_engine = create_async_engine(READ_DATABASE_URL, **SQL_POOL_SETTINGS)
+    instrument_engine(read_engine)
+else:
+    # Sin réplica las lecturas comparten el engine (y el pool) del primario
+    read_engine = engine
+
+ReadSessionLocal = sessionmaker(
+    bind=read_engine,
+    class_=AsyncSession,
+    expire_on_commit=False
+)
+
+_replica = {"ok": True, "checked_at": float("-inf")}
+_replica_lock = asyncio.Lock()
+
+async def _replica_lag() -> Optional[float]:
+    """Segundos de atraso de la réplica según MySQL (None si la replicación no está corriendo)."""
+    async with read_engine.connect() as conn:
+        try:
+            row = (await conn.execute(text("SHOW REPLICA STATUS"))).mappings().first()
+            columna = "Seconds_Behind_Source"
+        except Exception:
+            # MySQL anterior a 8.0.22
+            row = (await conn.execute(text("SHOW SLAVE STATUS"))).mappings().first()
+            columna = "Seconds_Behind_Master"
+    if row is None or row[columna] is None:
+        return None
+    return float(row[columna])
+
+async def _replica_usable() -> bool:
+    if time.monotonic() - _replica["checked_at"] < DB_READ_LAG_CHECK_SECONDS:
+        return _replica["ok"]
+    async with _replica_lock:
+        # Otro request pudo haber hecho el chequeo mientras esperábamos el lock
+        if time.monotonic() - _replica["checked_at"] < DB_READ_LAG_CHECK_SECONDS:
+            return _replica["ok"]
+        try:
+            lag = await asyncio.wait_for(_replica_lag(), timeout=SQL_POOL_SETTINGS["pool_timeout"])
+        except Exception as e:
+            logger.warning(f"No se pudo consultar el atraso de la réplica, se lee del primario: {e}")
+            lag = None
+        ok = lag is not None and lag <= DB_READ_MAX_LAG_SECONDS
+        if not ok and _replica["ok"]:
+            logger.warning(f"Réplica de lectura no disponible o atrasada (atraso: {lag}), se lee del primario")
+        db_replica_lag_seconds.set(-1 if lag is None else lag)
+        _replica.update(ok=ok, checked_at=time.monotonic())
+        return ok
+
+async def get_read_sessionmaker() -> sessionmaker:
+    """Fábrica de sesiones para lecturas: la de la réplica si se puede usar, si no la del primario."""
+    if read_engine is engine:
+        return AsyncSessionLocal
+    if await _replica_usable():
+        db_read_sessions_total.inc(destino="replica")
+        return ReadSessionLocal
+    db_read_sessions_total.inc(destino="primario")
+    return AsyncSessionLocal
+
+# Dependencia para los endpoints de solo lectura
+async def get_db_read() -> AsyncSession: # type: ignore
+    async with (await get_read_sessionmaker())() as session:
+        yield session
+
 async def check_sql_connection():
     """Verifica la conexión con la base de datos MySQL."""
     try:
@@ -46,18 +155,71 @@ async def check_sql_connection():
 MONGO_URI = os.getenv("DB_NOSQL_URI")
 MONGO_DB_NAME = os.getenv("DB_NOSQL_NAME") # <-- Asegurate de tener esta variable en .env
 
-client = AsyncIOMotorClient(MONGO_URI)
-db_nosql = client[MONGO_DB_NAME]
+# Opciones del pool de Motor: solo se pasan las que estén definidas en el entorno,
+# el resto queda con los valores por defecto de PyMongo.
+_MONGO_POOL_ENV = {
+    "maxPoolSize": "MONGO_MAX_POOL_SIZE",
+    "minPoolSize": "MONGO_MIN_POOL_SIZE",
+    "maxIdleTimeMS": "MONGO_MAX_IDLE_TIME_MS",
+    "waitQueueTimeoutMS": "MONGO_WAIT_QUEUE_TIMEOUT_MS",
+    "serverSelectionTimeoutMS": "MONGO_SERVER_SELECTION_TIMEOUT_MS",
+    "connectTimeoutMS": "MONGO_CONNECT_TIMEOUT_MS",
+}
+MONGO_POOL_SETTINGS = {opcion: int(os.environ[env]) for opcion, env in _MONGO_POOL_ENV.items() if os.getenv(env)}
+
+_client = None
+
+def get_mongo_client():
+    """
+    Cliente de Motor compartido. Se crea (e importa) en el primer uso: así arrancar la app
+    no paga el import de Motor ni configura el cliente si el proceso nunca toca MongoDB.
+    """
+    global _client
+    if _client is None:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        _client = AsyncIOMotorClient(MONGO_URI, event_listeners=[MongoPoolListener(), MongoCommandListener()], **MONGO_POOL_SETTINGS)
+    return _client
+
+def get_nosql_database():
+    return get_mongo_client()[MONGO_DB_NAME]
 
 # Dependencia para la base de datos NoSQL que usarán tus routers
 async def get_db_nosql():
-    yield db_nosql
+    yield get_nosql_database()
+
+async def ensure_nosql_indexes():
+    """
+    Crea (si no existen) los índices que usan los listados del panel de admin.
+    La llama `python -m database.migrate`, no el arranque de la app.
+    """
+    # Filtro por rol + paginación por _id en GET /api/admin/users
+    await get_nosql_database().users.create_index([("role", 1), ("_id", 1)])
 
 async def check_nosql_connection():
     """Verifica la conexión con la base de datos MongoDB."""
     try:
         # El comando 'ping' es la forma estándar de verificar la conexión en Mongo
-        await client.admin.command('ping')
+        await get_mongo_client().admin.command('ping')
         return {"database": "MongoDB", "status": "ok", "message": "Conexión exitosa."}
     except Exception as e:
-        return {"database": "MongoDB", "status": "error", "message": str(e)}
\ No newline at end of file
+        return {"database": "MongoDB", "status": "error", "message": str(e)}
+
+def get_pool_status() -> dict:
+    """Configuración y uso actual de los pools de conexiones (SQL y MongoDB)."""
+    opciones = get_mongo_client().options.pool_options
+    estado = {
+        "sql": pool_status(engine, SQL_POOL_SETTINGS),
+        "mongo": {
+            "configuracion": {
+                "maxPoolSize": opciones.max_pool_size,
+                "minPoolSize": opciones.min_pool_size,
+                "maxIdleTimeMS": opciones.max_idle_time_seconds * 1000 if opciones.max_idle_time_seconds else None,
+                "waitQueueTimeoutMS": opciones.wait_queue_timeout * 1000 if opciones.wait_queue_timeout else None,
+                "connectTimeoutMS": opciones.connect_timeout * 1000 if opciones.connect_timeout else None,
+            },
+            "en_uso": int(mongo_pool_in_use.value()),
+        },
+    }
+    if read_engine is not engine:
+        estado["sql_replica"] = {**pool_status(read_engine, SQL_POOL_SETTINGS), "usable": _replica["ok"]}
+    return estado
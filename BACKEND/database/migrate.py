@@ -0,0 +1,127 @@
+# En BACKEND/database/migrate.py
+#
+# Migraciones versionadas del esquema SQL. Cada archivo `database/migrations/mNNNN_*.py`
+# define VERSION, DESCRIPCION y `upgrade(conn)` (sincrónica, recibe una Connection de
+# SQLAlchemy). Las aplicadas quedan registradas en la tabla `schema_migrations`.
+#
+# Uso (desde la carpeta BACKEND):
+#   python -m database.migrate           # aplica las pendientes y crea los índices de MongoDB
+#   python -m database.migrate status    # muestra la versión actual y las pendientes
+#
+# La app ya no crea tablas al arrancar: solo verifica que no falten migraciones (ver
+# `ensure_schema`). Con DB_AUTO_MIGRATE=true las aplica ella misma (cómodo en desarrollo).
+# Los índices de MongoDB también se crean acá y no en el arranque: así, con MongoDB caído,
+# la app igual levanta (los endpoints que solo usan SQL y los probes de /health responden).
+
+import os
+import sys
+import asyncio
+import logging
+import importlib
+import pkgutil
+from types import ModuleType
+from typing import List
+
+from sqlalchemy import Column, Integer, MetaData, String, Table, TIMESTAMP, inspect, insert, select
+from sqlalchemy.sql import func
+
+DB_AUTO_MIGRATE = os.getenv("DB_AUTO_MIGRATE", "false").lower() == "true"
+
+logger = logging.getLogger(__name__)
+
+_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations", _metadata,
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("descripcion", String(255), nullable=False),
+    Column("aplicada_en", TIMESTAMP, server_default=func.now()),
+)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), "migrations")
+
+
+class PendingMigrationsError(RuntimeError):
+    """La base no está al día con las migraciones del código."""
+
+
+def load_migrations() -> List[ModuleType]:
+    """Módulos de migración ordenados por versión."""
+    modulos = [
+        importlib.import_module(f"database.migrations.{info.name}")
+        for info in pkgutil.iter_modules([MIGRATIONS_DIR])
+        if info.name.startswith("m")
+    ]
+    modulos.sort(key=lambda m: m.VERSION)
+    versiones = [m.VERSION for m in modulos]
+    if len(set(versiones)) != len(versiones):
+        raise RuntimeError(f"Hay migraciones con la misma versión: {versiones}")
+    return modulos
+
+
+def _applied_versions(conn) -> set:
+    if not inspect(conn).has_table("schema_migrations"):
+        return set()
+    return set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+
+async def pending_migrations(engine) -> List[ModuleType]:
+    async with engine.connect() as conn:
+        aplicadas = await conn.run_sync(_applied_versions)
+    return [m for m in load_migrations() if m.VERSION not in aplicadas]
+
+
+async def upgrade(engine) -> List[int]:
+    """Aplica las migraciones pendientes, cada una en su transacción. Devuelve las versiones aplicadas."""
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda c: schema_migrations.create(c, checkfirst=True))
+
+    aplicadas = []
+    for migracion in await pending_migrations(engine):
+        # Ojo: en MySQL el DDL hace commit implícito, así que una migración que falla a la mitad
+        # puede dejar cambios a medias. Conviene que cada una haga una sola cosa.
+        async with engine.begin() as conn:
+            await conn.run_sync(migracion.upgrade)
+            await conn.execute(insert(schema_migrations).values(version=migracion.VERSION, descripcion=migracion.DESCRIPCION))
+        logger.info("Migración %04d aplicada: %s", migracion.VERSION, migracion.DESCRIPCION)
+        aplicadas.append(migracion.VERSION)
+    return aplicadas
+
+
+async def ensure_schema(engine) -> None:
+    """Lo llama el lifespan: una consulta barata en lugar de un create_all en cada arranque."""
+    pendientes = await pending_migrations(engine)
+    if not pendientes:
+        return
+    if DB_AUTO_MIGRATE:
+        await upgrade(engine)
+        return
+    versiones = ", ".join(f"{m.VERSION:04d}" for m in pendientes)
+    raise PendingMigrationsError(
+        f"Faltan aplicar migraciones ({versiones}). Corré `python -m database.migrate` o usá DB_AUTO_MIGRATE=true."
+    )
+
+
+async def _main(comando: str) -> None:
+    from database.database import engine, ensure_nosql_indexes
+
+    try:
+        if comando == "status":
+            pendientes = await pending_migrations(engine)
+            todas = load_migrations()
+            for m in todas:
+                estado = "pendiente" if m in pendientes else "aplicada"
+                print(f"{m.VERSION:04d}  {estado:<9}  {m.DESCRIPCION}")
+        elif comando == "upgrade":
+            aplicadas = await upgrade(engine)
+            print(f"Migraciones aplicadas: {', '.join(f'{v:04d}' for v in aplicadas)}" if aplicadas else "La base ya estaba al día.")
+            await ensure_nosql_indexes()
+            print("Índices de MongoDB al día.")
+        else:
+            raise SystemExit(f"Comando desconocido: {comando} (usar 'upgrade' o 'status')")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main(sys.argv[1] if len(sys.argv) > 1 else "upgrade"))
@@ -0,0 +1,79 @@
+# En BACKEND/database/migrations/m0001_esquema_inicial.py
+#
+# Esquema tal como lo dejaba el `create_all` del lifespan antes de las migraciones (los
+# modelos de la versión publicada). Las tablas están copiadas acá (y no tomadas de
+# database/models.py) para que esta migración no cambie cuando cambien los modelos: cada
+# cambio posterior va en su propia migración.
+# En una base creada con el create_all viejo no hace nada (checkfirst) y solo queda registrada.
+
+from sqlalchemy import (
+    Column, Date, DECIMAL, ForeignKey, Integer, MetaData, String, Table, Text, TIMESTAMP,
+)
+from sqlalchemy.sql import func
+
+VERSION = 1
+DESCRIPCION = "Esquema inicial (tablas de catálogo, órdenes, gastos y conversaciones del chatbot)"
+
+metadata = MetaData()
+
+Table(
+    "categorias", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("nombre", String(100), unique=True, nullable=False, index=True),
+)
+
+Table(
+    "productos", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("nombre", String(255), nullable=False),
+    Column("descripcion", Text, nullable=True),
+    Column("precio", DECIMAL(10, 2), nullable=False),
+    Column("sku", String(100), unique=True, nullable=False),
+    Column("url", String(100), unique=True, nullable=False),
+    Column("material", String(100), nullable=True),
+    Column("talle", String(50), nullable=True),
+    Column("color", String(50), nullable=True),
+    Column("stock", Integer, nullable=False),
+    Column("categoria_id", Integer, ForeignKey("categorias.id"), nullable=False),
+    Column("creado_en", TIMESTAMP, server_default=func.now()),
+    Column("actualizado_en", TIMESTAMP, server_default=func.now()),
+)
+
+Table(
+    "gastos", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("descripcion", String(255), nullable=False),
+    Column("monto", DECIMAL(10, 2), nullable=False),
+    Column("categoria", String(100), nullable=True),
+    Column("fecha", Date, nullable=False),
+    Column("creado_en", TIMESTAMP, server_default=func.now()),
+)
+
+Table(
+    "ordenes", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", String(255), nullable=True),
+    Column("total", DECIMAL(10, 2), nullable=False),
+    Column("creado_en", TIMESTAMP, server_default=func.now()),
+)
+
+Table(
+    "orden_productos", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("orden_id", Integer, ForeignKey("ordenes.id")),
+    Column("producto_id", Integer, ForeignKey("productos.id")),
+    Column("cantidad", Integer, nullable=False),
+)
+
+Table(
+    "conversaciones_ia", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("sesion_id", String(255), nullable=False, index=True),
+    Column("prompt", Text, nullable=False),
+    Column("respuesta", Text, nullable=False),
+    Column("creado_en", TIMESTAMP, server_default=func.now()),
+)
+
+
+def upgrade(conn) -> None:
+    metadata.create_all(conn, checkfirst=True)
@@ -0,0 +1,67 @@
+# En BACKEND/database/migrations/m0002_indices_y_tablas_previas.py
+#
+# Índices y tablas que se agregaron a los modelos antes de tener migraciones. En una base
+# creada con el create_all viejo las tablas ya existen, y create_all no les agrega índices:
+# cada índice se crea acá solo si falta (como en m0004).
+
+from sqlalchemy import (
+    Column, Index, Integer, MetaData, String, Table, Text, TIMESTAMP, inspect,
+)
+from sqlalchemy.sql import func
+
+VERSION = 2
+DESCRIPCION = "Índices de historial de compras, detalle de órdenes y conversaciones; resúmenes y emails respondidos"
+
+metadata = MetaData()
+ordenes = Table(
+    "ordenes", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("user_id", String(255)),
+)
+orden_productos = Table(
+    "orden_productos", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("orden_id", Integer),
+    Column("producto_id", Integer),
+)
+conversaciones_ia = Table(
+    "conversaciones_ia", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("sesion_id", String(255)),
+    Column("creado_en", TIMESTAMP),
+)
+
+INDICES = [
+    # Historial de compras del cliente
+    Index("ix_ordenes_user_id", ordenes.c.user_id),
+    # Detalle de órdenes cargado en bloque (sin N+1)
+    Index("ix_orden_productos_orden_id", orden_productos.c.orden_id),
+    Index("ix_orden_productos_producto_id", orden_productos.c.producto_id),
+    # Últimos N turnos de una sesión del chatbot
+    Index("ix_conversaciones_ia_sesion_creado", conversaciones_ia.c.sesion_id, conversaciones_ia.c.creado_en),
+]
+
+# Tablas nuevas: no existen en una base del create_all viejo, así que create_all las crea enteras
+tablas_nuevas = MetaData()
+Table(
+    "resumenes_conversacion_ia", tablas_nuevas,
+    Column("sesion_id", String(255), primary_key=True),
+    Column("resumen", Text, nullable=False),
+    Column("ultimo_id", Integer, nullable=False),
+    Column("actualizado_en", TIMESTAMP, server_default=func.now()),
+)
+Table(
+    "emails_respondidos", tablas_nuevas,
+    Column("message_id", String(255), primary_key=True),
+    Column("remitente", String(255), nullable=False),
+    Column("respondido_en", TIMESTAMP, server_default=func.now()),
+)
+
+
+def upgrade(conn) -> None:
+    inspector = inspect(conn)
+    for indice in INDICES:
+        existentes = {i["name"] for i in inspector.get_indexes(indice.table.name)}
+        if indice.name not in existentes:
+            indice.create(conn)
+    tablas_nuevas.create_all(conn, checkfirst=True)
@@ -0,0 +1,26 @@
+# En BACKEND/database/migrations/m0003_reintentos_emails.py
+#
+# Intentos fallidos por email. Antes, un email que fallaba siempre (por ejemplo uno que solo
+# trae HTML) se liberaba y se volvía a procesar en cada ciclo, sin límite.
+
+from sqlalchemy import Boolean, Column, Integer, inspect, text
+from sqlalchemy.schema import CreateColumn
+from sqlalchemy.sql import false
+
+VERSION = 3
+DESCRIPCION = "Intentos fallidos de respuesta en emails_respondidos"
+
+COLUMNAS = [
+    Column("fallos", Integer, nullable=False, server_default="0"),
+    Column("liberado", Boolean, nullable=False, server_default=false()),
+]
+
+
+def upgrade(conn) -> None:
+    # Como m0001, no hace nada si las columnas ya están (base creada con create_all)
+    existentes = {c["name"] for c in inspect(conn).get_columns("emails_respondidos")}
+    for columna in COLUMNAS:
+        if columna.name in existentes:
+            continue
+        ddl = CreateColumn(columna).compile(dialect=conn.dialect)
+        conn.execute(text(f"ALTER TABLE emails_respondidos ADD COLUMN {ddl}"))
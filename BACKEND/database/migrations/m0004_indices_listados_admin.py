@@ -0,0 +1,35 @@
+# En BACKEND/database/migrations/m0004_indices_listados_admin.py
+#
+# Los listados del panel filtran por fecha y paginan por (fecha, id): con un índice
+# compuesto el rango y el keyset salen del mismo índice. Reemplazan a los índices simples
+# sobre la fecha, que quedan cubiertos por el prefijo del compuesto.
+
+from sqlalchemy import Column, Date, Index, Integer, MetaData, Table, TIMESTAMP, inspect
+
+VERSION = 4
+DESCRIPCION = "Índices (fecha, id) para los listados paginados de gastos y órdenes"
+
+metadata = MetaData()
+gastos = Table("gastos", metadata, Column("id", Integer, primary_key=True), Column("fecha", Date))
+ordenes = Table("ordenes", metadata, Column("id", Integer, primary_key=True), Column("creado_en", TIMESTAMP))
+
+NUEVOS = [
+    Index("ix_gastos_fecha_id", gastos.c.fecha, gastos.c.id),
+    Index("ix_ordenes_creado_en_id", ordenes.c.creado_en, ordenes.c.id),
+]
+REEMPLAZADOS = [
+    Index("ix_gastos_fecha", gastos.c.fecha),
+    Index("ix_ordenes_creado_en", ordenes.c.creado_en),
+]
+
+
+def upgrade(conn) -> None:
+    inspector = inspect(conn)
+    existentes = {i["name"] for tabla in ("gastos", "ordenes") for i in inspector.get_indexes(tabla)}
+    # Primero se crean los compuestos, para que los filtros por fecha nunca queden sin índice
+    for indice in NUEVOS:
+        if indice.name not in existentes:
+            indice.create(conn)
+    for indice in REEMPLAZADOS:
+        if indice.name in existentes:
+            indice.drop(conn)
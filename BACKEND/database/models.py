@@ -1,4 +1,5 @@
 from sqlalchemy import (
+    Boolean,
     Column,
     Integer,
     String,
@@ -6,9 +7,10 @@ from sqlalchemy import (
     DECIMAL,
     TIMESTAMP,
     ForeignKey,
+    Index,
 )
 from sqlalchemy.orm import relationship, declarative_base
-from sqlalchemy.sql import func
+from sqlalchemy.sql import false, func
 from sqlalchemy import Date # Asegurate de importar Date
 # Esta es la "mesa de dibujo" sobre la que creamos nuestros planos (modelos)
 Base = declarative_base()
@@ -63,6 +65,8 @@ class Producto(Base):
 
 class Gasto(Base):
     __tablename__ = "gastos"
+    # Filtros por fecha del panel + paginación por (fecha, id) con un solo índice
+    __table_args__ = (Index("ix_gastos_fecha_id", "fecha", "id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     descripcion = Column(String(255), nullable=False)
@@ -73,9 +77,11 @@ class Gasto(Base):
 
 class Orden(Base):
     __tablename__ = "ordenes"
+    # Filtros por fecha del panel + paginación por (creado_en, id) con un solo índice
+    __table_args__ = (Index("ix_ordenes_creado_en_id", "creado_en", "id"),)
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(String(255), nullable=True)
+    user_id = Column(String(255), nullable=True, index=True) # Indexado para el historial de compras del cliente
     total = Column(DECIMAL(10, 2), nullable=False)
     creado_en = Column(TIMESTAMP, server_default=func.now())
     productos = relationship("OrdenProducto", back_populates="orden")
@@ -84,8 +90,8 @@ class OrdenProducto(Base):
     __tablename__ = "orden_productos"
 
     id = Column(Integer, primary_key=True, index=True)
-    orden_id = Column(Integer, ForeignKey("ordenes.id"))
-    producto_id = Column(Integer, ForeignKey("productos.id"))
+    orden_id = Column(Integer, ForeignKey("ordenes.id"), index=True)
+    producto_id = Column(Integer, ForeignKey("productos.id"), index=True)
     cantidad = Column(Integer, nullable=False)
 
     orden = relationship("Orden", back_populates="productos")
@@ -93,9 +99,38 @@ class OrdenProducto(Base):
 
 class ConversacionIA(Base):
     __tablename__ = "conversaciones_ia"
+    # Índice compuesto para traer los últimos N turnos de una sesión sin recorrer todo el historial
+    __table_args__ = (Index("ix_conversaciones_ia_sesion_creado", "sesion_id", "creado_en"),)
 
     id = Column(Integer, primary_key=True, index=True)
     sesion_id = Column(String(255), nullable=False, index=True)
     prompt = Column(Text, nullable=False)
     respuesta = Column(Text, nullable=False)
-    creado_en = Column(TIMESTAMP, server_default=func.now())
\ No newline at end of file
+    creado_en = Column(TIMESTAMP, server_default=func.now())
+
+class ResumenConversacionIA(Base):
+    """
+    Resumen acumulado de los turnos de una sesión que ya quedaron fuera de la ventana
+    de historial que se manda al chatbot.
+    """
+    __tablename__ = "resumenes_conversacion_ia"
+
+    sesion_id = Column(String(255), primary_key=True)
+    resumen = Column(Text, nullable=False, default="")
+    ultimo_id = Column(Integer, nullable=False, default=0) # Último turno de conversaciones_ia ya resumido
+    actualizado_en = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
+
+class EmailRespondido(Base):
+    """
+    Emails que ya contestó el worker, por Message-ID. La fila se crea ANTES de enviar la
+    respuesta: si el worker se cae a mitad de camino, al reiniciar no se contesta dos veces.
+    """
+    __tablename__ = "emails_respondidos"
+
+    message_id = Column(String(255), primary_key=True)
+    remitente = Column(String(255), nullable=False)
+    respondido_en = Column(TIMESTAMP, server_default=func.now())
+    # Intentos fallidos de generar o enviar la respuesta. Mientras no se agoten, la fila queda
+    # `liberado` y el próximo ciclo la vuelve a tomar; después se deja de reintentar.
+    fallos = Column(Integer, nullable=False, server_default="0")
+    liberado = Column(Boolean, nullable=False, server_default=false())
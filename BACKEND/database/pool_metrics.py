@@ -0,0 +1,135 @@
+# En BACKEND/database/pool_metrics.py
+
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from pymongo import monitoring
+
+from utils import metrics
+
+# Métricas de los pools de conexiones: cuánto se espera para conseguir una conexión,
+# cuántas hay en uso y cuántas son de overflow. Sirven para ver si el pool se satura.
+
+# --- SQL (SQLAlchemy) ---
+db_pool_checkout_seconds = metrics.histogram(
+    "db_pool_checkout_seconds", "Espera para obtener una conexión del pool SQL (incluye el pre-ping)"
+)
+db_pool_checkout_timeouts_total = metrics.counter(
+    "db_pool_checkout_timeouts_total", "Pedidos de conexión SQL que superaron DB_POOL_TIMEOUT"
+)
+db_pool_in_use = metrics.gauge("db_pool_in_use", "Conexiones SQL prestadas en este momento")
+db_pool_idle = metrics.gauge("db_pool_idle", "Conexiones SQL abiertas y libres en el pool")
+db_pool_overflow = metrics.gauge("db_pool_overflow", "Conexiones SQL abiertas por encima de DB_POOL_SIZE")
+db_pool_connections_total = metrics.counter(
+    "db_pool_connections_total", "Conexiones SQL abiertas contra el servidor"
+)
+db_pool_invalidated_total = metrics.counter(
+    "db_pool_invalidated_total", "Conexiones SQL descartadas por error o por el pre-ping"
+)
+
+# --- MongoDB (Motor/PyMongo) ---
+mongo_pool_in_use = metrics.gauge("mongo_pool_in_use", "Conexiones a MongoDB prestadas en este momento")
+mongo_pool_checkout_seconds = metrics.histogram(
+    "mongo_pool_checkout_seconds", "Espera para obtener una conexión del pool de MongoDB"
+)
+mongo_pool_checkout_failed_total = metrics.counter(
+    "mongo_pool_checkout_failed_total", "Pedidos de conexión a MongoDB que fallaron", ["motivo"]
+)
+mongo_pool_connections_total = metrics.counter(
+    "mongo_pool_connections_total", "Conexiones abiertas contra MongoDB"
+)
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Pool asíncrono estándar que además mide cuánto tarda cada pedido de conexión y
+    actualiza los gauges de uso cada vez que una conexión sale o vuelve al pool.
+    """
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            db_pool_checkout_timeouts_total.inc()
+            raise
+        finally:
+            db_pool_checkout_seconds.observe(time.perf_counter() - start)
+            self._update_gauges()
+
+    def _do_return_conn(self, record):
+        super()._do_return_conn(record)
+        self._update_gauges()
+
+    def _update_gauges(self):
+        db_pool_in_use.set(self.checkedout())
+        db_pool_idle.set(self.checkedin())
+        db_pool_overflow.set(max(self.overflow(), 0))
+
+
+def instrument_pool(engine) -> None:
+    """Registra los eventos del pool del engine (conexiones nuevas y descartadas)."""
+    pool = getattr(engine, "sync_engine", engine).pool
+
+    @event.listens_for(pool, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        db_pool_connections_total.inc()
+
+    @event.listens_for(pool, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        db_pool_invalidated_total.inc()
+
+
+def pool_status(engine, settings: dict) -> dict:
+    """Configuración y estado actual del pool SQL."""
+    pool = getattr(engine, "sync_engine", engine).pool
+    estado = {"configuracion": settings, "clase": type(pool).__name__}
+    if hasattr(pool, "checkedout"):
+        estado.update({
+            "en_uso": pool.checkedout(),
+            "libres": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "tamano": pool.size(),
+        })
+    return estado
+
+
+class MongoPoolListener(monitoring.ConnectionPoolListener):
+    """Listener de PyMongo (lo usa Motor por debajo) para las métricas del pool de MongoDB."""
+
+    def connection_checked_out(self, event):
+        mongo_pool_in_use.inc()
+        # `duration` existe desde PyMongo 4.7
+        if getattr(event, "duration", None) is not None:
+            mongo_pool_checkout_seconds.observe(event.duration)
+
+    def connection_checked_in(self, event):
+        mongo_pool_in_use.dec()
+
+    def connection_check_out_failed(self, event):
+        mongo_pool_checkout_failed_total.inc(motivo=str(event.reason))
+
+    def connection_created(self, event):
+        mongo_pool_connections_total.inc()
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        pass
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
@@ -0,0 +1,70 @@
+# En BACKEND/database/query_metrics.py
+
+import time
+
+from sqlalchemy import event
+from pymongo import monitoring
+
+from database import slow_queries
+from utils import metrics
+from utils.request_metrics import current_stats
+
+# Cantidad y duración de las consultas a las bases, globales y por request (ver
+# utils/request_metrics.py). En SQL se cuenta cada sentencia que llega al cursor;
+# en MongoDB cada comando que manda el driver (find, insert, aggregate, ...).
+
+db_queries_total = metrics.counter("db_queries_total", "Consultas ejecutadas, por base y operación", ["db", "operacion"])
+db_query_seconds = metrics.histogram("db_query_seconds", "Duración de cada consulta, por base y operación", ["db", "operacion"])
+db_query_errors_total = metrics.counter("db_query_errors_total", "Consultas que terminaron con error", ["db", "operacion"])
+
+
+def _sql_operation(statement: str) -> str:
+    """Primera palabra de la sentencia (SELECT, INSERT, ...): suficiente para separar lecturas de escrituras."""
+    partes = statement.lstrip(" (\n\t").split(None, 1)
+    return partes[0].upper() if partes else "?"
+
+
+def _record(db: str, operacion: str, seconds: float) -> None:
+    db_queries_total.inc(db=db, operacion=operacion)
+    db_query_seconds.observe(seconds, db=db, operacion=operacion)
+    stats = current_stats()
+    if stats is not None:
+        stats.add(db, seconds)
+
+
+def instrument_engine(engine) -> None:
+    """Registra los hooks de ejecución del engine (sirve tanto para el engine async como para uno sync)."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        # Pila por conexión: una sentencia puede disparar otra antes de terminar (p. ej. el pre-ping)
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info["query_start"].pop()
+        _record("sql", _sql_operation(statement), seconds)
+        slow_queries.record(engine, statement, parameters, executemany, seconds)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _on_error(exception_context):
+        starts = exception_context.connection.info.get("query_start") if exception_context.connection else None
+        if starts:
+            starts.pop()
+        db_query_errors_total.inc(db="sql", operacion=_sql_operation(exception_context.statement or ""))
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Listener de comandos de PyMongo (lo usa Motor por debajo). Motor corre el driver en un pool de
+    hilos pero copia el contexto, así que `current_stats()` sigue apuntando al request que lo pidió."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        _record("mongo", event.command_name, event.duration_micros / 1_000_000)
+
+    def failed(self, event):
+        _record("mongo", event.command_name, event.duration_micros / 1_000_000)
+        db_query_errors_total.inc(db="mongo", operacion=event.command_name)
@@ -0,0 +1,177 @@
+# En BACKEND/database/slow_queries.py
+
+import os
+import re
+import asyncio
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+from schemas import metrics_schemas
+from utils import metrics
+from utils.request_metrics import current_stats
+
+# Log de consultas lentas: toda sentencia SQL que tarde más que SLOW_QUERY_THRESHOLD_MS se
+# loguea normalizada (sin valores), con la forma de sus parámetros y la duración. Además se
+# agrupan por "huella" (la sentencia normalizada) y se guardan las SLOW_QUERY_LOG_SIZE más
+# lentas, con el plan de ejecución (EXPLAIN) que se captura en segundo plano.
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", 200))  # <= 0 lo deshabilita
+SLOW_QUERY_LOG_SIZE = int(os.getenv("SLOW_QUERY_LOG_SIZE", 50))
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "true").lower() == "true"
+
+logger = logging.getLogger(__name__)
+
+slow_queries_total = metrics.counter("slow_queries_total", "Consultas SQL que superaron SLOW_QUERY_THRESHOLD_MS", ["operacion"])
+
+# Solo se pide el plan de lecturas: en MySQL EXPLAIN no ejecuta la sentencia, pero preferimos no
+# mandar un EXPLAIN de escrituras con parámetros de otro request.
+_EXPLAINABLE = ("SELECT", "WITH")
+
+_STRING_RE = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_RE = re.compile(r"%s|%\(\w+\)s|:\w+|\?")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACES_RE = re.compile(r"\s+")
+
+_lock = threading.Lock()
+_entries: Dict[str, dict] = {}
+_explain_tasks: Set[asyncio.Task] = set()
+
+
+def normalize_statement(statement: str) -> str:
+    """Reemplaza literales y placeholders por `?` y colapsa las listas de IN, para agrupar sentencias iguales."""
+    texto = _STRING_RE.sub("?", statement)
+    texto = _NUMBER_RE.sub("?", texto)
+    texto = _PLACEHOLDER_RE.sub("?", texto)
+    texto = _IN_LIST_RE.sub("(?...)", texto)
+    return _SPACES_RE.sub(" ", texto).strip()
+
+
+def fingerprint(normalized: str) -> str:
+    return hashlib.sha1(normalized.encode()).hexdigest()[:12]
+
+
+def parameter_shape(parameters, executemany: bool = False):
+    """Tipos de los parámetros, sin los valores (pueden ser datos personales)."""
+    if executemany:
+        filas = list(parameters or [])
+        return {"filas": len(filas), "forma": parameter_shape(filas[0]) if filas else None}
+    if isinstance(parameters, dict):
+        return {nombre: type(valor).__name__ for nombre, valor in parameters.items()}
+    return [type(valor).__name__ for valor in (parameters or ())]
+
+
+def _operation(normalized: str) -> str:
+    partes = normalized.lstrip("( ").split(None, 1)
+    return partes[0].upper() if partes else "?"
+
+
+def record(engine, statement: str, parameters, executemany: bool, seconds: float) -> None:
+    """Lo llaman los hooks de database/query_metrics.py después de cada sentencia."""
+    if SLOW_QUERY_THRESHOLD_MS <= 0 or seconds * 1000 < SLOW_QUERY_THRESHOLD_MS:
+        return
+    if statement.lstrip().upper().startswith("EXPLAIN"):
+        return
+
+    normalized = normalize_statement(statement)
+    huella = fingerprint(normalized)
+    operacion = _operation(normalized)
+    forma = parameter_shape(parameters, executemany)
+    stats = current_stats()
+    path = stats.path if stats is not None else None
+    slow_queries_total.inc(operacion=operacion)
+    logger.warning(
+        "Consulta lenta (%.0f ms) [%s] %s | parámetros: %s | request: %s",
+        seconds * 1000, huella, normalized, forma, path or "-",
+    )
+
+    with _lock:
+        entry = _entries.get(huella)
+        if entry is None:
+            if len(_entries) >= SLOW_QUERY_LOG_SIZE:
+                # Lleno: se queda con las más lentas, así que la nueva reemplaza a la más rápida
+                mas_rapida = min(_entries, key=lambda h: _entries[h]["max_segundos"])
+                if _entries[mas_rapida]["max_segundos"] >= seconds:
+                    return
+                del _entries[mas_rapida]
+            entry = _entries[huella] = {
+                "huella": huella, "sentencia": normalized, "operacion": operacion,
+                "cantidad": 0, "total_segundos": 0.0, "max_segundos": 0.0,
+                "explain": None, "explain_error": None, "_explain_pendiente": False,
+            }
+        entry["cantidad"] += 1
+        entry["total_segundos"] += seconds
+        entry["max_segundos"] = max(entry["max_segundos"], seconds)
+        entry["parametros"] = forma
+        entry["ultimo_request"] = path
+        entry["ultima_vez"] = datetime.now()
+        pedir_explain = (
+            SLOW_QUERY_EXPLAIN and not executemany and operacion in _EXPLAINABLE
+            and entry["explain"] is None and not entry["_explain_pendiente"]
+        )
+        if pedir_explain:
+            entry["_explain_pendiente"] = True
+
+    if pedir_explain:
+        _schedule_explain(engine, huella, statement, parameters)
+
+
+def _schedule_explain(engine, huella: str, statement: str, parameters) -> None:
+    # El hook corre dentro del event loop (en el greenlet de SQLAlchemy): el EXPLAIN va en una
+    # tarea aparte, con su propia conexión, para no demorar más al request que ya fue lento.
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        _set_explain(huella, None, "Sin event loop (engine sincrónico)")
+        return
+    task = loop.create_task(_capture_explain(engine, huella, statement, parameters))
+    _explain_tasks.add(task)
+    task.add_done_callback(_explain_tasks.discard)
+
+
+async def _capture_explain(engine, huella: str, statement: str, parameters) -> None:
+    prefijo = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN "
+    try:
+        async with engine.connect() as conn:
+            result = await conn.exec_driver_sql(prefijo + statement, parameters)
+            columnas = list(result.keys())
+            plan = [dict(zip(columnas, (str(v) if v is not None else None for v in row))) for row in result.all()]
+        _set_explain(huella, plan, None)
+    except Exception as e:
+        logger.info("No se pudo obtener el EXPLAIN de %s: %s", huella, e)
+        _set_explain(huella, None, f"{type(e).__name__}: {e}")
+
+
+def _set_explain(huella: str, plan, error: Optional[str]) -> None:
+    with _lock:
+        entry = _entries.get(huella)
+        if entry is not None:
+            entry["explain"] = plan
+            entry["explain_error"] = error
+            entry["_explain_pendiente"] = False
+
+
+async def wait_for_explains() -> None:
+    """Espera los EXPLAIN pendientes (para los tests y el apagado)."""
+    if _explain_tasks:
+        await asyncio.gather(*list(_explain_tasks), return_exceptions=True)
+
+
+def slowest() -> List[metrics_schemas.SlowQuery]:
+    """Las consultas lentas guardadas, de la más lenta a la menos lenta."""
+    with _lock:
+        entries = sorted(_entries.values(), key=lambda e: e["max_segundos"], reverse=True)
+        return [
+            metrics_schemas.SlowQuery(
+                promedio_segundos=e["total_segundos"] / e["cantidad"],
+                **{k: v for k, v in e.items() if not k.startswith("_")},
+            )
+            for e in entries
+        ]
+
+
+def reset() -> None:
+    with _lock:
+        _entries.clear()
@@ -1,17 +1,63 @@
 # En BACKEND/main.py
 
+import os
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 from database.database import engine
-from database.models import Base
-from routers import health_router, auth_router, products_router, cart_router, admin_router, chatbot_router, checkout_router
+from database import slow_queries
+from database.migrate import ensure_schema
+from services import metrics_services, conversation_writer, cart_services, ia_services
+from services.scheduler import scheduler, Job, SCHEDULER_ENABLED
+from services.request_profiler import ProfilingMiddleware
+from utils.request_metrics import MetricsMiddleware
+from routers import metrics_router, health_router, auth_router, products_router, cart_router, admin_router, chatbot_router, checkout_router, orders_router
+
+# --- Tareas programadas (las corre el planificador que arranca el lifespan) ---
+# Caches de cada worker: corren en todos
+scheduler.add_job(Job(
+    "metricas_productos", metrics_services.refresh_product_metrics_job,
+    every=metrics_services.PRODUCT_METRICS_REFRESH_SECONDS, jitter=10, run_at_start=True,
+    min_interval=metrics_services.PRODUCT_METRICS_MIN_INTERVAL_SECONDS,
+))
+scheduler.add_job(Job(
+    "catalogo_chatbot", ia_services.warm_catalog_cache,
+    every=ia_services.CATALOG_CONTEXT_TTL_SECONDS / 2, jitter=5, run_at_start=True,
+))
+# Trabajo compartido: solo en el worker que tiene el lock de líder
+scheduler.add_job(Job(
+    "carritos_vencidos", cart_services.expire_guest_carts_job,
+    cron=cart_services.CART_EXPIRY_CRON, jitter=60, singleton=True,
+))
+EMAIL_RESPONDER_IN_APP = os.getenv("EMAIL_RESPONDER_IN_APP", "false").lower() == "true"
+if EMAIL_RESPONDER_IN_APP:
+    # Reemplaza a correr `python -m workers.email_responder` aparte
+    from workers import email_responder
+    scheduler.add_job(Job(
+        "respondedor_emails", email_responder.ingest_job,
+        every=email_responder.EMAIL_POLL_SECONDS, singleton=True, run_at_start=True,
+    ))
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    # El esquema se maneja con migraciones (python -m database.migrate): acá solo se verifica
+    await ensure_schema(engine)
+    if SCHEDULER_ENABLED:
+        await scheduler.start()
+    # Tarea de fondo que guarda de a lotes los turnos del chatbot
+    conversations_task = asyncio.create_task(conversation_writer.conversation_flusher())
     yield
+    conversations_task.cancel()
+    with suppress(asyncio.CancelledError):
+        await conversations_task
+    if SCHEDULER_ENABLED:
+        await scheduler.stop()
+    if EMAIL_RESPONDER_IN_APP:
+        await email_responder.close_connections()
+    # Guardamos lo que haya quedado en el buffer, incluso preguntas sin respuesta
+    await conversation_writer.flush(include_incomplete=True)
+    await slow_queries.wait_for_explains()
     # Clean up the engine connection
     await engine.dispose()
 
@@ -41,15 +87,23 @@ app.add_middleware(
 
 # --- FIN DEL CAMBIO ---
 
+# Perfilado bajo demanda de un request (solo admins, con el header X-Profile)
+app.add_middleware(ProfilingMiddleware)
+
+# Latencia y códigos de respuesta por ruta (se agrega último para que mida también a CORS)
+app.add_middleware(MetricsMiddleware)
+
 @app.get("/")
 def home():
     return {"mensaje": "Backend de VOID funcionando (Sprint 6)."}
 
 # Incluimos todos los routers
+app.include_router(metrics_router.router)
 app.include_router(health_router.router)
 app.include_router(auth_router.router)
 app.include_router(products_router.router)
 app.include_router(cart_router.router)
 app.include_router(admin_router.router)
 app.include_router(chatbot_router.router)
-app.include_router(checkout_router.router)
\ No newline at end of file
+app.include_router(checkout_router.router)
+app.include_router(orders_router.router)
\ No newline at end of file
@@ -1,13 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import PlainTextResponse, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete, func
-from typing import List
+from sqlalchemy import select, delete, func, and_, or_
+from typing import List, Optional
+from datetime import date, timedelta
 from schemas import admin_schemas, product_schemas, metrics_schemas, user_schemas
-from database.database import get_db, get_db_nosql
+from database.database import get_db, get_db_read, get_db_nosql, get_pool_status
+from database import slow_queries
 from database.models import Gasto, Orden, OrdenProducto, Producto, Categoria
 from services.auth_services import get_current_admin_user
+from services import catalog_services, metrics_services, order_services, llm_usage, request_profiler
+from services.scheduler import scheduler
+from utils import metrics
+from utils.pagination import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, STREAM_BATCH_SIZE,
+    parse_fields, parse_int_cursor, parse_keyset_cursor, keyset_cursor, ndjson_response,
+)
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
 from pymongo.database import Database
 from bson import ObjectId
+from bson.errors import InvalidId
 
 router = APIRouter(
     prefix="/api/admin",
@@ -15,13 +29,91 @@ router = APIRouter(
     dependencies=[Depends(get_current_admin_user)]
 )
 
+# --- Helpers de listados paginados ---
+
+# Columnas que se pueden pedir con `fields` en cada listado. El id siempre se incluye
+# porque es parte de la clave del cursor (junto con la fecha por la que se ordena).
+GASTO_COLUMNAS = {
+    "id": Gasto.id,
+    "descripcion": Gasto.descripcion,
+    "monto": Gasto.monto,
+    "categoria": Gasto.categoria,
+    "fecha": Gasto.fecha,
+}
+ORDEN_COLUMNAS = {
+    "id": Orden.id,
+    "user_id": Orden.user_id,
+    "total": Orden.total,
+    "creado_en": Orden.creado_en,
+}
+USUARIO_CAMPOS = {"_id", "email", "name", "last_name", "phone", "role"}
+
+
+async def _listar_sql(db: AsyncSession, columnas: dict, orden: str, filtros: list, cursor: Optional[str],
+                      limit: int, fields: Optional[str], stream: bool):
+    """
+    Listado por cursor (keyset sobre (`orden`, id), de más nuevo a más viejo) que solo
+    selecciona las columnas pedidas. Los filtros de rango van sobre la misma columna
+    `orden`, así el rango y el keyset usan un único índice compuesto (`orden`, id).
+    En modo `stream` devuelve todas las filas como NDJSON.
+    """
+    campos = parse_fields(fields, columnas.keys())
+    id_columna, orden_columna = columnas["id"], columnas[orden]
+    seleccion = [col for nombre, col in columnas.items() if campos is None or nombre in campos or nombre in ("id", orden)]
+    # La columna de orden se trae siempre para armar el cursor, pero solo se devuelve si se pidió
+    ocultar_orden = campos is not None and orden not in campos
+
+    query = select(*seleccion).where(*filtros)
+    ultimo = parse_keyset_cursor(cursor, orden_columna.type.python_type)
+    if ultimo is not None:
+        valor, last_id = ultimo
+        query = query.where(or_(orden_columna < valor, and_(orden_columna == valor, id_columna < last_id)))
+    query = query.order_by(orden_columna.desc(), id_columna.desc())
+
+    def item(row) -> dict:
+        fila = dict(row)
+        if ocultar_orden:
+            del fila[orden]
+        return fila
+
+    if stream:
+        async def filas():
+            try:
+                result = await db.stream(query.execution_options(yield_per=STREAM_BATCH_SIZE))
+                async for row in result.mappings():
+                    yield item(row)
+            finally:
+                await db.close()
+        return ndjson_response(filas())
+
+    # Pedimos una fila de más para saber si hay otra página sin hacer un COUNT
+    result = await db.execute(query.limit(limit + 1))
+    rows = result.mappings().all()
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = keyset_cursor(rows[limit - 1][orden].isoformat(), rows[limit - 1]["id"])
+    # jsonable_encoder pasa los DECIMAL a float (si no, Pydantic los serializa como string)
+    items = jsonable_encoder([item(row) for row in rows[:limit]])
+    return admin_schemas.Pagina(items=items, next_cursor=next_cursor)
+
 # --- Endpoints de Gastos ---
 
-@router.get("/expenses", response_model=List[admin_schemas.Gasto])
-async def get_expenses(db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Gasto))
-    expenses = result.scalars().all()
-    return expenses
+@router.get("/expenses", response_model=admin_schemas.Pagina)
+async def get_expenses(
+    db: AsyncSession = Depends(get_db_read),
+    cursor: Optional[str] = Query(None, description="Cursor devuelto por la página anterior"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Cantidad de gastos por página"),
+    desde: Optional[date] = Query(None, description="Fecha mínima del gasto (inclusive)"),
+    hasta: Optional[date] = Query(None, description="Fecha máxima del gasto (inclusive)"),
+    fields: Optional[str] = Query(None, description="Campos a devolver separados por coma (ej: 'id,monto,fecha')"),
+    stream: bool = Query(False, description="Devuelve todos los gastos filtrados como NDJSON en streaming"),
+):
+    filtros = []
+    if desde:
+        filtros.append(Gasto.fecha >= desde)
+    if hasta:
+        filtros.append(Gasto.fecha <= hasta)
+    return await _listar_sql(db, GASTO_COLUMNAS, "fecha", filtros, cursor, limit, fields, stream)
 
 @router.post("/expenses", response_model=admin_schemas.Gasto, status_code=201)
 async def create_expense(gasto: admin_schemas.GastoCreate, db: AsyncSession = Depends(get_db)):
@@ -33,11 +125,42 @@ async def create_expense(gasto: admin_schemas.GastoCreate, db: AsyncSession = De
 
 # --- Endpoints de Ventas ---
 
-@router.get("/sales")
-async def get_sales(db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Orden))
-    sales = result.scalars().all()
-    return sales
+@router.get("/sales", response_model=admin_schemas.Pagina)
+async def get_sales(
+    db: AsyncSession = Depends(get_db_read),
+    cursor: Optional[str] = Query(None, description="Cursor devuelto por la página anterior"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Cantidad de ventas por página"),
+    desde: Optional[date] = Query(None, description="Fecha mínima de la venta (inclusive)"),
+    hasta: Optional[date] = Query(None, description="Fecha máxima de la venta (inclusive)"),
+    fields: Optional[str] = Query(None, description="Campos a devolver separados por coma (ej: 'id,total')"),
+    stream: bool = Query(False, description="Devuelve todas las ventas filtradas como NDJSON en streaming"),
+):
+    filtros = []
+    if desde:
+        filtros.append(Orden.creado_en >= desde)
+    if hasta:
+        # creado_en es un TIMESTAMP: comparamos contra el inicio del día siguiente
+        filtros.append(Orden.creado_en < hasta + timedelta(days=1))
+    return await _listar_sql(db, ORDEN_COLUMNAS, "creado_en", filtros, cursor, limit, fields, stream)
+
+@router.get("/sales/detail", response_model=admin_schemas.PaginaOrdenes)
+async def get_sales_detail(
+    db: AsyncSession = Depends(get_db_read),
+    cursor: Optional[str] = Query(None, description="Cursor devuelto por la página anterior"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Cantidad de ventas por página"),
+    user_id: Optional[str] = Query(None, description="Filtrar por usuario"),
+    desde: Optional[date] = Query(None, description="Fecha mínima de la venta (inclusive)"),
+    hasta: Optional[date] = Query(None, description="Fecha máxima de la venta (inclusive)"),
+):
+    """Ventas con sus productos, cargadas en una cantidad fija de consultas."""
+    filtros = []
+    if user_id:
+        filtros.append(Orden.user_id == user_id)
+    if desde:
+        filtros.append(Orden.creado_en >= desde)
+    if hasta:
+        filtros.append(Orden.creado_en < hasta + timedelta(days=1))
+    return await order_services.list_orders_with_details(db, filtros, parse_int_cursor(cursor), limit)
 
 @router.post("/sales", status_code=201)
 async def create_manual_sale(sale_data: admin_schemas.ManualSaleCreate, db: AsyncSession = Depends(get_db)):
@@ -58,6 +181,7 @@ async def create_manual_sale(sale_data: admin_schemas.ManualSaleCreate, db: Asyn
 
     await db.commit()
     await db.refresh(new_order)
+    metrics_services.mark_product_metrics_stale()
     return {"message": "Venta manual registrada exitosamente", "order_id": new_order.id}
 
 # --- Endpoints de Productos ---
@@ -68,6 +192,7 @@ async def create_product(product: product_schemas.ProductCreate, db: AsyncSessio
     db.add(db_product)
     await db.commit()
     await db.refresh(db_product)
+    catalog_services.invalidate_catalog()
     return db_product
 
 @router.put("/products/{product_id}", response_model=product_schemas.Product)
@@ -82,6 +207,7 @@ async def update_product(product_id: int, product: product_schemas.ProductUpdate
     
     await db.commit()
     await db.refresh(db_product)
+    catalog_services.invalidate_catalog()
     return db_product
 
 @router.delete("/products/{product_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -93,17 +219,113 @@ async def delete_product(product_id: int, db: AsyncSession = Depends(get_db)):
     
     await db.delete(db_product)
     await db.commit()
+    catalog_services.invalidate_catalog()
     return
 
+@router.post("/products/import", response_model=product_schemas.BulkReport)
+async def import_products(
+    file: UploadFile = File(..., description="Archivo CSV (con encabezado) o NDJSON con un producto por fila"),
+    formato: Optional[str] = Query(None, pattern="^(csv|ndjson)$", description="Formato del archivo. Si no se indica, se deduce de la extensión"),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Importa o actualiza productos en masa (upsert por SKU). Las filas se procesan en bloques,
+    cada bloque en su propia transacción, y se devuelve un reporte con los errores por fila.
+    """
+    if formato is None:
+        nombre = (file.filename or "").lower()
+        if nombre.endswith(".csv") or file.content_type == "text/csv":
+            formato = "csv"
+        elif nombre.endswith((".ndjson", ".jsonl")) or file.content_type == "application/x-ndjson":
+            formato = "ndjson"
+        else:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No se pudo deducir el formato del archivo (csv o ndjson)")
+
+    rows = catalog_services.iter_import_rows(file.file, formato)
+    return await catalog_services.bulk_upsert_products(db, rows)
+
+@router.patch("/products/bulk", response_model=product_schemas.BulkReport)
+async def bulk_update_products(items: List[product_schemas.ProductBulkPatchItem], db: AsyncSession = Depends(get_db)):
+    """Actualiza precio y/o stock de muchos productos a la vez, identificándolos por SKU."""
+    return await catalog_services.bulk_patch_products(db, items)
+
 # --- Endpoints de Usuarios ---
 
-@router.get("/users", response_model=List[user_schemas.UserOut])
-async def get_users(db: Database = Depends(get_db_nosql)):
-    users_cursor = db.users.find({})
-    users = []
-    async for user in users_cursor:
-        users.append(user_schemas.UserOut(**user))
-    return users
+@router.get("/users", response_model=admin_schemas.Pagina)
+async def get_users(
+    db: Database = Depends(get_db_nosql),
+    cursor: Optional[str] = Query(None, description="Cursor devuelto por la página anterior"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Cantidad de usuarios por página"),
+    role: Optional[str] = Query(None, description="Filtrar por rol (ej: 'admin', 'user')"),
+    fields: Optional[str] = Query(None, description="Campos a devolver separados por coma (ej: 'email,role')"),
+    stream: bool = Query(False, description="Devuelve todos los usuarios filtrados como NDJSON en streaming"),
+):
+    campos = parse_fields(fields, USUARIO_CAMPOS) or USUARIO_CAMPOS
+    # Proyección explícita: nunca sacamos el hashed_password de la base
+    projection = {campo: 1 for campo in campos}
+
+    filtro = {}
+    if role:
+        filtro["role"] = role
+    if cursor:
+        try:
+            filtro["_id"] = {"$lt": ObjectId(cursor)}
+        except InvalidId:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor inválido")
+
+    # De más nuevo a más viejo, como los listados SQL (el _id lleva el momento de creación).
+    # Usa el índice (role, _id) creado por `python -m database.migrate`, recorrido al revés
+    users_cursor = db.users.find(filtro, projection).sort("_id", -1)
+
+    if stream:
+        async def documentos():
+            async for user in users_cursor.batch_size(STREAM_BATCH_SIZE):
+                user["_id"] = str(user["_id"])
+                yield user
+        return ndjson_response(documentos())
+
+    users = await users_cursor.limit(limit + 1).to_list(length=limit + 1)
+    for user in users:
+        user["_id"] = str(user["_id"])
+    next_cursor = users[limit - 1]["_id"] if len(users) > limit else None
+    return admin_schemas.Pagina(items=users[:limit], next_cursor=next_cursor)
+
+@router.put("/users/roles", response_model=user_schemas.BulkRoleUpdateResult)
+async def bulk_update_user_roles(payload: user_schemas.BulkRoleUpdate, db: Database = Depends(get_db_nosql)):
+    """Asigna roles a muchos usuarios en un único bulk_write (un solo round trip a Mongo)."""
+    operaciones = []
+    user_ids = []
+    invalid_ids = []
+    for asignacion in payload.asignaciones:
+        try:
+            object_id = ObjectId(asignacion.user_id)
+        except InvalidId:
+            invalid_ids.append(asignacion.user_id)
+            continue
+        operaciones.append(UpdateOne({"_id": object_id}, {"$set": {"role": asignacion.role}}))
+        user_ids.append(asignacion.user_id)
+
+    if not operaciones:
+        return user_schemas.BulkRoleUpdateResult(matched=0, modified=0, invalid_ids=invalid_ids)
+
+    # ordered=False: Mongo puede aplicar las operaciones en paralelo y un error no frena al resto.
+    # Si alguna falla, bulk_write levanta BulkWriteError pero las demás ya quedaron aplicadas.
+    try:
+        result = await db.users.bulk_write(operaciones, ordered=False)
+    except BulkWriteError as e:
+        detalle = e.details
+        return user_schemas.BulkRoleUpdateResult(
+            matched=detalle.get("nMatched", 0),
+            modified=detalle.get("nModified", 0),
+            invalid_ids=invalid_ids,
+            errors=[
+                user_schemas.BulkRoleUpdateError(user_id=user_ids[error["index"]], detail=error.get("errmsg", ""))
+                for error in detalle.get("writeErrors", [])
+            ],
+        )
+    return user_schemas.BulkRoleUpdateResult(
+        matched=result.matched_count, modified=result.modified_count, invalid_ids=invalid_ids
+    )
 
 @router.put("/users/{user_id}", response_model=user_schemas.UserOut)
 async def update_user_role(user_id: str, user_update: user_schemas.UserUpdateRole, db: Database = Depends(get_db_nosql)):
@@ -112,22 +334,22 @@ async def update_user_role(user_id: str, user_update: user_schemas.UserUpdateRol
     except Exception:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="ID de usuario inválido")
 
-    user = await db.users.find_one({"_id": object_id})
-    if not user:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Usuario no encontrado")
-
-    await db.users.update_one(
+    # Un solo round trip: actualiza y devuelve el documento ya modificado
+    updated_user = await db.users.find_one_and_update(
         {"_id": object_id},
-        {"$set": {"role": user_update.role}}
+        {"$set": {"role": user_update.role}},
+        return_document=ReturnDocument.AFTER,
     )
+    if not updated_user:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Usuario no encontrado")
 
-    updated_user = await db.users.find_one({"_id": object_id})
+    updated_user["_id"] = str(updated_user["_id"])
     return user_schemas.UserOut(**updated_user)
 
 # --- Endpoints de Métricas y Gráficos ---
 
 @router.get("/metrics/kpis", response_model=metrics_schemas.KPIMetrics)
-async def get_kpis(db: AsyncSession = Depends(get_db), db_nosql: Database = Depends(get_db_nosql)):
+async def get_kpis(db: AsyncSession = Depends(get_db_read), db_nosql: Database = Depends(get_db_nosql)):
     total_revenue_result = await db.execute(select(func.sum(Orden.total)))
     total_revenue = total_revenue_result.scalar_one_or_none() or 0.0
 
@@ -150,42 +372,80 @@ async def get_kpis(db: AsyncSession = Depends(get_db), db_nosql: Database = Depe
     )
 
 @router.get("/metrics/products", response_model=metrics_schemas.ProductMetrics)
-async def get_product_metrics(db: AsyncSession = Depends(get_db)):
-    most_sold_product_result = await db.execute(
-        select(Producto.nombre, func.sum(OrdenProducto.cantidad).label("total_sold"))
-        .join(OrdenProducto, Producto.id == OrdenProducto.producto_id)
-        .group_by(Producto.nombre)
-        .order_by(func.sum(OrdenProducto.cantidad).desc())
-        .limit(1)
-    )
-    most_sold_product_data = most_sold_product_result.first()
-    most_sold_product_name = most_sold_product_data.nombre if most_sold_product_data else None
-
-    product_with_most_stock_result = await db.execute(
-        select(Producto.nombre)
-        .order_by(Producto.stock.desc())
-        .limit(1)
-    )
-    product_with_most_stock_name = product_with_most_stock_result.scalar_one_or_none()
-
-    category_with_most_products_result = await db.execute(
-        select(Categoria.nombre, func.count(Producto.id).label("product_count"))
-        .join(Producto, Categoria.id == Producto.categoria_id)
-        .group_by(Categoria.nombre)
-        .order_by(func.count(Producto.id).desc())
-        .limit(1)
-    )
-    category_with_most_products_data = category_with_most_products_result.first()
-    category_with_most_products_name = category_with_most_products_data.nombre if category_with_most_products_data else None
+async def get_product_metrics(
+    db: AsyncSession = Depends(get_db_read),
+    refresh: bool = Query(False, description="Fuerza el recálculo en lugar de usar el cache"),
+):
+    """
+    Métricas de productos servidas desde un cache en memoria que refresca una tarea de fondo.
+    Con `refresh=true` se recalculan en el momento.
+    """
+    return await metrics_services.get_product_metrics(db, force_refresh=refresh)
+
+@router.get("/metrics/llm", response_model=metrics_schemas.LLMUsageSummary)
+async def get_llm_usage():
+    """
+    Uso del LLM por canal (chat/email): llamadas, errores por clase, tokens y costo estimados,
+    latencia por tamaño de prompt y cuántos caracteres aporta cada parte del prompt.
+    Incluye el detalle de las últimas llamadas.
+    """
+    return llm_usage.summary()
+
+@router.get("/metrics/pool")
+async def get_pool_metrics():
+    """
+    Configuración y uso de los pools de conexiones SQL y MongoDB. Los tiempos de espera
+    por una conexión están en /metrics/internal?prefix=db_pool_ (y mongo_pool_).
+    """
+    return get_pool_status()
+
+@router.get("/metrics/slow-queries", response_model=List[metrics_schemas.SlowQuery])
+async def get_slow_queries():
+    """
+    Las consultas SQL más lentas (las que superaron SLOW_QUERY_THRESHOLD_MS), agrupadas por
+    sentencia normalizada, con la forma de sus parámetros y el plan de ejecución capturado.
+    """
+    return slow_queries.slowest()
+
+@router.get("/scheduler")
+async def get_scheduler_status():
+    """
+    Tareas programadas de este worker: próxima ejecución, resultado y duración de la última,
+    ejecuciones y fallos. Las métricas están en /metrics/internal?prefix=scheduler_.
+    """
+    return scheduler.status()
+
+@router.get("/profiles")
+async def list_profiles():
+    """
+    Perfiles de requests guardados. Para perfilar un request, mandarlo con el header
+    `X-Profile: store` (queda guardado acá) o `X-Profile: inline` (devuelve el reporte).
+    """
+    return request_profiler.list_profiles()
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(
+    profile_id: str,
+    formato: str = Query("texto", pattern="^(texto|pstats)$", description="'pstats' baja el archivo para snakeviz/pstats"),
+):
+    perfil = request_profiler.get_profile(profile_id)
+    if perfil is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Perfil no encontrado")
+    if formato == "pstats":
+        return Response(
+            content=perfil["pstats"],
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="perfil-{profile_id}.pstats"'},
+        )
+    return PlainTextResponse(perfil["reporte"])
 
-    return metrics_schemas.ProductMetrics(
-        most_sold_product=most_sold_product_name,
-        product_with_most_stock=product_with_most_stock_name,
-        category_with_most_products=category_with_most_products_name
-    )
+@router.get("/metrics/internal")
+async def get_internal_metrics(prefix: str = Query("", description="Filtrar métricas por prefijo (ej: 'chatbot_')")):
+    """Métricas internas del proceso (caches, tiempos de reconstrucción, etc.) en formato JSON."""
+    return metrics.snapshot(prefix)
 
 @router.get("/charts/sales-over-time", response_model=metrics_schemas.SalesOverTimeChart)
-async def get_sales_over_time(db: AsyncSession = Depends(get_db)):
+async def get_sales_over_time(db: AsyncSession = Depends(get_db_read)):
     sales_data = await db.execute(
         select(
             func.date(Orden.creado_en).label("fecha"),
@@ -198,7 +458,7 @@ async def get_sales_over_time(db: AsyncSession = Depends(get_db)):
     return metrics_schemas.SalesOverTimeChart(data=result)
 
 @router.get("/charts/expenses-by-category", response_model=metrics_schemas.ExpensesByCategoryChart)
-async def get_expenses_by_category(db: AsyncSession = Depends(get_db)):
+async def get_expenses_by_category(db: AsyncSession = Depends(get_db_read)):
     expenses_data = await db.execute(
         select(
             Gasto.categoria,
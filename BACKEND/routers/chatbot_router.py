@@ -1,12 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+import anyio
+import json
 import logging
 
 from schemas import chatbot_schemas
-from services import ia_services as ia_service
-from database.database import get_db
-from database.models import ConversacionIA
+from services import ia_services as ia_service, response_cache, conversation_writer, chat_gate
+from services.llm_client import LLMUnavailableError, LLMTimeoutError
+from database.database import get_db, get_db_read
 
 router = APIRouter(prefix="/api/chatbot", tags=["Chatbot"])
 
@@ -14,54 +17,175 @@ router = APIRouter(prefix="/api/chatbot", tags=["Chatbot"])
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+async def _preparar_conversacion(query: chatbot_schemas.ChatQuery, db: AsyncSession, read_db: AsyncSession):
+    """
+    Pasos comunes a la consulta normal y a la consulta en streaming: carga el historial,
+    registra la pregunta y arma el prompt de sistema con el catálogo (leído con `read_db`).
+    """
+    # 1. Buscar los últimos turnos de esta sesión (y el resumen de los anteriores) en nuestra DB SQL
+    resumen, db_history = await ia_service.load_history_window(db, query.sesion_id)
+    if db.new or db.dirty:
+        # Cambió el resumen (salieron turnos de la ventana): es la única escritura síncrona
+        await db.commit()
+
+    # No es necesario añadir la pregunta actual a db_history para build_gemini_history,
+    # ya que la nueva pregunta se pasa por separado a get_gemini_response.
+
+    # 2. Construimos el historial en el formato que le gusta a Gemini
+    gemini_history = ia_service.build_gemini_history(db_history, resumen)
+
+    # 3. Obtenemos los productos relevantes del catálogo y el prompt del sistema
+    dynamic_catalog = await ia_service.get_catalog_context_for_query(read_db, query.pregunta, gemini_history, primary_db=db)
+    system_prompt = ia_service.get_chatbot_system_prompt()
+    full_system_prompt = f"{system_prompt}\n\n{dynamic_catalog}"
+
+    # 4. Registramos la pregunta actual ANTES de llamar a la IA, para no perder el prompt
+    #    del usuario si la IA falla. Va al buffer de escritura diferida, que la guarda
+    #    en segundo plano junto con otros turnos cuando esté la respuesta.
+    nueva_conversacion = conversation_writer.start_turn(query.sesion_id, query.pregunta)
+
+    return nueva_conversacion, full_system_prompt, gemini_history
+
+def _saturado(e: chat_gate.ChatOverloadedError) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="El chatbot está recibiendo demasiadas consultas. Probá de nuevo en unos segundos.",
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
+async def _responder(query: chatbot_schemas.ChatQuery, db: AsyncSession, read_db: AsyncSession) -> str:
+    """Arma la conversación, consulta a la IA y deja el turno listo para guardarse."""
+    nueva_conversacion = None
+    respuesta_ia = ""
+    try:
+        nueva_conversacion, full_system_prompt, gemini_history = await _preparar_conversacion(query, db, read_db)
+
+        # 5. Obtenemos la respuesta de Gemini, enviando solo la pregunta nueva.
+        #    Si es el primer turno la respuesta no depende del historial y puede salir del cache.
+        respuesta_ia = await ia_service.get_gemini_response(
+            full_system_prompt, gemini_history, query.pregunta, use_cache=not gemini_history
+        )
+        return respuesta_ia
+    finally:
+        # 6. El turno queda listo para guardarse (con la respuesta vacía si algo falló)
+        if nueva_conversacion is not None:
+            nueva_conversacion.complete(respuesta_ia)
+
 @router.post("/query", response_model=chatbot_schemas.ChatResponse)
-async def handle_chat_query(query: chatbot_schemas.ChatQuery, db: AsyncSession = Depends(get_db)):
+async def handle_chat_query(
+    query: chatbot_schemas.ChatQuery,
+    db: AsyncSession = Depends(get_db),
+    read_db: AsyncSession = Depends(get_db_read),
+):
     """
     Gestiona una consulta del usuario al chatbot, se comunica con la IA
-    y guarda el historial de la conversación.
+    y guarda el historial de la conversación. Las consultas de una misma sesión se
+    atienden de a una; si la misma pregunta ya está en curso se devuelve esa respuesta.
+    Responde 429 (con Retry-After) si el chatbot está saturado.
     """
     try:
-        # 1. Buscar el historial previo de esta sesión en nuestra DB SQL
-        result = await db.execute(
-            select(ConversacionIA)
-            .filter(ConversacionIA.sesion_id == query.sesion_id)
-            .order_by(ConversacionIA.creado_en)
-        )
-        db_history = result.scalars().all()
-
-        # 2. Guardamos la pregunta actual del usuario en la DB ANTES de llamar a la IA.
-        #    Esto es una buena práctica para no perder el prompt del usuario si la IA falla.
-        nueva_conversacion = ConversacionIA(
-            sesion_id=query.sesion_id,
-            prompt=query.pregunta,
-            respuesta=""  # La respuesta queda vacía por ahora
-        )
-        db.add(nueva_conversacion)
-        await db.commit()
-        await db.refresh(nueva_conversacion)
-        
-        # Añadimos la pregunta actual al historial que usaremos para la consulta
-        # No es necesario añadirla a db_history para build_gemini_history, ya que la nueva pregunta
-        # se pasa por separado a get_gemini_response.
-
-        # 3. Obtenemos el catálogo de productos y el prompt del sistema
-        dynamic_catalog = await ia_service.get_catalog_from_db(db)
-        system_prompt = ia_service.get_chatbot_system_prompt()
-        full_system_prompt = f"{system_prompt}\n\n{dynamic_catalog}"
-
-        # 4. Construimos el historial en el formato que le gusta a Gemini
-        gemini_history = ia_service.build_gemini_history(db_history)
-
-        # 5. Obtenemos la respuesta de Gemini, enviando solo la pregunta nueva
-        respuesta_ia = ia_service.get_gemini_response(full_system_prompt, gemini_history, query.pregunta)
-
-        # 6. Ahora que tenemos la respuesta, actualizamos nuestra DB
-        nueva_conversacion.respuesta = respuesta_ia
-        db.add(nueva_conversacion)
-        await db.commit()
+        ticket = chat_gate.admit()
+    except chat_gate.ChatOverloadedError as e:
+        raise _saturado(e)
+
+    try:
+        respuesta_ia = await chat_gate.join_inflight(query.sesion_id, query.pregunta)
+        if respuesta_ia is None:
+            with chat_gate.lead(query.sesion_id, query.pregunta) as en_curso:
+                async with chat_gate.session_lock(query.sesion_id):
+                    respuesta_ia = await _responder(query, db, read_db)
+                en_curso.set_result(respuesta_ia)
 
         return chatbot_schemas.ChatResponse(respuesta=respuesta_ia)
 
     except Exception as e:
         logger.error(f"Error inesperado en el endpoint del chatbot: {e}")
         raise HTTPException(status_code=500, detail="Ocurrió un error interno en el chatbot.")
+    finally:
+        ticket.release()
+
+def _sse(event: str, data: dict) -> str:
+    """Formatea un evento Server-Sent Events."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@router.post("/query/stream")
+async def handle_chat_query_stream(
+    query: chatbot_schemas.ChatQuery,
+    db: AsyncSession = Depends(get_db),
+    read_db: AsyncSession = Depends(get_db_read),
+):
+    """
+    Igual que /query pero devuelve la respuesta en streaming (Server-Sent Events) a medida
+    que la genera la IA. Eventos: `delta` con cada fragmento, `done` con la respuesta completa
+    o `error`. Si el cliente se desconecta se corta la llamada a la IA
+    y la pregunta queda guardada con la respuesta vacía, igual que si la IA fallara.
+    Si la misma pregunta ya está en curso, su respuesta se manda entera en un solo `delta`.
+    """
+    try:
+        ticket = chat_gate.admit()
+    except chat_gate.ChatOverloadedError as e:
+        raise _saturado(e)
+
+    async def eventos():
+        nueva_conversacion = None
+        stream = None
+        try:
+            respuesta_ia = await chat_gate.join_inflight(query.sesion_id, query.pregunta)
+            if respuesta_ia is not None:
+                yield _sse("delta", {"texto": respuesta_ia})
+                yield _sse("done", {"respuesta": respuesta_ia})
+                return
+
+            with chat_gate.lead(query.sesion_id, query.pregunta) as en_curso:
+                async with chat_gate.session_lock(query.sesion_id):
+                    nueva_conversacion, full_system_prompt, gemini_history = await _preparar_conversacion(query, db, read_db)
+
+                    # En el primer turno la respuesta puede salir del cache: se manda entera en un solo `delta`
+                    use_cache = not gemini_history
+                    cached = response_cache.get(query.pregunta) if use_cache else None
+
+                    fragmentos = []
+                    if cached is not None:
+                        fragmentos.append(cached)
+                        yield _sse("delta", {"texto": cached})
+                    else:
+                        stream = ia_service.stream_gemini_response(full_system_prompt, gemini_history, query.pregunta)
+                        async for fragmento in stream:
+                            fragmentos.append(fragmento)
+                            yield _sse("delta", {"texto": fragmento})
+
+                    respuesta_ia = "".join(fragmentos).strip()
+                    if use_cache and cached is None:
+                        response_cache.put(query.pregunta, respuesta_ia)
+                    nueva_conversacion.complete(respuesta_ia)
+                en_curso.set_result(respuesta_ia)
+            yield _sse("done", {"respuesta": respuesta_ia})
+
+        except LLMUnavailableError:
+            yield _sse("error", {"detail": "Disculpá, el servicio de IA no está disponible en este momento."})
+        except LLMTimeoutError as e:
+            logger.error(f"Timeout al comunicarse con Gemini: {e}")
+            yield _sse("error", {"detail": "Disculpá, estoy tardando más de lo normal en responder. Probá de nuevo en un ratito."})
+        except Exception as e:
+            logger.error(f"Error en el streaming del chatbot: {e}")
+            yield _sse("error", {"detail": "Disculpá, estoy teniendo problemas técnicos para responder en este momento."})
+        finally:
+            # Si no llegó a completarse, el turno se guarda con la respuesta vacía
+            if nueva_conversacion is not None:
+                nueva_conversacion.complete()
+            ticket.release()
+            # Si el cliente se desconectó, Starlette cancela esta tarea: cerramos el stream
+            # de la IA protegidos de la cancelación para no dejar la llamada colgada.
+            with anyio.CancelScope(shield=True):
+                if stream is not None:
+                    await stream.aclose()
+                await db.close()
+                await read_db.close()
+
+    return StreamingResponse(
+        eventos(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Por si el generador nunca llega a ejecutarse, liberamos el lugar igual
+        background=BackgroundTask(ticket.release),
+    )
@@ -1,15 +1,15 @@
 # En backend/routers/checkout_router.py
 
-import mercadopago
 import os
 import logging
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from schemas import cart_schemas
 from database.database import get_db
 from database.models import Orden, OrdenProducto
-from services import email_service
+from services import email_service, metrics_services
 
 router = APIRouter(prefix="/api/checkout", tags=["Checkout"])
 
@@ -17,8 +17,22 @@ router = APIRouter(prefix="/api/checkout", tags=["Checkout"])
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Configura el SDK de Mercado Pago
-sdk = mercadopago.SDK(os.getenv("MERCADOPAGO_TOKEN"))
+# --- SDK de Mercado Pago ---
+# Se crea (e importa) en el primer pago, no al arrancar la app.
+_sdk = None
+
+def get_mp_sdk():
+    """Devuelve el SDK compartido de Mercado Pago, creándolo en el primer uso."""
+    global _sdk
+    if _sdk is None:
+        import mercadopago
+        _sdk = mercadopago.SDK(os.getenv("MERCADOPAGO_TOKEN"))
+    return _sdk
+
+def set_mp_sdk(sdk: Optional[object]) -> None:
+    """Reemplaza el SDK compartido (para tests y benchmarks)."""
+    global _sdk
+    _sdk = sdk
 
 # --- URLs de la aplicación (para desarrollo y producción) ---
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:3000")
@@ -51,7 +65,7 @@ async def create_preference(cart: cart_schemas.Cart):
     }
 
     try:
-        preference_response = sdk.preference().create(preference_data)
+        preference_response = get_mp_sdk().preference().create(preference_data)
         
         if "response" not in preference_response:
             logger.error(f"Error: La respuesta de Mercado Pago no contiene la clave 'response'. Respuesta completa: {preference_response}")
@@ -84,7 +98,7 @@ async def mercadopago_webhook(request: Request, db: AsyncSession = Depends(get_d
             return {"status": "ignored", "reason": "No payment ID"}
 
         try:
-            payment_info_response = sdk.payment().get(payment_id)
+            payment_info_response = get_mp_sdk().payment().get(payment_id)
             payment_info = payment_info_response["response"]
 
             if payment_info["status"] == "approved":
@@ -126,4 +140,5 @@ async def save_order_to_db(payment_info: dict, db: AsyncSession):
         db.add(order_product)
 
     await db.commit()
+    metrics_services.mark_product_metrics_stale()
     logger.info(f"Orden {new_order.id} guardada en la base de datos.")
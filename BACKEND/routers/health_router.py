@@ -1,13 +1,33 @@
 # Contenido para routers/health_router.py (versión con 2 chequeos)
 
+import time
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
 from database.database import check_sql_connection, check_nosql_connection
+from services import health_services
+
+_START = time.monotonic()
 
 router = APIRouter(
     prefix="/health",
     tags=["Health Checks"]
 )
 
+@router.get("/live")
+async def liveness():
+    """El proceso responde. No toca ninguna dependencia: es para el liveness probe."""
+    return {"status": "ok", "uptime_segundos": round(time.monotonic() - _START, 1)}
+
+@router.get("/ready")
+async def readiness():
+    """
+    Chequea SQL, MongoDB, LLM y Mercado Pago en paralelo (cada uno con timeout) y devuelve
+    el estado y la latencia de cada uno. El resultado se cachea unos segundos. Responde 503
+    si falla una dependencia crítica (por defecto, las bases).
+    """
+    resultado = await health_services.readiness()
+    return JSONResponse(resultado, status_code=503 if resultado["status"] == "error" else 200)
+
 @router.get("/db-sql")
 async def check_sql_database():
     """Verifica que la conexión con MySQL funcione."""
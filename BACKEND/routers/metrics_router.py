@@ -0,0 +1,24 @@
+# En BACKEND/routers/metrics_router.py
+
+import os
+import secrets
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, status
+from fastapi.responses import Response
+
+from utils import metrics
+
+# Token opcional para que solo Prometheus pueda leer /metrics. Si no está definido,
+# el endpoint queda abierto (hay que protegerlo en el proxy o en la red).
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get("/metrics", include_in_schema=False)
+async def prometheus_metrics(authorization: Optional[str] = Header(None)):
+    """Todas las métricas del proceso en el formato de texto de Prometheus."""
+    if METRICS_TOKEN and not secrets.compare_digest(authorization or "", f"Bearer {METRICS_TOKEN}"):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token de métricas inválido")
+    return Response(content=metrics.render_prometheus(), media_type=metrics.PROMETHEUS_CONTENT_TYPE)
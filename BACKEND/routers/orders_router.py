@@ -0,0 +1,31 @@
+# En backend/routers/orders_router.py
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+
+from schemas import admin_schemas, user_schemas
+from database.database import get_db
+from database.models import Orden
+from services import order_services
+from services.auth_services import get_current_user
+from utils.pagination import MAX_PAGE_SIZE, parse_int_cursor
+
+router = APIRouter(
+    prefix="/api/orders",
+    tags=["Orders"]
+)
+
+@router.get("/me", response_model=admin_schemas.PaginaOrdenes, summary="Historial de compras del usuario actual")
+async def get_my_orders(
+    db: AsyncSession = Depends(get_db),
+    current_user: user_schemas.UserOut = Depends(get_current_user),
+    cursor: Optional[str] = Query(None, description="Cursor devuelto por la página anterior"),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE, description="Cantidad de órdenes por página"),
+):
+    """
+    Devuelve las órdenes del usuario logueado (de la más nueva a la más vieja),
+    con sus productos, paginadas por cursor.
+    """
+    filtros = [Orden.user_id == current_user.id]
+    return await order_services.list_orders_with_details(db, filtros, parse_int_cursor(cursor), limit)
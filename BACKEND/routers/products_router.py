@@ -6,7 +6,7 @@ from sqlalchemy import select
 from typing import List, Optional
 
 from schemas import product_schemas
-from database.database import get_db
+from database.database import get_db_read
 from database.models import Producto
 
 router = APIRouter(
@@ -16,7 +16,7 @@ router = APIRouter(
 
 @router.get("/", response_model=List[product_schemas.Product])
 async def get_products(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_db_read),
     material: Optional[str] = Query(None, description="Filtrar por material del producto"),
     precio_max: Optional[float] = Query(None, alias="precio", description="Filtrar por precio máximo"),
     categoria_id: Optional[int] = Query(None, description="Filtrar por ID de categoría"),
@@ -64,7 +64,7 @@ async def get_products(
 
 
 @router.get("/{product_id}", response_model=product_schemas.Product)
-async def get_product(product_id: int, db: AsyncSession = Depends(get_db)):
+async def get_product(product_id: int, db: AsyncSession = Depends(get_db_read)):
     """
     Obtiene el detalle de un solo producto por su ID.
     """
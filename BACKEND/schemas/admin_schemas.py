@@ -1,7 +1,7 @@
 # En backend/schemas/admin_schemas.py
 from pydantic import BaseModel
 from datetime import date, datetime
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 class GastoBase(BaseModel):
     descripcion: str
@@ -27,12 +27,39 @@ class ManualSaleCreate(BaseModel):
     total: float
     productos: List[ProductSale]
 
+# Datos mínimos del producto que se muestran en el detalle de una orden
+class ProductoResumen(BaseModel):
+    id: int
+    nombre: str
+    sku: str
+    precio: float
+
+    class Config:
+        from_attributes = True
+
+class OrdenProductoOut(BaseModel):
+    producto_id: Optional[int] = None
+    cantidad: int
+    producto: Optional[ProductoResumen] = None
+
+    class Config:
+        from_attributes = True
+
 class OrdenOut(BaseModel):
     id: int
     user_id: Optional[str]
     total: float
     creado_en: datetime
-    productos: List[ProductSale]
+    productos: List[OrdenProductoOut]
 
     class Config:
         from_attributes = True
+
+class PaginaOrdenes(BaseModel):
+    items: List[OrdenOut]
+    next_cursor: Optional[str] = None
+
+# Página de resultados para los listados del panel de admin (paginación por cursor)
+class Pagina(BaseModel):
+    items: List[Dict[str, Any]]
+    next_cursor: Optional[str] = None
@@ -1,6 +1,6 @@
 # En backend/schemas/cart_schemas.py
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from typing import List, Optional
 from datetime import datetime
 
@@ -20,6 +20,12 @@ class Cart(BaseModel):
     items: List[CartItem] = []
     last_updated: datetime = Field(default_factory=datetime.now)
 
+    # Mongo devuelve el _id como ObjectId
+    @field_validator("id", mode="before")
+    @classmethod
+    def _object_id_to_str(cls, value):
+        return str(value) if value is not None else None
+
     model_config = {
         "populate_by_name": True,
         "arbitrary_types_allowed": True
@@ -1,8 +1,9 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 class ChatQuery(BaseModel):
-    sesion_id: str
-    pregunta: str
+    # Mismos límites que las columnas de conversaciones_ia (VARCHAR(255) y TEXT)
+    sesion_id: str = Field(..., min_length=1, max_length=255)
+    pregunta: str = Field(..., min_length=1, max_length=10_000)
 
 class ChatResponse(BaseModel):
     respuesta: str
\ No newline at end of file
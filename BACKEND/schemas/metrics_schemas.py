@@ -1,6 +1,6 @@
 from pydantic import BaseModel
-from typing import Optional, List
-from datetime import date
+from typing import Any, Optional, List, Dict
+from datetime import date, datetime
 
 class KPIMetrics(BaseModel):
     total_revenue: float
@@ -13,6 +13,7 @@ class ProductMetrics(BaseModel):
     most_sold_product: Optional[str] = None
     product_with_most_stock: Optional[str] = None
     category_with_most_products: Optional[str] = None
+    actualizado_en: Optional[datetime] = None # Cuándo se calcularon (las métricas se sirven desde un cache)
 
 class SalesDataPoint(BaseModel):
     fecha: date
@@ -26,4 +27,46 @@ class ExpensesByCategoryDataPoint(BaseModel):
     monto: float
 
 class ExpensesByCategoryChart(BaseModel):
-    data: List[ExpensesByCategoryDataPoint]
\ No newline at end of file
+    data: List[ExpensesByCategoryDataPoint]
+
+class LLMUsageRecord(BaseModel):
+    """Una llamada al LLM: tamaño del prompt por parte, respuesta, latencia y resultado."""
+    fecha: datetime
+    canal: str  # chat | email
+    modo: str  # completo | streaming
+    prompt_chars: Dict[str, int]  # sistema, catalogo, historial, pregunta
+    prompt_tokens: int
+    respuesta_tokens: int
+    latencia_segundos: float
+    costo_estimado: float
+    error: Optional[str] = None  # clase de la excepción, si falló
+
+class LLMUsageByChannel(BaseModel):
+    canal: str
+    llamadas: int
+    errores: Dict[str, int]
+    prompt_tokens: int
+    respuesta_tokens: int
+    costo_estimado: float
+    latencia_promedio_segundos: float
+    prompt_chars_por_parte: Dict[str, int]
+    latencia_promedio_por_tamano: Dict[str, float]  # tamaño del prompt (en tokens) -> latencia promedio
+
+class LLMUsageSummary(BaseModel):
+    canales: List[LLMUsageByChannel]
+    recientes: List[LLMUsageRecord]
+
+class SlowQuery(BaseModel):
+    """Una sentencia SQL (normalizada) que superó el umbral de consulta lenta."""
+    huella: str
+    sentencia: str
+    operacion: str
+    cantidad: int
+    total_segundos: float
+    promedio_segundos: float
+    max_segundos: float
+    parametros: Any  # tipos de los parámetros, sin valores
+    ultimo_request: Optional[str] = None
+    ultima_vez: datetime
+    explain: Optional[List[Dict[str, Optional[str]]]] = None
+    explain_error: Optional[str] = None
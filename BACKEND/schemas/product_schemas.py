@@ -1,7 +1,7 @@
 # En backend/schemas/product_schemas.py
 
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 
 # Schema base del producto, con los campos comunes
 class ProductBase(BaseModel):
@@ -36,4 +36,28 @@ class Product(ProductBase):
     id: int
 
     class Config:
-        from_attributes = True # Permite que Pydantic lea los datos desde un objeto de SQLAlchemy
\ No newline at end of file
+        from_attributes = True # Permite que Pydantic lea los datos desde un objeto de SQLAlchemy
+
+# --- Schemas para las operaciones masivas del admin ---
+
+# Fila de una importación (CSV/NDJSON). Si no viene la url se arma a partir del SKU.
+class ProductImportRow(ProductCreate):
+    url: Optional[str] = None
+
+# Item del PATCH masivo: se identifica por SKU y solo cambia precio y/o stock
+class ProductBulkPatchItem(BaseModel):
+    sku: str
+    precio: Optional[float] = Field(None, ge=0)
+    stock: Optional[int] = Field(None, ge=0)
+
+class BulkRowError(BaseModel):
+    fila: int
+    sku: Optional[str] = None
+    error: str
+
+# Reporte que devuelven la importación y el PATCH masivo
+class BulkReport(BaseModel):
+    procesados: int = 0
+    insertados: int = 0
+    actualizados: int = 0
+    errores: List[BulkRowError] = []
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional
+from typing import List, Optional
 
 # ¡NUEVO MODELO! Para estructurar el teléfono
 class Phone(BaseModel):
@@ -28,4 +28,23 @@ class Token(BaseModel):
     token_type: str
 
 class UserUpdateRole(BaseModel):
-    role: str
\ No newline at end of file
+    role: str
+
+# Asignación masiva de roles desde el panel de admin
+class UserRoleAssignment(BaseModel):
+    user_id: str
+    role: str
+
+class BulkRoleUpdate(BaseModel):
+    asignaciones: List[UserRoleAssignment] = Field(..., max_length=10_000)
+
+class BulkRoleUpdateError(BaseModel):
+    user_id: str
+    detail: str
+
+class BulkRoleUpdateResult(BaseModel):
+    matched: int
+    modified: int
+    invalid_ids: List[str] = []
+    # Operaciones que Mongo rechazó (las demás se aplicaron igual)
+    errors: List[BulkRoleUpdateError] = []
@@ -1,4 +1,5 @@
 # En backend/services/auth_service.py
+from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
@@ -19,17 +20,27 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Database = D
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    current_user = await get_user_from_token(token, db)
+    if current_user is None:
+        raise credentials_exception
+    return current_user
+
+async def get_user_from_token(token: str, db: Database) -> Optional[user_schemas.UserOut]:
+    """
+    Usuario dueño del token, o None si el token no es válido. Se lee de Mongo en cada request:
+    un cache por proceso dejaría a un usuario degradado con su rol viejo en los demás workers.
+    """
     try:
         payload = jwt.decode(token, security.SECRET_KEY, algorithms=[security.ALGORITHM])
         email: str = payload.get("sub")
         if email is None:
-            raise credentials_exception
+            return None
     except JWTError:
-        raise credentials_exception
+        return None
 
     user = await db.users.find_one({"email": email})
     if user is None:
-        raise credentials_exception
+        return None
     # Convert ObjectId to string for Pydantic validation
     if "_id" in user:
         user["_id"] = str(user["_id"])
@@ -0,0 +1,34 @@
+# En backend/services/cart_services.py
+
+import os
+import logging
+from datetime import datetime, timedelta
+
+from database.database import get_nosql_database
+from utils import metrics
+
+# Los carritos de invitados quedan huérfanos cuando el invitado no vuelve (el ID de sesión
+# vive en su navegador). Los que no se tocan hace más de CART_GUEST_TTL_DAYS se borran.
+# Los carritos de usuarios registrados no vencen.
+CART_GUEST_TTL_DAYS = int(os.getenv("CART_GUEST_TTL_DAYS", 30))
+# Cuándo corre la limpieza (expresión cron, hora local)
+CART_EXPIRY_CRON = os.getenv("CART_EXPIRY_CRON", "30 4 * * *")
+
+logger = logging.getLogger(__name__)
+
+carts_expired_total = metrics.counter("carts_expired_total", "Carritos de invitados borrados por inactividad")
+
+
+async def expire_guest_carts(db, ttl_days: int = CART_GUEST_TTL_DAYS) -> int:
+    """Borra los carritos de invitados sin actividad en los últimos `ttl_days` días. Devuelve cuántos borró."""
+    limite = datetime.now() - timedelta(days=ttl_days)
+    result = await db.carts.delete_many({"guest_session_id": {"$exists": True}, "last_updated": {"$lt": limite}})
+    if result.deleted_count:
+        carts_expired_total.inc(result.deleted_count)
+        logger.info(f"Se borraron {result.deleted_count} carritos de invitados inactivos.")
+    return result.deleted_count
+
+
+async def expire_guest_carts_job() -> None:
+    """Tarea programada (singleton) de vencimiento de carritos."""
+    await expire_guest_carts(get_nosql_database())
@@ -0,0 +1,92 @@
+# En backend/services/catalog_search.py
+
+import re
+import math
+import heapq
+import unicodedata
+from collections import Counter, defaultdict
+from typing import List, Sequence
+
+# Índice de búsqueda BM25 en memoria sobre el catálogo. Se usa para mandarle al chatbot
+# solo los productos relevantes para la pregunta en lugar del catálogo entero.
+
+# Campos que se indexan y cuánto pesa cada uno (el nombre cuenta doble)
+FIELD_WEIGHTS = {"nombre": 2, "descripcion": 1, "material": 1, "color": 1, "talle": 1}
+
+# Palabras vacías en castellano que no aportan a la búsqueda
+STOPWORDS = {
+    "a", "al", "algo", "algun", "alguna", "alguno", "ante", "como", "con", "cual", "cuanto",
+    "de", "del", "donde", "el", "ella", "en", "es", "esta", "este", "esto", "hay", "la", "las",
+    "le", "lo", "los", "me", "mi", "mas", "muy", "no", "o", "para", "pero", "por", "que", "quiero",
+    "se", "si", "sin", "sobre", "su", "sus", "te", "tenes", "tienen", "tiene", "tu", "un", "una",
+    "uno", "unos", "unas", "y", "ya", "yo", "hola", "gracias", "busco", "necesito",
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def strip_accents(text: str) -> str:
+    return "".join(c for c in unicodedata.normalize("NFD", text) if unicodedata.category(c) != "Mn")
+
+
+def _stem(token: str) -> str:
+    # Stemming mínimo para que coincidan singular/plural y masculino/femenino:
+    # "remeras" -> "remer", "negro"/"negras" -> "negr", "pantalones"/"pantalon" -> "pantalon"
+    if len(token) > 3 and token.endswith("s"):
+        token = token[:-1]
+    if len(token) > 3 and token[-1] in "aeo" and token[-2] not in "aeiou":
+        token = token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Pasa a minúsculas, saca acentos y stopwords, y normaliza plurales."""
+    if not text:
+        return []
+    text = strip_accents(text.lower())
+    return [_stem(token) for token in _TOKEN_RE.findall(text) if token not in STOPWORDS]
+
+
+class CatalogIndex:
+    """
+    Índice invertido con puntaje BM25. Para cada término guarda las apariciones por producto,
+    así una búsqueda solo recorre los productos que comparten algún término con la consulta.
+    """
+
+    def __init__(self, products: Sequence, k1: float = 1.5, b: float = 0.75):
+        self.products = list(products)
+        self.k1 = k1
+        self.b = b
+        self._postings = defaultdict(list)  # término -> [(posición del producto, frecuencia ponderada)]
+        self._doc_len = []
+
+        for pos, product in enumerate(self.products):
+            freqs = Counter()
+            for field, weight in FIELD_WEIGHTS.items():
+                for token in tokenize(getattr(product, field, None) or ""):
+                    freqs[token] += weight
+            self._doc_len.append(sum(freqs.values()))
+            for term, tf in freqs.items():
+                self._postings[term].append((pos, tf))
+
+        n = len(self.products)
+        self._avg_len = (sum(self._doc_len) / n) if n else 0.0
+        # IDF de BM25 (variante siempre positiva)
+        self._idf = {term: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5)) for term, p in self._postings.items()}
+
+    def __len__(self):
+        return len(self.products)
+
+    def search(self, query: str, k: int) -> list:
+        """Devuelve hasta `k` productos ordenados por relevancia (vacío si ningún término coincide)."""
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self._idf.get(term)
+            if idf is None:
+                continue
+            for pos, tf in self._postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self._doc_len[pos] / self._avg_len)
+                scores[pos] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [self.products[pos] for pos, _ in best]
@@ -0,0 +1,264 @@
+# En backend/services/catalog_services.py
+
+import io
+import os
+import csv
+import json
+import logging
+from typing import BinaryIO, Callable, Iterable, Iterator, List, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import select, insert, update, bindparam, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import Producto, Categoria
+from schemas import product_schemas
+
+# --- Configuración de logging ---
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Cantidad de filas por statement/transacción en las operaciones masivas
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", 500))
+
+# --- Versión del catálogo ---
+# Cualquier escritura del admin sobre productos incrementa la versión. Los caches
+# que dependen del catálogo se registran con `on_catalog_change` para invalidarse.
+
+# La versión vive en memoria de cada proceso: con varios workers de uvicorn (o el worker de
+# emails aparte) una escritura solo la sube en el proceso que la hizo. Por eso los caches que
+# dependen del catálogo además vencen a los CATALOG_CONTEXT_TTL_SECONDS.
+CATALOG_CONTEXT_TTL_SECONDS = int(os.getenv("CATALOG_CONTEXT_TTL_SECONDS", 300))
+
+_catalog_version = 0
+_listeners: List[Callable[[int], None]] = []
+
+
+def get_catalog_version() -> int:
+    return _catalog_version
+
+
+def on_catalog_change(callback: Callable[[int], None]) -> None:
+    """Registra una función que se llama con la nueva versión cada vez que cambia el catálogo."""
+    _listeners.append(callback)
+
+
+def invalidate_catalog() -> int:
+    """Marca el catálogo como modificado y avisa a los caches registrados."""
+    global _catalog_version
+    _catalog_version += 1
+    for callback in _listeners:
+        try:
+            callback(_catalog_version)
+        except Exception as e:
+            logger.error(f"Error al invalidar un cache del catálogo: {e}")
+    return _catalog_version
+
+
+# --- Operaciones masivas ---
+
+def _chunks(rows: Iterable, size: int = BULK_CHUNK_SIZE):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_import_rows(file: BinaryIO, formato: str) -> Iterator[Tuple[int, dict]]:
+    """
+    Lee un archivo CSV o NDJSON fila por fila (sin cargarlo entero en memoria).
+    Devuelve tuplas (número de fila, dict). Si una línea NDJSON no se puede parsear devuelve None.
+    """
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    try:
+        if formato == "csv":
+            # La fila 1 es el encabezado
+            for fila, row in enumerate(csv.DictReader(text), start=2):
+                yield fila, {k.strip(): (v.strip() or None) if v else None for k, v in row.items() if k}
+        else:
+            for fila, line in enumerate(text, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield fila, json.loads(line)
+                except json.JSONDecodeError:
+                    yield fila, None
+    finally:
+        # No cerramos el archivo subido: eso lo hace FastAPI
+        text.detach()
+
+
+def _update_statement(columnas: List[str]):
+    """UPDATE por SKU pensado para executemany (un set de parámetros por producto)."""
+    tabla = Producto.__table__
+    return (
+        update(tabla)
+        .where(tabla.c.sku == bindparam("b_sku"))
+        .values({**{c: bindparam(f"b_{c}") for c in columnas}, "actualizado_en": func.now()})
+    )
+
+
+async def _upsert_chunk(db: AsyncSession, chunk: List[Tuple[int, dict]], report: product_schemas.BulkReport) -> bool:
+    """
+    Valida categorías y urls y escribe un bloque de filas en una sola transacción: un INSERT
+    multi-fila para los SKUs nuevos y un UPDATE (executemany) para los existentes.
+    Devuelve True si se escribió algo en la base.
+    """
+    # Si el SKU aparece repetido dentro del bloque, gana la última fila
+    por_sku = {}
+    for fila, row in chunk:
+        por_sku[row["sku"]] = (fila, row)
+
+    categoria_ids = {row["categoria_id"] for _, row in por_sku.values()}
+    result = await db.execute(select(Categoria.id).where(Categoria.id.in_(categoria_ids)))
+    categorias_validas = set(result.scalars().all())
+
+    validas = []
+    for fila, row in por_sku.values():
+        if row["categoria_id"] not in categorias_validas:
+            report.errores.append(product_schemas.BulkRowError(
+                fila=fila, sku=row["sku"], error=f"La categoría {row['categoria_id']} no existe"
+            ))
+        else:
+            validas.append((fila, row))
+    if not validas:
+        return False
+
+    skus = [row["sku"] for _, row in validas]
+    result = await db.execute(select(Producto.sku).where(Producto.sku.in_(skus)))
+    existentes = set(result.scalars().all())
+
+    # La url también es única y solo se fija al crear: un producto nuevo no puede usar la url
+    # de otro. (Con un upsert, MySQL actualizaría ese otro producto en lugar de fallar.)
+    nuevas = [(fila, row) for fila, row in validas if row["sku"] not in existentes]
+    result = await db.execute(select(Producto.url, Producto.sku).where(Producto.url.in_({row["url"] for _, row in nuevas})))
+    urls_usadas = dict(result.all())
+    inserts = []
+    for fila, row in nuevas:
+        if row["url"] in urls_usadas:
+            report.errores.append(product_schemas.BulkRowError(
+                fila=fila, sku=row["sku"], error=f"La url '{row['url']}' ya la usa el producto {urls_usadas[row['url']]}"
+            ))
+        else:
+            urls_usadas[row["url"]] = row["sku"]
+            inserts.append(row)
+    updates = [row for _, row in validas if row["sku"] in existentes]
+    escritos = {row["sku"] for row in inserts + updates}
+    if not escritos:
+        return False
+
+    try:
+        if inserts:
+            await db.execute(insert(Producto).values(inserts))
+        if updates:
+            columnas = [c for c in updates[0] if c not in ("sku", "url")]
+            await db.execute(
+                _update_statement(columnas),
+                [{"b_sku": row["sku"], **{f"b_{c}": row[c] for c in columnas}} for row in updates],
+            )
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Error al importar un bloque de productos: {e}")
+        report.errores.extend(
+            product_schemas.BulkRowError(fila=fila, sku=row["sku"], error="Error al guardar el bloque en la base de datos")
+            for fila, row in validas
+            if row["sku"] in escritos
+        )
+        return False
+
+    report.actualizados += len(updates)
+    report.insertados += len(inserts)
+    return True
+
+
+async def bulk_upsert_products(db: AsyncSession, rows: Iterable[Tuple[int, dict]]) -> product_schemas.BulkReport:
+    """
+    Importa productos de a bloques: valida cada fila con `ProductImportRow` y escribe cada
+    bloque (INSERT de los SKUs nuevos, UPDATE de los existentes) en su propia transacción.
+    `rows` es un iterable de (número de fila, dict crudo) para poder reportar errores por fila.
+    """
+    report = product_schemas.BulkReport()
+
+    def validar():
+        for fila, raw in rows:
+            report.procesados += 1
+            if not isinstance(raw, dict):
+                report.errores.append(product_schemas.BulkRowError(fila=fila, error="La fila no es un objeto válido"))
+                continue
+            try:
+                producto = product_schemas.ProductImportRow(**raw)
+            except ValidationError as e:
+                error = e.errors()[0]
+                campo = ".".join(str(loc) for loc in error["loc"])
+                report.errores.append(product_schemas.BulkRowError(
+                    fila=fila, sku=raw.get("sku"), error=f"{campo}: {error['msg']}"
+                ))
+                continue
+            data = producto.model_dump()
+            data["url"] = data["url"] or producto.sku.lower()
+            yield fila, data
+
+    for chunk in _chunks(validar()):
+        if await _upsert_chunk(db, chunk, report):
+            # Una sola invalidación por bloque, no por fila
+            invalidate_catalog()
+
+    return report
+
+
+async def bulk_patch_products(db: AsyncSession, items: List[product_schemas.ProductBulkPatchItem]) -> product_schemas.BulkReport:
+    """
+    Actualiza precio y/o stock por SKU. Las filas se agrupan por los campos que cambian
+    y cada grupo se manda como un único UPDATE con executemany.
+    """
+    report = product_schemas.BulkReport(procesados=len(items))
+
+    for chunk in _chunks(list(enumerate(items, start=1))):
+        skus = [item.sku for _, item in chunk]
+        result = await db.execute(select(Producto.sku).where(Producto.sku.in_(skus)))
+        existentes = set(result.scalars().all())
+
+        grupos = {}
+        aplicadas = []
+        for fila, item in chunk:
+            cambios = item.model_dump(exclude_unset=True, exclude={"sku"})
+            nulos = sorted(c for c, v in cambios.items() if v is None)
+            if nulos:
+                report.errores.append(product_schemas.BulkRowError(
+                    fila=fila, sku=item.sku, error=f"{', '.join(nulos)}: no puede ser null"
+                ))
+            elif item.sku not in existentes:
+                report.errores.append(product_schemas.BulkRowError(fila=fila, sku=item.sku, error="Producto no encontrado"))
+            elif not cambios:
+                report.errores.append(product_schemas.BulkRowError(fila=fila, sku=item.sku, error="No hay campos para actualizar"))
+            else:
+                aplicadas.append((fila, item.sku))
+                grupos.setdefault(tuple(sorted(cambios)), []).append(
+                    {"b_sku": item.sku, **{f"b_{c}": v for c, v in cambios.items()}}
+                )
+
+        if not grupos:
+            continue
+
+        try:
+            for columnas, params in grupos.items():
+                await db.execute(_update_statement(list(columnas)), params)
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Error al actualizar un bloque de productos: {e}")
+            report.errores.extend(
+                product_schemas.BulkRowError(fila=fila, sku=sku, error="Error al guardar el bloque en la base de datos")
+                for fila, sku in aplicadas
+            )
+            continue
+
+        report.actualizados += len(aplicadas)
+        invalidate_catalog()
+
+    return report
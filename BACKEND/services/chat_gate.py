@@ -0,0 +1,133 @@
+# En backend/services/chat_gate.py
+
+import os
+import time
+import asyncio
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from services.llm_client import LLM_MAX_CONCURRENCY
+from services.response_cache import normalize_question
+from utils import metrics
+
+# Control de tráfico del chatbot:
+# - Admisión global: si ya hay demasiadas consultas en curso (la cola del LLM está llena)
+#   se rechaza enseguida con 429 en lugar de encolar sin límite.
+# - Serialización por sesión: las consultas de una misma sesión se atienden de a una, así
+#   el historial no queda intercalado.
+# - Coalescencia: si llega la misma pregunta de la misma sesión mientras la primera sigue
+#   en curso (doble enter, reintento del frontend), se espera esa respuesta en lugar de
+#   hacer otra llamada al LLM.
+CHATBOT_MAX_PENDING = int(os.getenv("CHATBOT_MAX_PENDING", LLM_MAX_CONCURRENCY * 4))
+CHATBOT_RETRY_AFTER_SECONDS = int(os.getenv("CHATBOT_RETRY_AFTER_SECONDS", 5))
+
+# --- Métricas ---
+chatbot_requests_in_progress = metrics.gauge(
+    "chatbot_requests_in_progress", "Consultas al chatbot admitidas y todavía en curso"
+)
+chatbot_rejected_total = metrics.counter(
+    "chatbot_rejected_total", "Consultas al chatbot rechazadas con 429 por saturación"
+)
+chatbot_coalesced_total = metrics.counter(
+    "chatbot_coalesced_total", "Consultas duplicadas que reutilizaron la respuesta de otra en curso"
+)
+chatbot_session_wait_seconds = metrics.histogram(
+    "chatbot_session_wait_seconds", "Espera de una consulta hasta que termina la anterior de su sesión"
+)
+
+
+class ChatOverloadedError(Exception):
+    """Hay demasiadas consultas en curso: el cliente debe reintentar más tarde."""
+
+    def __init__(self, retry_after: int = CHATBOT_RETRY_AFTER_SECONDS):
+        super().__init__("El chatbot está saturado")
+        self.retry_after = retry_after
+
+
+class Ticket:
+    """Lugar ocupado en la admisión global. `release()` se puede llamar más de una vez."""
+
+    def __init__(self):
+        self._released = False
+
+    def release(self) -> None:
+        global _in_progress
+        if not self._released:
+            self._released = True
+            _in_progress -= 1
+            chatbot_requests_in_progress.set(_in_progress)
+
+
+_in_progress = 0
+_session_locks: Dict[str, List] = {}  # sesion_id -> [Lock, consultas usando el lock]
+_inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+
+
+def admit() -> Ticket:
+    """Reserva un lugar para una consulta o lanza ChatOverloadedError si no hay."""
+    global _in_progress
+    if _in_progress >= CHATBOT_MAX_PENDING:
+        chatbot_rejected_total.inc()
+        raise ChatOverloadedError()
+    _in_progress += 1
+    chatbot_requests_in_progress.set(_in_progress)
+    return Ticket()
+
+
+@asynccontextmanager
+async def session_lock(sesion_id: str):
+    """Atiende de a una las consultas de una sesión. El lock se descarta cuando nadie lo usa."""
+    entry = _session_locks.setdefault(sesion_id, [asyncio.Lock(), 0])
+    entry[1] += 1
+    start = time.perf_counter()
+    try:
+        async with entry[0]:
+            chatbot_session_wait_seconds.observe(time.perf_counter() - start)
+            yield
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0:
+            del _session_locks[sesion_id]
+
+
+def _key(sesion_id: str, pregunta: str) -> Tuple[str, str]:
+    return sesion_id, normalize_question(pregunta)
+
+
+async def join_inflight(sesion_id: str, pregunta: str) -> Optional[str]:
+    """
+    Si la misma pregunta de la misma sesión ya está en curso, espera y devuelve su respuesta.
+    Devuelve None si no hay ninguna (o si la que estaba en curso falló): en ese caso hay
+    que responderla con `lead`, sin `await` de por medio.
+    """
+    key = _key(sesion_id, pregunta)
+    while (future := _inflight.get(key)) is not None:
+        try:
+            respuesta = await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if asyncio.current_task().cancelling():
+                raise
+            # La consulta original no terminó: volvemos a mirar (otra pudo tomar la posta)
+            continue
+        chatbot_coalesced_total.inc()
+        return respuesta
+    return None
+
+
+@contextmanager
+def lead(sesion_id: str, pregunta: str):
+    """
+    Registra la pregunta como en curso y devuelve un Future donde hay que dejar la
+    respuesta con `set_result`. Si no se llega a dejar, las consultas duplicadas que
+    estaban esperando la responden por su cuenta.
+    """
+    key = _key(sesion_id, pregunta)
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    try:
+        yield future
+    finally:
+        if not future.done():
+            future.cancel()
+        if _inflight.get(key) is future:
+            del _inflight[key]
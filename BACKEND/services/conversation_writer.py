@@ -0,0 +1,191 @@
+# En backend/services/conversation_writer.py
+
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Deque, List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.exc import DataError, IntegrityError
+
+from database.database import AsyncSessionLocal
+from database.models import ConversacionIA
+from utils import metrics
+
+# --- Configuración de logging ---
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Escritura diferida de los turnos del chatbot: el request deja el turno en un buffer en
+# memoria y una tarea de fondo (lanzada desde el lifespan) los guarda de a lotes con un
+# único INSERT multi-fila. El turno entra al buffer ANTES de llamar a la IA, así la
+# pregunta se guarda aunque la llamada falle; solo espera a tener la respuesta para no
+# tener que hacer un UPDATE después.
+CONVERSATION_FLUSH_INTERVAL_SECONDS = float(os.getenv("CONVERSATION_FLUSH_INTERVAL_SECONDS", 0.5))
+CONVERSATION_FLUSH_BATCH = int(os.getenv("CONVERSATION_FLUSH_BATCH", 100))
+# Tope del buffer: si la base está caída no crece sin límite. Los turnos que no entran no se guardan.
+CONVERSATION_BUFFER_MAX = int(os.getenv("CONVERSATION_BUFFER_MAX", 10_000))
+# Tras esta cantidad de INSERTs de lote fallidos seguidos se prueba de a un turno, para aislar
+# una fila que la base rechaza y no trabar el guardado de todas las sesiones
+CONVERSATION_FLUSH_FALLBACK_AFTER = int(os.getenv("CONVERSATION_FLUSH_FALLBACK_AFTER", 3))
+
+# --- Métricas ---
+flush_batch_size = metrics.histogram(
+    "conversation_flush_batch_size", "Turnos del chatbot guardados por cada INSERT",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500),
+)
+flush_lag_seconds = metrics.histogram(
+    "conversation_flush_lag_seconds", "Tiempo entre que un turno queda completo y se guarda en la base"
+)
+flush_errors_total = metrics.counter(
+    "conversation_flush_errors_total", "Lotes de turnos del chatbot que no se pudieron guardar"
+)
+buffer_pending = metrics.gauge(
+    "conversation_buffer_pending", "Turnos del chatbot en el buffer esperando a guardarse"
+)
+turns_dropped_total = metrics.counter(
+    "conversation_turns_dropped_total", "Turnos del chatbot que no se guardaron", ["motivo"]
+)
+
+
+class PendingTurn:
+    """Turno del chatbot todavía no guardado. Tiene los mismos campos que usa el historial."""
+    id = None
+
+    def __init__(self, sesion_id: str, prompt: str):
+        self.sesion_id = sesion_id
+        self.prompt = prompt
+        self.respuesta = ""
+        self.completado_en: Optional[float] = None
+
+    def complete(self, respuesta: str = "") -> None:
+        """Marca el turno como listo para guardarse (con respuesta vacía si la IA falló)."""
+        if self.completado_en is None:
+            self.respuesta = respuesta or ""
+            self.completado_en = time.perf_counter()
+            if len(_buffer) >= CONVERSATION_FLUSH_BATCH:
+                _flush_needed.set()
+
+    def as_row(self) -> dict:
+        # Sin creado_en: lo pone la base (server_default), con el mismo reloj que el resto de las
+        # filas. El orden de los turnos de un lote lo desempata el id.
+        return {
+            "sesion_id": self.sesion_id,
+            "prompt": self.prompt,
+            "respuesta": self.respuesta,
+        }
+
+
+_buffer: Deque[PendingTurn] = deque()
+_flush_needed = asyncio.Event()
+_flush_lock = asyncio.Lock()
+_session_factory = AsyncSessionLocal
+_consecutive_failures = 0
+
+
+def set_session_factory(factory) -> None:
+    """Reemplaza la fábrica de sesiones con la que se guardan los lotes (para tests)."""
+    global _session_factory
+    _session_factory = factory
+
+
+def start_turn(sesion_id: str, prompt: str) -> PendingTurn:
+    """Agrega la pregunta al buffer. Hay que llamar a `complete()` cuando termine la IA."""
+    turno = PendingTurn(sesion_id, prompt)
+    if len(_buffer) >= CONVERSATION_BUFFER_MAX:
+        # El turno se usa igual en el request, pero no se va a guardar
+        turns_dropped_total.inc(motivo="buffer_lleno")
+        logger.warning(f"Buffer de turnos lleno ({CONVERSATION_BUFFER_MAX}): el turno de la sesión {sesion_id} no se guardará")
+        return turno
+    _buffer.append(turno)
+    buffer_pending.set(len(_buffer))
+    return turno
+
+
+def pending(sesion_id: str) -> List[PendingTurn]:
+    """Turnos completos de la sesión que todavía no llegaron a la base, en orden cronológico."""
+    return [turno for turno in _buffer if turno.sesion_id == sesion_id and turno.completado_en is not None]
+
+
+async def _insert_one_by_one(lote: List[PendingTurn]) -> List[PendingTurn]:
+    """
+    Guarda los turnos de a uno. Los que la base rechaza por sus datos se descartan; ante
+    cualquier otro error (p. ej. la base no responde) se corta y el resto queda en el buffer.
+    Devuelve los turnos que salen del buffer (guardados o descartados).
+    """
+    resueltos = []
+    for turno in lote:
+        try:
+            async with _session_factory() as db:
+                await db.execute(insert(ConversacionIA), [turno.as_row()])
+                await db.commit()
+        except (DataError, IntegrityError) as e:
+            turns_dropped_total.inc(motivo="rechazado")
+            logger.error(f"Turno de la sesión {turno.sesion_id[:50]!r} descartado, la base lo rechazó: {e}")
+        except Exception as e:
+            logger.error(f"Error al guardar los turnos del chatbot de a uno: {e}")
+            break
+        resueltos.append(turno)
+    return resueltos
+
+
+async def flush(include_incomplete: bool = False) -> int:
+    """
+    Guarda en la base los turnos completos del buffer con un único INSERT multi-fila.
+    Con `include_incomplete` también guarda los que siguen esperando a la IA (con la
+    respuesta vacía), para el apagado. Si el INSERT falla los turnos quedan en el buffer
+    y se reintentan en la próxima vuelta; si la base rechaza los datos del lote, o tras
+    CONVERSATION_FLUSH_FALLBACK_AFTER fallos seguidos, se guardan de a uno para aislar la
+    fila problemática. Devuelve la cantidad de turnos que salieron del buffer.
+    """
+    global _consecutive_failures
+    async with _flush_lock:
+        lote = [turno for turno in _buffer if include_incomplete or turno.completado_en is not None]
+        if not lote:
+            return 0
+
+        try:
+            async with _session_factory() as db:
+                await db.execute(insert(ConversacionIA), [turno.as_row() for turno in lote])
+                await db.commit()
+            _consecutive_failures = 0
+        except Exception as e:
+            flush_errors_total.inc()
+            _consecutive_failures += 1
+            logger.error(f"Error al guardar {len(lote)} turnos del chatbot: {e}")
+            if not isinstance(e, (DataError, IntegrityError)) and _consecutive_failures < CONVERSATION_FLUSH_FALLBACK_AFTER:
+                return 0
+            lote = await _insert_one_by_one(lote)
+            if not lote:
+                return 0
+            _consecutive_failures = 0
+
+        guardados = set(map(id, lote))
+        for _ in range(len(_buffer)):
+            turno = _buffer.popleft()
+            if id(turno) not in guardados:
+                _buffer.append(turno)
+
+        ahora = time.perf_counter()
+        flush_batch_size.observe(len(lote))
+        for turno in lote:
+            flush_lag_seconds.observe(ahora - (turno.completado_en or ahora))
+        buffer_pending.set(len(_buffer))
+        return len(lote)
+
+
+async def conversation_flusher(interval: float = CONVERSATION_FLUSH_INTERVAL_SECONDS):
+    """
+    Tarea de fondo (lanzada desde el lifespan) que vacía el buffer cada `interval` segundos,
+    o antes si se juntan CONVERSATION_FLUSH_BATCH turnos. Al apagar, el lifespan la cancela
+    y llama a `flush(include_incomplete=True)` para no perder nada.
+    """
+    while True:
+        try:
+            await asyncio.wait_for(_flush_needed.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
+        _flush_needed.clear()
+        await flush()
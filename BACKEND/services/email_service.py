@@ -11,6 +11,7 @@ EMAIL_SENDER = os.getenv("EMAIL_SENDER")
 EMAIL_PASSWORD = os.getenv("EMAIL_APP_PASSWORD")
 SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.gmail.com")
 SMTP_PORT = int(os.getenv("SMTP_PORT", 587))
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "true").lower() == "true"
 
 async def send_order_confirmation_email(payment_info: dict):
     """
@@ -50,7 +51,7 @@ async def send_order_confirmation_email(payment_info: dict):
             message,
             hostname=SMTP_SERVER,
             port=SMTP_PORT,
-            start_tls=True,
+            start_tls=SMTP_STARTTLS,
             username=EMAIL_SENDER,
             password=EMAIL_PASSWORD,
         )
@@ -72,7 +73,7 @@ async def send_plain_email(receiver_email: str, subject: str, body: str):
             message,
             hostname=SMTP_SERVER,
             port=SMTP_PORT,
-            start_tls=True,
+            start_tls=SMTP_STARTTLS,
             username=EMAIL_SENDER,
             password=EMAIL_PASSWORD,
         )
@@ -0,0 +1,116 @@
+# En backend/services/health_services.py
+
+import os
+import time
+import asyncio
+import logging
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Optional
+
+from sqlalchemy import text
+
+from database.database import engine, get_mongo_client
+from utils import metrics
+
+# Chequeo de "readiness": corre en paralelo los chequeos de cada dependencia, cada uno con
+# su timeout, y cachea el resultado unos segundos. Así los probes del orquestador (que pueden
+# llegar varias veces por segundo desde varios nodos) no golpean las bases en cada llamada:
+# mientras un chequeo está en curso, los demás pedidos esperan ese mismo resultado.
+HEALTH_CHECK_TIMEOUT_SECONDS = float(os.getenv("HEALTH_CHECK_TIMEOUT_SECONDS", 2))
+HEALTH_CACHE_SECONDS = float(os.getenv("HEALTH_CACHE_SECONDS", 5))
+# Si falla alguno de estos la instancia no está lista (503). Si falla otro, queda "degradado"
+# pero sigue recibiendo tráfico: sin LLM o sin pagos la tienda sigue andando.
+HEALTH_CRITICAL_CHECKS = set(filter(None, os.getenv("HEALTH_CRITICAL_CHECKS", "sql,mongo").split(",")))
+
+logger = logging.getLogger(__name__)
+
+health_check_seconds = metrics.histogram(
+    "health_check_seconds", "Duración de cada chequeo de dependencia", ["check", "resultado"]
+)
+health_check_up = metrics.gauge("health_check_up", "1 si el último chequeo de la dependencia salió bien", ["check"])
+
+
+async def check_sql() -> None:
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+
+async def check_mongo() -> None:
+    await get_mongo_client().admin.command("ping")
+
+
+# Los chequeos del LLM y de pagos solo miran la configuración: no llaman al servicio (cuesta
+# plata y latencia) ni crean el cliente, porque importar los SDK (~0,7 s) bloquearía el event
+# loop sin que el timeout lo pueda cortar.
+async def check_llm() -> Optional[str]:
+    from services.llm_client import configured_backend
+
+    return configured_backend()
+
+
+async def check_payments() -> None:
+    if not os.getenv("MERCADOPAGO_TOKEN"):
+        raise RuntimeError("Falta MERCADOPAGO_TOKEN")
+
+
+CHECKS: Dict[str, Callable[[], Awaitable[Optional[str]]]] = {
+    "sql": check_sql,
+    "mongo": check_mongo,
+    "llm": check_llm,
+    "pagos": check_payments,
+}
+
+_cache: Optional[dict] = None
+_cache_time = 0.0
+_lock = asyncio.Lock()
+
+
+async def _run_check(nombre: str, check) -> dict:
+    start = time.perf_counter()
+    resultado = {"status": "ok", "critico": nombre in HEALTH_CRITICAL_CHECKS}
+    try:
+        detalle = await asyncio.wait_for(check(), timeout=HEALTH_CHECK_TIMEOUT_SECONDS)
+        if detalle:
+            resultado["detalle"] = detalle
+    except asyncio.TimeoutError:
+        resultado.update(status="timeout", detalle=f"Sin respuesta en {HEALTH_CHECK_TIMEOUT_SECONDS:g} s")
+    except Exception as e:
+        resultado.update(status="error", detalle=f"{type(e).__name__}: {e}")
+    segundos = time.perf_counter() - start
+    resultado["latencia_ms"] = round(segundos * 1000, 2)
+    health_check_seconds.observe(segundos, check=nombre, resultado=resultado["status"])
+    health_check_up.set(1 if resultado["status"] == "ok" else 0, check=nombre)
+    if resultado["status"] != "ok":
+        logger.warning("Chequeo de %s: %s (%s)", nombre, resultado["status"], resultado["detalle"])
+    return resultado
+
+
+async def _run_all() -> dict:
+    nombres = list(CHECKS)
+    resultados = await asyncio.gather(*(_run_check(nombre, CHECKS[nombre]) for nombre in nombres))
+    checks = dict(zip(nombres, resultados))
+    fallidos = {nombre for nombre, r in checks.items() if r["status"] != "ok"}
+    if fallidos & HEALTH_CRITICAL_CHECKS:
+        status = "error"
+    elif fallidos:
+        status = "degradado"
+    else:
+        status = "ok"
+    return {"status": status, "chequeado_en": datetime.now().isoformat(timespec="seconds"), "checks": checks}
+
+
+async def readiness() -> dict:
+    """Resultado de los chequeos, desde el cache si tiene menos de HEALTH_CACHE_SECONDS."""
+    global _cache, _cache_time
+    async with _lock:
+        edad = time.monotonic() - _cache_time
+        if _cache is not None and edad < HEALTH_CACHE_SECONDS:
+            return {**_cache, "cacheado": True, "edad_segundos": round(edad, 2)}
+        _cache = await _run_all()
+        _cache_time = time.monotonic()
+        return {**_cache, "cacheado": False, "edad_segundos": 0.0}
+
+
+def reset_cache() -> None:
+    global _cache, _cache_time
+    _cache, _cache_time = None, 0.0
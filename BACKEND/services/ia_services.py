@@ -1,11 +1,18 @@
 import os
+import time
+import asyncio
 import logging
-import google.generativeai as genai
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from dotenv import load_dotenv
 
-from database.models import Producto, ConversacionIA
+from database.database import AsyncSessionLocal, get_read_sessionmaker
+from database.models import Producto, ConversacionIA, ResumenConversacionIA
+from services import catalog_services, conversation_writer, llm_usage, response_cache
+from services.catalog_search import CatalogIndex
+from services.llm_client import get_llm_client, LLMUnavailableError, LLMTimeoutError
+from services.scheduler import scheduler
+from utils import metrics
 
 load_dotenv()
 
@@ -13,42 +20,167 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# --- Configuración de Gemini ---
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-GEMINI_MODEL = os.getenv("GEMINI_MODEL", 'gemini-1.5-flash')
+# --- Cache del catálogo para los prompts ---
+# El catálogo (filas, texto renderizado e índice de búsqueda) se arma una sola vez y se
+# reutiliza mientras no cambie la versión del catálogo (ver catalog_services). El TTL es un
+# resguardo para procesos que no ven las invalidaciones en memoria (otros workers de uvicorn,
+# el worker de emails); está en catalog_services porque el cache de respuestas también lo usa.
+CATALOG_CONTEXT_TTL_SECONDS = catalog_services.CATALOG_CONTEXT_TTL_SECONDS
 
-model = None
-if not GEMINI_API_KEY:
-    logger.error("¡ERROR FATAL! No se encontró la GEMINI_API_KEY en el archivo .env")
-else:
-    try:
-        genai.configure(api_key=GEMINI_API_KEY)
-        model = genai.GenerativeModel(GEMINI_MODEL)
-    except Exception as e:
-        logger.error(f"Error al configurar el modelo de Gemini: {e}")
+# CHATBOT_CATALOG_MODE: "retrieval" (solo los productos relevantes) o "full" (catálogo entero)
+CHATBOT_CATALOG_MODE = os.getenv("CHATBOT_CATALOG_MODE", "retrieval")
+CHATBOT_CATALOG_TOP_K = int(os.getenv("CHATBOT_CATALOG_TOP_K", 8))
+# Cuántas preguntas previas del usuario se suman a la búsqueda (para repreguntas tipo "¿y en negro?")
+CHATBOT_RETRIEVAL_HISTORY_TURNS = int(os.getenv("CHATBOT_RETRIEVAL_HISTORY_TURNS", 2))
+
+_catalog_context = {"version": None, "built_at": 0.0, "products": [], "text": None, "index": None}
+_catalog_lock = asyncio.Lock()
+
+catalog_rebuilds_total = metrics.counter(
+    "chatbot_catalog_rebuilds_total", "Cantidad de veces que se reconstruyó el catálogo para los prompts"
+)
+catalog_rebuild_seconds = metrics.histogram(
+    "chatbot_catalog_rebuild_seconds", "Tiempo de reconstrucción del catálogo para los prompts"
+)
+catalog_context_chars = metrics.gauge(
+    "chatbot_catalog_context_chars", "Tamaño en caracteres del catálogo que se manda en los prompts"
+)
+catalog_retrieved_products = metrics.histogram(
+    "chatbot_catalog_retrieved_products", "Productos incluidos en el prompt en modo retrieval",
+    buckets=(0, 1, 2, 4, 8, 16, 32, 64)
+)
+
+# --- Ventana de historial del chatbot ---
+# Al modelo solo se le mandan los últimos N turnos de la sesión; los anteriores se van
+# plegando en un resumen acumulado guardado en la base, así el costo por turno no crece.
+CHATBOT_HISTORY_TURNS = int(os.getenv("CHATBOT_HISTORY_TURNS", 6))
+CHATBOT_SUMMARY_MAX_CHARS = int(os.getenv("CHATBOT_SUMMARY_MAX_CHARS", 2000))
+# Máximo de turnos viejos que se pliegan al resumen en un mismo request
+CHATBOT_SUMMARY_BATCH = 4
 
 # --- Funciones del servicio ---
 
+def render_catalog(products) -> str:
+    """Arma el texto del catálogo a partir de filas con nombre, precio, descripción y atributos."""
+    if not products:
+        return "No hay productos disponibles en este momento."
+
+    lines = ["--- INICIO DEL CATÁLOGO DE PRODUCTOS DISPONIBLES ---"]
+    for prod in products:
+        line = f"- PRODUCTO: {prod.nombre} | PRECIO: ${prod.precio} | DESCRIPCIÓN: {prod.descripcion}"
+        for label, value in (("MATERIAL", getattr(prod, "material", None)), ("COLOR", getattr(prod, "color", None)), ("TALLE", getattr(prod, "talle", None))):
+            if value:
+                line += f" | {label}: {value}"
+        lines.append(line)
+    lines.append("--- FIN DEL CATÁLOGO ---")
+    return "\n".join(lines)
+
+async def _load_products(db: AsyncSession):
+    # Solo las columnas que van al prompt o al índice de búsqueda. Es una lectura pura:
+    # los llamadores pasan una sesión de `get_db_read` (la réplica, si hay una)
+    result = await db.execute(
+        select(Producto.id, Producto.nombre, Producto.precio, Producto.descripcion,
+               Producto.material, Producto.color, Producto.talle)
+    )
+    return result.all()
+
 async def get_catalog_from_db(db: AsyncSession) -> str:
     """
     Obtiene el catálogo de productos desde la base de datos SQL y arma un texto descriptivo.
     """
     try:
-        result = await db.execute(select(Producto))
-        products = result.scalars().all()
-        
-        if not products:
-            return "No hay productos disponibles en este momento."
-
-        catalog_string = "--- INICIO DEL CATÁLOGO DE PRODUCTOS DISPONIBLES ---\n"
-        for prod in products:
-            catalog_string += f"- PRODUCTO: {prod.nombre} | PRECIO: ${prod.precio} | DESCRIPCIÓN: {prod.descripcion}\n"
-        catalog_string += "--- FIN DEL CATÁLOGO ---"
-        return catalog_string
+        return render_catalog(await _load_products(db))
     except Exception as e:
         logger.error(f"Error al obtener el catálogo de la base de datos: {e}")
         return "Error al obtener el catálogo."
 
+def _catalog_is_fresh(cached: dict, version: int) -> bool:
+    return cached["version"] == version and time.monotonic() - cached["built_at"] < CATALOG_CONTEXT_TTL_SECONDS
+
+async def _get_catalog_snapshot(db: AsyncSession, force: bool = False, primary_db: AsyncSession = None):
+    """
+    Devuelve el catálogo cacheado (filas, texto e índice), reconstruyéndolo solo si cambió
+    la versión del catálogo, venció el TTL o se pide con `force`. Devuelve None si no se
+    pudo leer la base.
+    `db` puede ser una sesión de la réplica; si la versión avanzó desde la última
+    reconstrucción (hubo una escritura), se lee de `primary_db`: la réplica puede no tener
+    el cambio todavía y quedaría cacheado con la versión nueva hasta que venza el TTL.
+    """
+    version = catalog_services.get_catalog_version()
+    cached = _catalog_context
+    if not force and _catalog_is_fresh(cached, version):
+        return cached
+
+    async with _catalog_lock:
+        # Otro request pudo haberlo reconstruido mientras esperábamos el lock
+        version = catalog_services.get_catalog_version()
+        if not force and _catalog_is_fresh(cached, version):
+            return cached
+
+        if primary_db is not None and version and cached["version"] != version:
+            db = primary_db
+        start = time.perf_counter()
+        try:
+            products = await _load_products(db)
+        except Exception as e:
+            logger.error(f"Error al obtener el catálogo de la base de datos: {e}")
+            return None
+
+        text = render_catalog(products)
+        index = CatalogIndex(products)
+        catalog_rebuild_seconds.observe(time.perf_counter() - start)
+        catalog_rebuilds_total.inc()
+        catalog_context_chars.set(len(text))
+        cached.update(version=version, built_at=time.monotonic(), products=products, text=text, index=index)
+        return cached
+
+async def warm_catalog_cache() -> None:
+    """
+    Tarea programada que reconstruye el catálogo antes de que venza (cada la mitad del TTL)
+    y apenas cambia, así ninguna consulta al chatbot paga la reconstrucción.
+    """
+    # La sesión del primario solo se conecta si hace falta (ver _get_catalog_snapshot)
+    async with (await get_read_sessionmaker())() as db, AsyncSessionLocal() as primary_db:
+        if await _get_catalog_snapshot(db, force=True, primary_db=primary_db) is None:
+            raise RuntimeError("No se pudo leer el catálogo de la base")
+
+# Con el catálogo cambiado, se adelanta la reconstrucción en segundo plano
+catalog_services.on_catalog_change(lambda _version: scheduler.trigger("catalogo_chatbot"))
+
+async def get_catalog_context(db: AsyncSession, primary_db: AsyncSession = None) -> str:
+    """
+    Devuelve el catálogo completo ya renderizado para los prompts (cacheado por versión).
+    Lo comparten el chatbot y el worker de emails.
+    """
+    snapshot = await _get_catalog_snapshot(db, primary_db=primary_db)
+    if snapshot is None:
+        return "Error al obtener el catálogo."
+    return snapshot["text"]
+
+async def get_catalog_context_for_query(
+    db: AsyncSession, pregunta: str, history_lines: list[str] = (), primary_db: AsyncSession = None
+) -> str:
+    """
+    Devuelve solo la parte del catálogo relevante para la pregunta (y las últimas preguntas
+    del historial), así el tamaño del prompt no crece con el catálogo. Si el catálogo es chico
+    o CHATBOT_CATALOG_MODE=full, devuelve el catálogo completo.
+    """
+    snapshot = await _get_catalog_snapshot(db, primary_db=primary_db)
+    if snapshot is None:
+        return "Error al obtener el catálogo."
+    if CHATBOT_CATALOG_MODE == "full" or len(snapshot["products"]) <= CHATBOT_CATALOG_TOP_K:
+        return snapshot["text"]
+
+    previas = [line[len("Usuario: "):] for line in history_lines if line.startswith("Usuario: ")]
+    consulta = " ".join(previas[-CHATBOT_RETRIEVAL_HISTORY_TURNS:] + [pregunta]) if CHATBOT_RETRIEVAL_HISTORY_TURNS else pregunta
+
+    products = snapshot["index"].search(consulta, CHATBOT_CATALOG_TOP_K)
+    catalog_retrieved_products.observe(len(products))
+    if not products:
+        # Saludos o preguntas generales: mandamos una muestra acotada del catálogo
+        products = snapshot["products"][:CHATBOT_CATALOG_TOP_K]
+    return render_catalog(products)
+
 def get_chatbot_system_prompt() -> str:
     """
     Define la personalidad y reglas del chatbot.
@@ -64,12 +196,72 @@ def get_chatbot_system_prompt() -> str:
         "5. Si el cliente te saluda, responde el saludo amablemente y preguntale en qué podés ayudarlo.\n"
     )
 
-def build_gemini_history(db_history: list[ConversacionIA]) -> list[str]:
+def _recortar(texto: str, limite: int) -> str:
+    texto = " ".join((texto or "").split())
+    return texto if len(texto) <= limite else texto[:limite - 3] + "..."
+
+def fold_into_summary(resumen: str, turnos: list[ConversacionIA]) -> str:
+    """
+    Agrega turnos al resumen acumulado (versión extractiva: pregunta y respuesta recortadas).
+    Si el resumen supera CHATBOT_SUMMARY_MAX_CHARS se descartan las líneas más viejas.
+    """
+    lines = [resumen] if resumen else []
+    for turno in turnos:
+        line = f"- Usuario: {_recortar(turno.prompt, 200)}"
+        if turno.respuesta:
+            line += f" / Jarvis: {_recortar(turno.respuesta, 200)}"
+        lines.append(line)
+
+    texto = "\n".join(lines)
+    if len(texto) > CHATBOT_SUMMARY_MAX_CHARS:
+        texto = texto[-CHATBOT_SUMMARY_MAX_CHARS:]
+        texto = texto[texto.find("\n") + 1:] if "\n" in texto else texto
+    return texto
+
+async def load_history_window(db: AsyncSession, sesion_id: str):
+    """
+    Trae los últimos CHATBOT_HISTORY_TURNS turnos de la sesión (usando el índice
+    (sesion_id, creado_en)), sumando los que siguen en el buffer de escritura diferida,
+    y el resumen de los anteriores. Los turnos que acaban de salir de la ventana se pliegan
+    al resumen; el cambio queda en la sesión de la DB y lo guarda quien llame.
+    Devuelve (resumen o None, turnos en orden cronológico).
+    """
+    result = await db.execute(
+        select(ConversacionIA)
+        .filter(ConversacionIA.sesion_id == sesion_id)
+        .order_by(ConversacionIA.creado_en.desc(), ConversacionIA.id.desc())
+        .limit(CHATBOT_HISTORY_TURNS + CHATBOT_SUMMARY_BATCH)
+    )
+    turnos = list(reversed(result.scalars().all())) + conversation_writer.pending(sesion_id)
+    window = turnos[-CHATBOT_HISTORY_TURNS:]
+    if len(turnos) <= CHATBOT_HISTORY_TURNS:
+        # Ningún turno salió todavía de la ventana: no puede haber resumen
+        return None, window
+
+    resumen = await db.get(ResumenConversacionIA, sesion_id)
+    ultimo_id = resumen.ultimo_id if resumen else 0
+    # Solo se pliegan turnos ya guardados (los del buffer todavía no tienen id)
+    pendientes = sorted(
+        (turno for turno in turnos[:-CHATBOT_HISTORY_TURNS] if turno.id is not None and turno.id > ultimo_id),
+        key=lambda turno: turno.id,
+    )
+    if pendientes:
+        if resumen is None:
+            resumen = ResumenConversacionIA(sesion_id=sesion_id, resumen="", ultimo_id=0)
+            db.add(resumen)
+        resumen.resumen = fold_into_summary(resumen.resumen, pendientes)
+        resumen.ultimo_id = pendientes[-1].id
+
+    return (resumen.resumen if resumen else None), window
+
+def build_gemini_history(db_history: list[ConversacionIA], resumen: str | None = None) -> list[str]:
     """
     Construye el historial de texto concatenado a partir del historial guardado en DB.
     Retorna una lista de strings que serán concatenadas para el prompt.
     """
     history_lines = []
+    if resumen:
+        history_lines.append("Resumen de la conversación anterior:\n" + resumen)
     for entry in db_history:
         if entry.prompt:
             history_lines.append("Usuario: " + entry.prompt.strip())
@@ -77,29 +269,83 @@ def build_gemini_history(db_history: list[ConversacionIA]) -> list[str]:
             history_lines.append("Jarvis: " + entry.respuesta.strip())
     return history_lines
 
-def get_gemini_response(system_instruction: str, gemini_history: list[str], new_question: str) -> str:
-    if not model:
-        return "Disculpá, el servicio de IA no está disponible en este momento."
-    
+def build_prompt(system_instruction: str, gemini_history: list[str], new_question: str) -> str:
+    """Arma el prompt completo: instrucciones + catálogo, historial y la pregunta nueva."""
+    prompt_parts = []
+    if system_instruction:
+        prompt_parts.append(system_instruction)
+
+    prompt_parts.extend(gemini_history)
+    prompt_parts.append(f"Usuario: {new_question}")
+    prompt_parts.append("Jarvis:")
+
+    return "\n".join(prompt_parts)
+
+async def get_gemini_response(
+    system_instruction: str,
+    gemini_history: list[str],
+    new_question: str,
+    use_cache: bool = False,
+    canal: str = "chat",
+) -> str:
+    """
+    Arma el prompt completo y lo manda al LLM a través del cliente asíncrono
+    (con límite de concurrencia y timeout), sin bloquear el event loop.
+    Con `use_cache` (solo para preguntas que no dependen del historial) primero busca la
+    respuesta en el cache de preguntas normalizadas; los mensajes de error nunca se cachean.
+    """
+    if use_cache:
+        cached = response_cache.get(new_question, canal)
+        if cached is not None:
+            return cached
+
+    partes = llm_usage.prompt_parts(get_chatbot_system_prompt(), system_instruction, gemini_history, new_question)
+    start = time.perf_counter()
+    response = ""
+    error = None
     try:
-        # Construir el prompt completo
-        prompt_parts = []
-        if system_instruction:
-            prompt_parts.append(system_instruction)
-        
-        prompt_parts.extend(gemini_history)
-        prompt_parts.append(f"Usuario: {new_question}")
-        prompt_parts.append("Jarvis:")
-        
-        full_prompt = "\n".join(prompt_parts)
+        full_prompt = build_prompt(system_instruction, gemini_history, new_question)
 
         # Enviar el prompt al modelo
-        response = model.generate_content(full_prompt)
+        response = (await get_llm_client().generate(full_prompt)).strip()
 
-        return response.text.strip()
+        if use_cache:
+            response_cache.put(new_question, response)
+        return response
 
+    except LLMUnavailableError as e:
+        error = e
+        return "Disculpá, el servicio de IA no está disponible en este momento."
+    except LLMTimeoutError as e:
+        error = e
+        logger.error(f"Timeout al comunicarse con Gemini: {e}")
+        return "Disculpá, estoy tardando más de lo normal en responder. Probá de nuevo en un ratito."
     except Exception as e:
+        error = e
         logger.error(f"Error al comunicarse con Gemini: {e}")
         return "Disculpá, estoy teniendo problemas técnicos para responder en este momento."
+    finally:
+        llm_usage.record_call(canal, "completo", partes, len(response), time.perf_counter() - start, error)
 
-
+async def stream_gemini_response(system_instruction: str, gemini_history: list[str], new_question: str, canal: str = "chat"):
+    """
+    Versión en streaming de `get_gemini_response`: generador asíncrono con los fragmentos
+    de la respuesta. Los errores se propagan para que el router los informe. El uso se
+    registra al terminar (o al cerrarse el generador si el cliente se desconecta).
+    """
+    partes = llm_usage.prompt_parts(get_chatbot_system_prompt(), system_instruction, gemini_history, new_question)
+    full_prompt = build_prompt(system_instruction, gemini_history, new_question)
+    stream = get_llm_client().stream(full_prompt)
+    start = time.perf_counter()
+    respuesta_chars = 0
+    error = None
+    try:
+        async for fragmento in stream:
+            respuesta_chars += len(fragmento)
+            yield fragmento
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        await stream.aclose()
+        llm_usage.record_call(canal, "streaming", partes, respuesta_chars, time.perf_counter() - start, error)
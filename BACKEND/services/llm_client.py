@@ -0,0 +1,233 @@
+# En backend/services/llm_client.py
+
+import os
+import time
+import asyncio
+import hashlib
+import logging
+from typing import AsyncIterator, Optional
+
+from dotenv import load_dotenv
+
+from utils import metrics
+
+load_dotenv()
+
+# --- Configuración de logging ---
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# --- Configuración del cliente LLM ---
+# LLM_BACKEND: "gemini" (por defecto) o "stub" (respuestas deterministas, sin red, para pruebas de carga)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 8))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", 30))
+LLM_STUB_LATENCY_MS = int(os.getenv("LLM_STUB_LATENCY_MS", 50))
+
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", 'gemini-1.5-flash')
+
+# --- Métricas ---
+llm_queue_wait_seconds = metrics.histogram(
+    "llm_queue_wait_seconds", "Tiempo que espera una llamada al LLM por un lugar libre en el limitador", ["backend"]
+)
+llm_call_seconds = metrics.histogram(
+    "llm_call_seconds", "Latencia de las llamadas al LLM", ["backend", "outcome"]
+)
+llm_calls_total = metrics.counter(
+    "llm_calls_total", "Cantidad de llamadas al LLM por resultado", ["backend", "outcome"]
+)
+llm_first_token_seconds = metrics.histogram(
+    "llm_first_token_seconds", "Tiempo hasta el primer fragmento en las respuestas en streaming", ["backend"]
+)
+llm_in_flight = metrics.gauge(
+    "llm_in_flight", "Llamadas al LLM en curso", ["backend"]
+)
+
+
+class LLMUnavailableError(Exception):
+    """El backend del LLM no está configurado."""
+
+
+class LLMTimeoutError(Exception):
+    """La llamada al LLM superó el timeout configurado."""
+
+
+class GeminiBackend:
+    """Backend real: usa la API asíncrona del SDK de Gemini, sin bloquear el event loop."""
+    name = "gemini"
+
+    def __init__(self, api_key: Optional[str] = GEMINI_API_KEY, model_name: str = GEMINI_MODEL):
+        self.model = None
+        if not api_key:
+            logger.error("¡ERROR FATAL! No se encontró la GEMINI_API_KEY en el archivo .env")
+            return
+        try:
+            # Import diferido: el SDK de Gemini (grpc/protobuf) tarda casi un segundo en importarse
+            # y no hace falta hasta la primera consulta (ni nunca, con el backend stub).
+            import google.generativeai as genai
+            genai.configure(api_key=api_key)
+            self.model = genai.GenerativeModel(model_name)
+        except Exception as e:
+            logger.error(f"Error al configurar el modelo de Gemini: {e}")
+
+    async def generate(self, prompt: str) -> str:
+        if not self.model:
+            raise LLMUnavailableError("El modelo de Gemini no está configurado")
+        response = await self.model.generate_content_async(prompt)
+        return response.text
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        if not self.model:
+            raise LLMUnavailableError("El modelo de Gemini no está configurado")
+        response = await self.model.generate_content_async(prompt, stream=True)
+        async for chunk in response:
+            if chunk.text:
+                yield chunk.text
+
+
+class StubBackend:
+    """
+    Backend local determinista: misma pregunta, misma respuesta, con una latencia fija.
+    Sirve para correr pruebas de carga y benchmarks sin red ni costo.
+    """
+    name = "stub"
+
+    def __init__(self, latency_ms: int = LLM_STUB_LATENCY_MS):
+        self.latency = latency_ms / 1000
+
+    @staticmethod
+    def _question(prompt: str) -> str:
+        # La pregunta nueva es la última línea "Usuario: ..." del prompt
+        for line in reversed(prompt.splitlines()):
+            if line.startswith("Usuario: "):
+                return line[len("Usuario: "):]
+        return prompt[-200:]
+
+    def reply(self, prompt: str) -> str:
+        question = self._question(prompt)
+        digest = hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:8]
+        return f"Respuesta de prueba ({digest}) a: {question[:120]}"
+
+    async def generate(self, prompt: str) -> str:
+        await asyncio.sleep(self.latency)
+        return self.reply(prompt)
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        # Misma respuesta que `generate`, partida en palabras y repartiendo la latencia
+        words = self.reply(prompt).split(" ")
+        for i, word in enumerate(words):
+            await asyncio.sleep(self.latency / len(words))
+            yield word if i == 0 else " " + word
+
+
+class LLMClient:
+    """
+    Cliente asíncrono del LLM: limita la concurrencia con un semáforo, aplica un
+    timeout por llamada y registra tiempo en cola y latencia.
+    """
+
+    def __init__(self, backend, max_concurrency: int = LLM_MAX_CONCURRENCY, timeout: float = LLM_TIMEOUT_SECONDS):
+        self.backend = backend
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def generate(self, prompt: str) -> str:
+        backend = self.backend.name
+        queued_at = time.perf_counter()
+        async with self._semaphore:
+            llm_queue_wait_seconds.observe(time.perf_counter() - queued_at, backend=backend)
+            llm_in_flight.inc(backend=backend)
+            start = time.perf_counter()
+            outcome = "ok"
+            try:
+                return await asyncio.wait_for(self.backend.generate(prompt), timeout=self.timeout)
+            except asyncio.TimeoutError:
+                outcome = "timeout"
+                raise LLMTimeoutError(f"El LLM no respondió en {self.timeout} segundos")
+            except Exception:
+                outcome = "error"
+                raise
+            finally:
+                llm_in_flight.dec(backend=backend)
+                llm_call_seconds.observe(time.perf_counter() - start, backend=backend, outcome=outcome)
+                llm_calls_total.inc(backend=backend, outcome=outcome)
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        """
+        Igual que `generate` pero devuelve los fragmentos a medida que llegan. El lugar en el
+        limitador se mantiene hasta que termina el stream. Si el consumidor deja de iterar
+        (p. ej. se desconectó el cliente), al cerrar este generador se cierra también el stream
+        del backend, así no queda una llamada colgada.
+        """
+        backend = self.backend.name
+        queued_at = time.perf_counter()
+        async with self._semaphore:
+            llm_queue_wait_seconds.observe(time.perf_counter() - queued_at, backend=backend)
+            llm_in_flight.inc(backend=backend)
+            start = time.perf_counter()
+            deadline = start + self.timeout
+            outcome = "ok"
+            chunks = self.backend.stream(prompt)
+            try:
+                first = True
+                while True:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        raise asyncio.TimeoutError()
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), timeout=remaining)
+                    except StopAsyncIteration:
+                        break
+                    if first:
+                        llm_first_token_seconds.observe(time.perf_counter() - start, backend=backend)
+                        first = False
+                    yield chunk
+            except asyncio.TimeoutError:
+                outcome = "timeout"
+                raise LLMTimeoutError(f"El LLM no terminó de responder en {self.timeout} segundos")
+            except (GeneratorExit, asyncio.CancelledError):
+                outcome = "cancelled"
+                raise
+            except Exception:
+                outcome = "error"
+                raise
+            finally:
+                await chunks.aclose()
+                llm_in_flight.dec(backend=backend)
+                llm_call_seconds.observe(time.perf_counter() - start, backend=backend, outcome=outcome)
+                llm_calls_total.inc(backend=backend, outcome=outcome)
+
+
+_client: Optional[LLMClient] = None
+
+
+def get_llm_client() -> LLMClient:
+    """Devuelve el cliente compartido, creándolo en el primer uso según LLM_BACKEND."""
+    global _client
+    if _client is None:
+        backend = StubBackend() if LLM_BACKEND == "stub" else GeminiBackend()
+        _client = LLMClient(backend)
+    return _client
+
+
+def configured_backend() -> str:
+    """
+    Nombre del backend que usa (o usaría) el cliente compartido, sin crearlo: no importa el
+    SDK de Gemini. Lanza LLMUnavailableError si el backend no está configurado.
+    """
+    if _client is not None:
+        if getattr(_client.backend, "model", True) is None:
+            raise LLMUnavailableError("El modelo de Gemini no está configurado")
+        return _client.backend.name
+    if LLM_BACKEND == "stub":
+        return StubBackend.name
+    if not GEMINI_API_KEY:
+        raise LLMUnavailableError("El backend de Gemini no está configurado (falta GEMINI_API_KEY)")
+    return GeminiBackend.name
+
+
+def set_llm_client(client: Optional[LLMClient]) -> None:
+    """Reemplaza el cliente compartido (para tests y benchmarks)."""
+    global _client
+    _client = client
@@ -0,0 +1,160 @@
+# En backend/services/llm_usage.py
+
+import os
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, Optional
+
+from schemas import metrics_schemas
+from utils import metrics
+
+# Instrumentación de uso del LLM: por cada llamada se registra cuánto pesa cada parte del
+# prompt (instrucciones, catálogo, historial, pregunta), el tamaño de la respuesta, la
+# latencia, quién llamó (chat o email) y, si falló, la clase del error. Los tokens son una
+# estimación por caracteres: el cliente del LLM solo devuelve texto.
+LLM_CHARS_PER_TOKEN = float(os.getenv("LLM_CHARS_PER_TOKEN", 4))
+# Precios en USD cada 1000 tokens (por defecto, los de gemini-1.5-flash)
+LLM_COST_INPUT_PER_1K_TOKENS = float(os.getenv("LLM_COST_INPUT_PER_1K_TOKENS", 0.000075))
+LLM_COST_OUTPUT_PER_1K_TOKENS = float(os.getenv("LLM_COST_OUTPUT_PER_1K_TOKENS", 0.0003))
+# Cuántas llamadas individuales se guardan para el endpoint de admin
+LLM_USAGE_RECENT = int(os.getenv("LLM_USAGE_RECENT", 100))
+
+PARTES = ("sistema", "catalogo", "historial", "pregunta")
+# Rangos de tamaño del prompt (en tokens) para comparar latencias
+TAMANOS = ((1000, "<1k"), (4000, "1k-4k"), (16000, "4k-16k"))
+
+# --- Métricas ---
+llm_usage_calls_total = metrics.counter(
+    "llm_usage_calls_total", "Llamadas al LLM por canal y resultado (ok o clase del error)", ["canal", "resultado"]
+)
+llm_usage_prompt_chars_total = metrics.counter(
+    "llm_usage_prompt_chars_total", "Caracteres mandados al LLM por parte del prompt", ["canal", "parte"]
+)
+llm_usage_prompt_tokens = metrics.histogram(
+    "llm_usage_prompt_tokens", "Tokens estimados del prompt por llamada", ["canal"],
+    buckets=(250, 500, 1000, 2000, 4000, 8000, 16000, 32000),
+)
+llm_usage_response_tokens = metrics.histogram(
+    "llm_usage_response_tokens", "Tokens estimados de la respuesta por llamada", ["canal"],
+    buckets=(10, 25, 50, 100, 250, 500, 1000),
+)
+llm_usage_latency_seconds = metrics.histogram(
+    "llm_usage_latency_seconds", "Latencia de las llamadas al LLM por canal y tamaño del prompt", ["canal", "tamano"]
+)
+llm_usage_cost_total = metrics.counter(
+    "llm_usage_cost_total", "Costo estimado en USD de las llamadas al LLM", ["canal"]
+)
+
+_recent: Deque[metrics_schemas.LLMUsageRecord] = deque(maxlen=LLM_USAGE_RECENT)
+
+
+def estimate_tokens(chars: int) -> int:
+    return int(round(chars / LLM_CHARS_PER_TOKEN)) if chars else 0
+
+
+def prompt_size_bucket(tokens: int) -> str:
+    for limite, nombre in TAMANOS:
+        if tokens < limite:
+            return nombre
+    return ">16k"
+
+
+def prompt_parts(system_prompt: str, system_instruction: str, gemini_history: list[str], new_question: str) -> Dict[str, int]:
+    """
+    Caracteres de cada parte del prompt. `system_instruction` es el prompt de sistema
+    seguido del catálogo; lo que sigue a `system_prompt` se cuenta como catálogo.
+    """
+    sistema = len(system_prompt) if system_instruction.startswith(system_prompt) else len(system_instruction)
+    return {
+        "sistema": sistema,
+        "catalogo": len(system_instruction) - sistema,
+        "historial": sum(len(line) for line in gemini_history),
+        "pregunta": len(new_question),
+    }
+
+
+def record_call(
+    canal: str,
+    modo: str,
+    partes: Dict[str, int],
+    respuesta_chars: int,
+    latencia: float,
+    error: Optional[BaseException] = None,
+) -> metrics_schemas.LLMUsageRecord:
+    """Registra una llamada al LLM en las métricas y en la lista de llamadas recientes."""
+    prompt_tokens = estimate_tokens(sum(partes.values()))
+    respuesta_tokens = estimate_tokens(respuesta_chars)
+    costo = (prompt_tokens * LLM_COST_INPUT_PER_1K_TOKENS + respuesta_tokens * LLM_COST_OUTPUT_PER_1K_TOKENS) / 1000
+    resultado = type(error).__name__ if error is not None else "ok"
+
+    llm_usage_calls_total.inc(canal=canal, resultado=resultado)
+    for parte, chars in partes.items():
+        llm_usage_prompt_chars_total.inc(chars, canal=canal, parte=parte)
+    llm_usage_prompt_tokens.observe(prompt_tokens, canal=canal)
+    llm_usage_response_tokens.observe(respuesta_tokens, canal=canal)
+    llm_usage_latency_seconds.observe(latencia, canal=canal, tamano=prompt_size_bucket(prompt_tokens))
+    llm_usage_cost_total.inc(costo, canal=canal)
+
+    registro = metrics_schemas.LLMUsageRecord(
+        fecha=datetime.now(),
+        canal=canal,
+        modo=modo,
+        prompt_chars=partes,
+        prompt_tokens=prompt_tokens,
+        respuesta_tokens=respuesta_tokens,
+        latencia_segundos=round(latencia, 4),
+        costo_estimado=costo,
+        error=None if error is None else resultado,
+    )
+    _recent.append(registro)
+    return registro
+
+
+def summary() -> metrics_schemas.LLMUsageSummary:
+    """Agregados por canal (a partir de las métricas) y las últimas llamadas registradas."""
+    canales: Dict[str, dict] = {}
+
+    def canal_data(canal: str) -> dict:
+        return canales.setdefault(canal, {
+            "canal": canal, "llamadas": 0, "errores": {}, "prompt_tokens": 0, "respuesta_tokens": 0,
+            "costo_estimado": 0.0, "latencia_promedio_segundos": 0.0,
+            "prompt_chars_por_parte": {parte: 0 for parte in PARTES}, "latencia_promedio_por_tamano": {},
+        })
+
+    for labels, value in llm_usage_calls_total.samples():
+        data = canal_data(labels["canal"])
+        data["llamadas"] += int(value)
+        if labels["resultado"] != "ok":
+            data["errores"][labels["resultado"]] = int(value)
+    for labels, value in llm_usage_prompt_chars_total.samples():
+        canal_data(labels["canal"])["prompt_chars_por_parte"][labels["parte"]] = int(value)
+    for labels, value in llm_usage_prompt_tokens.samples():
+        canal_data(labels["canal"])["prompt_tokens"] = int(value["sum"])
+    for labels, value in llm_usage_response_tokens.samples():
+        canal_data(labels["canal"])["respuesta_tokens"] = int(value["sum"])
+    for labels, value in llm_usage_cost_total.samples():
+        canal_data(labels["canal"])["costo_estimado"] = value
+
+    latencias: Dict[str, list] = {}
+    for labels, value in llm_usage_latency_seconds.samples():
+        data = canal_data(labels["canal"])
+        if value["count"]:
+            data["latencia_promedio_por_tamano"][labels["tamano"]] = value["sum"] / value["count"]
+        total = latencias.setdefault(labels["canal"], [0.0, 0])
+        total[0] += value["sum"]
+        total[1] += value["count"]
+    for canal, (suma, cantidad) in latencias.items():
+        canales[canal]["latencia_promedio_segundos"] = suma / cantidad if cantidad else 0.0
+
+    return metrics_schemas.LLMUsageSummary(
+        canales=[metrics_schemas.LLMUsageByChannel(**data) for _, data in sorted(canales.items())],
+        recientes=list(reversed(_recent)),
+    )
+
+
+def reset() -> None:
+    """Borra las llamadas recientes y los agregados (para tests)."""
+    _recent.clear()
+    for metric in (llm_usage_calls_total, llm_usage_prompt_chars_total, llm_usage_prompt_tokens,
+                   llm_usage_response_tokens, llm_usage_latency_seconds, llm_usage_cost_total):
+        metric.reset()
@@ -0,0 +1,115 @@
+# En backend/services/metrics_services.py
+
+import os
+import logging
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.database import AsyncSessionLocal, get_read_sessionmaker
+from database.models import Producto, OrdenProducto, Categoria
+from schemas import metrics_schemas
+from services import catalog_services
+from services.scheduler import scheduler
+
+# --- Configuración de logging ---
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Cada cuánto se recalculan las métricas de productos en segundo plano
+PRODUCT_METRICS_REFRESH_SECONDS = int(os.getenv("PRODUCT_METRICS_REFRESH_SECONDS", 300))
+# Mínimo entre dos recálculos: con checkouts seguidos cada orden pediría un refresco (tres
+# GROUP BY); las que llegan dentro de este intervalo se juntan en uno solo
+PRODUCT_METRICS_MIN_INTERVAL_SECONDS = int(os.getenv("PRODUCT_METRICS_MIN_INTERVAL_SECONDS", 30))
+
+# --- Cache en memoria ---
+# Las métricas se guardan ya calculadas (con su timestamp) para que el endpoint
+# responda sin tocar la base. La tarea programada "metricas_productos" las refresca
+# periódicamente o antes de tiempo cuando se marca el cache como desactualizado.
+_product_metrics: Optional[metrics_schemas.ProductMetrics] = None
+# Hubo una escritura desde el último refresco: el próximo lee del primario, porque la
+# réplica puede no tenerla todavía
+_written_since_refresh = False
+
+
+def mark_product_metrics_stale(*_args) -> None:
+    """
+    Pide a la tarea programada que recalcule las métricas lo antes posible, respetando
+    PRODUCT_METRICS_MIN_INTERVAL_SECONDS desde el último recálculo.
+    """
+    global _written_since_refresh
+    _written_since_refresh = True
+    scheduler.trigger("metricas_productos")
+
+
+# Cualquier cambio en el catálogo (altas, bajas, precios, stock) adelanta el refresco
+catalog_services.on_catalog_change(mark_product_metrics_stale)
+
+
+async def compute_product_metrics(db: AsyncSession) -> metrics_schemas.ProductMetrics:
+    """Calcula las métricas de productos (las 3 consultas de agregación)."""
+    most_sold_product_result = await db.execute(
+        select(Producto.nombre, func.sum(OrdenProducto.cantidad).label("total_sold"))
+        .join(OrdenProducto, Producto.id == OrdenProducto.producto_id)
+        .group_by(Producto.nombre)
+        .order_by(func.sum(OrdenProducto.cantidad).desc())
+        .limit(1)
+    )
+    most_sold_product_data = most_sold_product_result.first()
+    most_sold_product_name = most_sold_product_data.nombre if most_sold_product_data else None
+
+    product_with_most_stock_result = await db.execute(
+        select(Producto.nombre)
+        .order_by(Producto.stock.desc())
+        .limit(1)
+    )
+    product_with_most_stock_name = product_with_most_stock_result.scalar_one_or_none()
+
+    category_with_most_products_result = await db.execute(
+        select(Categoria.nombre, func.count(Producto.id).label("product_count"))
+        .join(Producto, Categoria.id == Producto.categoria_id)
+        .group_by(Categoria.nombre)
+        .order_by(func.count(Producto.id).desc())
+        .limit(1)
+    )
+    category_with_most_products_data = category_with_most_products_result.first()
+    category_with_most_products_name = category_with_most_products_data.nombre if category_with_most_products_data else None
+
+    return metrics_schemas.ProductMetrics(
+        most_sold_product=most_sold_product_name,
+        product_with_most_stock=product_with_most_stock_name,
+        category_with_most_products=category_with_most_products_name,
+        actualizado_en=datetime.now()
+    )
+
+
+async def refresh_product_metrics(db: AsyncSession) -> metrics_schemas.ProductMetrics:
+    """Recalcula las métricas y las guarda en el cache."""
+    global _product_metrics
+    _product_metrics = await compute_product_metrics(db)
+    return _product_metrics
+
+
+async def get_product_metrics(db: AsyncSession, force_refresh: bool = False) -> metrics_schemas.ProductMetrics:
+    """
+    Devuelve las métricas cacheadas. Solo consulta la base si todavía no hay nada
+    calculado (p. ej. justo después del arranque) o si se pide explícitamente.
+    """
+    if _product_metrics is None or force_refresh:
+        return await refresh_product_metrics(db)
+    return _product_metrics
+
+
+async def refresh_product_metrics_job() -> None:
+    """Tarea programada (cada PRODUCT_METRICS_REFRESH_SECONDS) que mantiene las métricas actualizadas."""
+    global _written_since_refresh
+    # Solo lee: va a la réplica si hay una y está al día, salvo justo después de una escritura
+    usar_primario, _written_since_refresh = _written_since_refresh, False
+    try:
+        async with (AsyncSessionLocal if usar_primario else await get_read_sessionmaker())() as db:
+            await refresh_product_metrics(db)
+    except Exception:
+        _written_since_refresh = _written_since_refresh or usar_primario
+        raise
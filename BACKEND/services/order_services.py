@@ -0,0 +1,34 @@
+# En backend/services/order_services.py
+
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from database.models import Orden, OrdenProducto
+from schemas import admin_schemas
+
+
+async def list_orders_with_details(db: AsyncSession, filtros: list, last_id: Optional[int], limit: int) -> admin_schemas.PaginaOrdenes:
+    """
+    Lista órdenes con sus líneas y los productos referenciados, paginando por cursor (id descendente).
+    Con `selectinload` se resuelve todo en 3 consultas fijas (órdenes, líneas, productos),
+    sin importar cuántas órdenes haya en la página: nada de N+1 ni lazy loads en la AsyncSession.
+    """
+    query = (
+        select(Orden)
+        .where(*filtros)
+        .options(selectinload(Orden.productos).selectinload(OrdenProducto.producto))
+        .order_by(Orden.id.desc())
+    )
+    if last_id is not None:
+        query = query.where(Orden.id < last_id)
+
+    # Una fila de más para saber si hay otra página
+    result = await db.execute(query.limit(limit + 1))
+    ordenes = result.scalars().all()
+
+    next_cursor = str(ordenes[limit - 1].id) if len(ordenes) > limit else None
+    items = [admin_schemas.OrdenOut.model_validate(orden) for orden in ordenes[:limit]]
+    return admin_schemas.PaginaOrdenes(items=items, next_cursor=next_cursor)
@@ -0,0 +1,163 @@
+# En backend/services/request_profiler.py
+
+import io
+import os
+import time
+import uuid
+import pstats
+import marshal
+import cProfile
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from database.database import get_nosql_database
+from services import auth_services
+
+# Perfilado bajo demanda de un request puntual en producción. Un admin manda el header
+# `X-Profile: inline` (o `?_profile=inline`) y recibe, en lugar de la respuesta, el reporte
+# de cProfile; con `X-Profile: store` recibe la respuesta normal y el reporte queda guardado
+# para bajarlo desde /api/admin/profiles (el id viene en el header `X-Profile-Id`).
+#
+# Limitaciones: cProfile mide el hilo del event loop, así que el reporte incluye a cualquier
+# otra corrutina que haya corrido mientras tanto, y no ve los endpoints sincrónicos (corren en
+# el threadpool). Se perfila un request a la vez; si ya hay uno en curso se responde normal
+# con `X-Profile: ocupado`.
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", 20))
+PROFILE_TOP_FUNCTIONS = int(os.getenv("PROFILE_TOP_FUNCTIONS", 60))
+
+MODOS = {"inline", "store"}
+_HEADER = b"x-profile"
+_QUERY = b"_profile="
+
+_profiles: "OrderedDict[str, dict]" = OrderedDict()
+_active = False
+
+
+def _requested_mode(scope) -> Optional[str]:
+    for name, value in scope["headers"]:
+        if name == _HEADER:
+            return _parse_mode(value.decode("latin-1"))
+    query = scope.get("query_string", b"")
+    if _QUERY in query:
+        for parte in query.split(b"&"):
+            if parte.startswith(_QUERY):
+                return _parse_mode(parte[len(_QUERY):].decode("latin-1"))
+    return None
+
+
+def _parse_mode(value: str) -> Optional[str]:
+    value = value.strip().lower()
+    if value in ("1", "true"):
+        return "inline"
+    return value if value in MODOS else None
+
+
+async def _is_admin(scope) -> bool:
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer" or not token:
+                return False
+            try:
+                user = await auth_services.get_user_from_token(token.strip(), get_nosql_database())
+            except Exception:
+                return False
+            return user is not None and user.role == "admin"
+    return False
+
+
+def _store(profile_id: str, profiler: cProfile.Profile, scope, status: int, duracion: float) -> dict:
+    salida = io.StringIO()
+    stats = pstats.Stats(profiler, stream=salida)
+    stats.sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+    entry = {
+        "id": profile_id,
+        "fecha": datetime.now(),
+        "metodo": scope["method"],
+        "path": scope["path"],
+        "status": status,
+        "duracion_segundos": round(duracion, 4),
+        "reporte": salida.getvalue(),
+        "pstats": marshal.dumps(stats.stats),
+    }
+    _profiles[entry["id"]] = entry
+    while len(_profiles) > PROFILE_KEEP:
+        _profiles.popitem(last=False)
+    return entry
+
+
+def list_profiles() -> List[dict]:
+    """Los perfiles guardados (sin el contenido), del más nuevo al más viejo."""
+    return [
+        {k: v for k, v in entry.items() if k not in ("reporte", "pstats")}
+        for entry in reversed(_profiles.values())
+    ]
+
+
+def get_profile(profile_id: str) -> Optional[Dict]:
+    return _profiles.get(profile_id)
+
+
+def _with_header(message: dict, name: bytes, value: str) -> dict:
+    return {**message, "headers": list(message.get("headers", [])) + [(name, value.encode("latin-1"))]}
+
+
+class ProfilingMiddleware:
+    """Si el request no pide perfilado, solo se mira un header: no agrega costo a los demás."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        global _active
+        modo = _requested_mode(scope) if scope["type"] == "http" else None
+        if modo is None or not await _is_admin(scope):
+            await self.app(scope, receive, send)
+            return
+
+        if _active:
+            async def send_busy(message):
+                if message["type"] == "http.response.start":
+                    message = _with_header(message, _HEADER, "ocupado")
+                await send(message)
+            await self.app(scope, receive, send_busy)
+            return
+
+        # El id se decide antes de correr el request porque en modo "store" va en los headers
+        profile_id = uuid.uuid4().hex[:12]
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = _with_header(message, b"x-profile-id", profile_id)
+            if modo == "inline":
+                return  # la respuesta se descarta: se reemplaza por el reporte
+            await send(message)
+
+        profiler = cProfile.Profile()
+        _active = True
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.disable()
+            _active = False
+            entry = _store(profile_id, profiler, scope, status, time.perf_counter() - start)
+
+        if modo == "inline":
+            body = entry["reporte"].encode()
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"text/plain; charset=utf-8"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"x-profile-id", profile_id.encode()),
+                    (b"x-profile-status", str(status).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
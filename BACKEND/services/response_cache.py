@@ -0,0 +1,79 @@
+# En backend/services/response_cache.py
+
+import os
+import re
+from typing import Optional
+
+from cachetools import TTLCache
+
+from services import catalog_services
+from services.catalog_search import strip_accents
+from utils import metrics
+
+# Cache de respuestas del chatbot para preguntas que se repiten casi textuales
+# ("¿cuánto tarda el envío?", "¿tienen talle L?"). Solo se usa para preguntas que no
+# dependen del historial (primer turno de una sesión o emails), y la clave incluye la
+# versión del catálogo para no responder con precios o stock viejos.
+# La versión del catálogo es por proceso (otros workers de uvicorn o el worker de emails no
+# ven el cambio), así que el TTL nunca supera el del contexto del catálogo: una respuesta no
+# dura más que el catálogo con el que se generaría de nuevo.
+CHATBOT_RESPONSE_CACHE_SIZE = int(os.getenv("CHATBOT_RESPONSE_CACHE_SIZE", 1000))
+CHATBOT_RESPONSE_CACHE_TTL_SECONDS = min(
+    int(os.getenv("CHATBOT_RESPONSE_CACHE_TTL_SECONDS", 3600)), catalog_services.CATALOG_CONTEXT_TTL_SECONDS
+)
+
+# TTLCache desaloja por LRU cuando se llena y además vence cada entrada por TTL
+_cache: TTLCache = TTLCache(maxsize=CHATBOT_RESPONSE_CACHE_SIZE, ttl=CHATBOT_RESPONSE_CACHE_TTL_SECONDS)
+
+_NON_WORD_RE = re.compile(r"[^a-z0-9]+")
+
+cache_lookups_total = metrics.counter(
+    "chatbot_response_cache_lookups_total", "Búsquedas en el cache de respuestas del chatbot", ["canal", "resultado"]
+)
+cache_hit_ratio = metrics.gauge(
+    "chatbot_response_cache_hit_ratio", "Proporción de aciertos del cache de respuestas del chatbot", ["canal"]
+)
+cache_entries = metrics.gauge(
+    "chatbot_response_cache_entries", "Respuestas guardadas en el cache del chatbot"
+)
+
+
+def normalize_question(pregunta: str) -> str:
+    """Minúsculas, sin acentos, sin signos de puntuación y con los espacios colapsados."""
+    texto = _NON_WORD_RE.sub(" ", strip_accents(pregunta.lower()))
+    return " ".join(texto.split())
+
+
+def _key(pregunta: str):
+    return normalize_question(pregunta), catalog_services.get_catalog_version()
+
+
+def _record(canal: str, resultado: str):
+    cache_lookups_total.inc(canal=canal, resultado=resultado)
+    hits = cache_lookups_total.value(canal=canal, resultado="hit")
+    total = hits + cache_lookups_total.value(canal=canal, resultado="miss")
+    cache_hit_ratio.set(hits / total, canal=canal)
+
+
+def get(pregunta: str, canal: str = "chat") -> Optional[str]:
+    """Devuelve la respuesta cacheada para la pregunta (o None) y registra el acierto/fallo."""
+    respuesta = _cache.get(_key(pregunta))
+    _record(canal, "hit" if respuesta is not None else "miss")
+    return respuesta
+
+
+def put(pregunta: str, respuesta: str) -> None:
+    key = _key(pregunta)
+    if not key[0] or not respuesta:
+        return
+    _cache[key] = respuesta
+    cache_entries.set(len(_cache))
+
+
+def clear(*_args) -> None:
+    _cache.clear()
+    cache_entries.set(0)
+
+
+# Las entradas de versiones viejas del catálogo ya no se pueden usar: liberamos la memoria
+catalog_services.on_catalog_change(clear)
@@ -0,0 +1,377 @@
+# En backend/services/scheduler.py
+
+import os
+import time
+import uuid
+import random
+import socket
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from utils import metrics
+
+# Planificador de tareas periódicas dentro del proceso de la app. Lo arranca y lo frena el
+# lifespan de main.py. Cada tarea corre cada N segundos (`every`) o según una expresión tipo
+# cron (`cron="15 4 * * *"`), con un jitter aleatorio opcional para que los workers no
+# disparen todos a la vez, y con un límite de ejecuciones simultáneas (si la anterior sigue
+# corriendo, la nueva se saltea; si la pidió `trigger`, se corre al terminar la anterior).
+# Las tareas `singleton` corren solo en el worker que tiene el lock de líder (un documento
+# con vencimiento en MongoDB): con varios workers de uvicorn el resto no las ejecuta.
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "true").lower() == "true"
+SCHEDULER_LEADER_TTL_SECONDS = float(os.getenv("SCHEDULER_LEADER_TTL_SECONDS", 30))
+# Al apagar, cuánto se espera a que terminen las tareas en curso antes de cancelarlas
+SCHEDULER_SHUTDOWN_GRACE_SECONDS = float(os.getenv("SCHEDULER_SHUTDOWN_GRACE_SECONDS", 10))
+
+logger = logging.getLogger(__name__)
+
+scheduler_job_runs_total = metrics.counter(
+    "scheduler_job_runs_total", "Ejecuciones de tareas programadas por resultado", ["job", "resultado"]
+)
+scheduler_job_seconds = metrics.histogram(
+    "scheduler_job_seconds", "Duración de cada ejecución de una tarea programada", ["job"]
+)
+scheduler_job_skipped_total = metrics.counter(
+    "scheduler_job_skipped_total", "Ejecuciones salteadas (la anterior seguía en curso o no somos líder)", ["job", "motivo"]
+)
+scheduler_job_running = metrics.gauge("scheduler_job_running", "Ejecuciones en curso de cada tarea", ["job"])
+scheduler_job_last_success = metrics.gauge(
+    "scheduler_job_last_success_timestamp", "Momento (epoch) de la última ejecución exitosa", ["job"]
+)
+scheduler_leader = metrics.gauge("scheduler_leader", "1 si este worker tiene el lock de líder")
+
+
+class CronSchedule:
+    """
+    Expresión cron de cinco campos (minuto, hora, día del mes, mes, día de la semana con
+    0 = domingo). Cada campo acepta `*`, números, rangos `a-b`, listas `a,b` y pasos `*/n`
+    o `a-b/n`. Como en cron, si se restringen el día del mes y el de la semana alcanza
+    con que coincida uno de los dos. Se evalúa en la hora local.
+    """
+
+    _RANGOS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, expression: str):
+        campos = expression.split()
+        if len(campos) != 5:
+            raise ValueError(f"La expresión cron debe tener 5 campos: {expression!r}")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, dias_semana = (
+            self._parse(campo, minimo, maximo) for campo, (minimo, maximo) in zip(campos, self._RANGOS)
+        )
+        self.weekdays = {d % 7 for d in dias_semana}  # 7 también es domingo
+        self._any_day = campos[2] == "*"
+        self._any_weekday = campos[4] == "*"
+
+    @staticmethod
+    def _parse(campo: str, minimo: int, maximo: int) -> set:
+        valores = set()
+        for parte in campo.split(","):
+            rango, _, paso = parte.partition("/")
+            paso = int(paso) if paso else 1
+            if rango == "*":
+                desde, hasta = minimo, maximo
+            elif "-" in rango:
+                desde, hasta = (int(x) for x in rango.split("-", 1))
+            else:
+                desde = hasta = int(rango)
+            if paso < 1 or not minimo <= desde <= hasta <= maximo:
+                raise ValueError(f"Campo cron fuera de rango ({minimo}-{maximo}): {campo!r}")
+            valores.update(range(desde, hasta + 1, paso))
+        return valores
+
+    def _day_matches(self, t: datetime) -> bool:
+        dia = t.day in self.days
+        dia_semana = (t.weekday() + 1) % 7 in self.weekdays
+        if self._any_day or self._any_weekday:
+            return dia and dia_semana
+        return dia or dia_semana
+
+    def next_after(self, after: datetime) -> datetime:
+        """Próximo minuto (posterior a `after`) que cumple la expresión."""
+        t = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limite = t + timedelta(days=5 * 366)
+        while t < limite:
+            if t.month not in self.months:
+                t = (t.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(t):
+                t = t.replace(hour=0, minute=0) + timedelta(days=1)
+            elif t.hour not in self.hours:
+                t = t.replace(minute=0) + timedelta(hours=1)
+            elif t.minute not in self.minutes:
+                t += timedelta(minutes=1)
+            else:
+                return t
+        raise ValueError(f"La expresión cron nunca se cumple: {self.expression!r}")
+
+
+class Job:
+    """Una tarea programada y el estado de sus ejecuciones."""
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[], Awaitable[None]],
+        *,
+        every: Optional[float] = None,
+        cron: Optional[str] = None,
+        jitter: float = 0.0,
+        max_instances: int = 1,
+        singleton: bool = False,
+        timeout: Optional[float] = None,
+        run_at_start: bool = False,
+        min_interval: float = 0.0,
+    ):
+        if (every is None) == (cron is None):
+            raise ValueError(f"La tarea {name!r} necesita `every` o `cron` (uno solo)")
+        self.name = name
+        self.func = func
+        self.every = every
+        self.cron = CronSchedule(cron) if cron else None
+        self.jitter = jitter
+        self.max_instances = max_instances
+        self.singleton = singleton
+        self.timeout = timeout
+        self.run_at_start = run_at_start
+        # Mínimo entre el inicio de dos ejecuciones: los trigger que llegan antes se demoran
+        # (y se juntan en una sola ejecución) en lugar de correr una atrás de otra
+        self.min_interval = min_interval
+
+        self.running: set = set()
+        # Un trigger llegó con la tarea en curso: se vuelve a correr cuando termine
+        self.pending = False
+        self.next_run: Optional[datetime] = None
+        self.last_run: Optional[datetime] = None
+        self.last_start: Optional[float] = None  # time.monotonic() del último inicio
+        self.last_status: Optional[str] = None
+        self.last_error: Optional[str] = None
+        self.last_duration: Optional[float] = None
+        self.runs = 0
+        self.failures = 0
+
+    def next_delay(self) -> float:
+        """Segundos hasta la próxima ejecución, jitter incluido."""
+        if self.every is not None:
+            delay = self.every
+        else:
+            ahora = datetime.now()
+            delay = (self.cron.next_after(ahora) - ahora).total_seconds()
+        return delay + random.uniform(0, self.jitter)
+
+    def status(self) -> dict:
+        return {
+            "nombre": self.name,
+            "programacion": f"cada {self.every:g} s" if self.every is not None else f"cron {self.cron.expression}",
+            "singleton": self.singleton,
+            "en_curso": len(self.running),
+            "repetir_al_terminar": self.pending,
+            "proxima": self.next_run.isoformat(timespec="seconds") if self.next_run else None,
+            "ultima": self.last_run.isoformat(timespec="seconds") if self.last_run else None,
+            "ultimo_resultado": self.last_status,
+            "ultimo_error": self.last_error,
+            "ultima_duracion_s": round(self.last_duration, 3) if self.last_duration is not None else None,
+            "ejecuciones": self.runs,
+            "fallos": self.failures,
+        }
+
+
+class LocalLeaderLock:
+    """Sin coordinación: este proceso siempre es líder. Para un solo worker, o para tests."""
+
+    ttl = SCHEDULER_LEADER_TTL_SECONDS
+
+    async def acquire(self) -> bool:
+        return True
+
+    async def release(self) -> None:
+        pass
+
+
+class MongoLeaderLock:
+    """
+    Lock de líder con vencimiento guardado en MongoDB (colección `scheduler_locks`). El dueño
+    lo renueva periódicamente; si deja de hacerlo (el worker murió), otro lo toma al vencer.
+    """
+
+    def __init__(self, name: str = "scheduler", ttl: float = SCHEDULER_LEADER_TTL_SECONDS, collection=None):
+        self.name = name
+        self.ttl = ttl
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._collection = collection
+
+    def _locks(self):
+        if self._collection is None:
+            from database.database import get_nosql_database
+            self._collection = get_nosql_database().scheduler_locks
+        return self._collection
+
+    async def acquire(self) -> bool:
+        """Toma o renueva el lock. Devuelve False si lo tiene otro worker."""
+        from pymongo.errors import DuplicateKeyError
+
+        ahora = datetime.now(timezone.utc)
+        try:
+            # Si el lock es de otro y no venció, el filtro no matchea y el upsert choca con el _id
+            await self._locks().update_one(
+                {"_id": self.name, "$or": [{"owner": self.owner}, {"expira_en": {"$lt": ahora}}]},
+                {"$set": {"owner": self.owner, "expira_en": ahora + timedelta(seconds=self.ttl)}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            return False
+        return True
+
+    async def release(self) -> None:
+        await self._locks().delete_one({"_id": self.name, "owner": self.owner})
+
+
+class Scheduler:
+    def __init__(self, leader_lock=None):
+        self.jobs: Dict[str, Job] = {}
+        self.leader_lock = leader_lock
+        self.is_leader = False
+        self._wake: Dict[str, asyncio.Event] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    def add_job(self, job: Job) -> Job:
+        if job.name in self.jobs:
+            raise ValueError(f"Ya hay una tarea llamada {job.name!r}")
+        self.jobs[job.name] = job
+        self._wake[job.name] = asyncio.Event()
+        return job
+
+    def trigger(self, name: str) -> None:
+        """Adelanta la próxima ejecución de la tarea (no hace nada si no existe o no arrancó)."""
+        if name in self._wake:
+            self._wake[name].set()
+
+    async def start(self) -> None:
+        if any(job.singleton for job in self.jobs.values()):
+            if self.leader_lock is None:
+                self.leader_lock = MongoLeaderLock()
+            # Se intenta tomar el lock antes de arrancar, para que las tareas con
+            # run_at_start no se salteen en el líder
+            await self._update_leadership()
+            self._tasks.append(asyncio.create_task(self._leader_loop()))
+        for job in self.jobs.values():
+            self._tasks.append(asyncio.create_task(self._job_loop(job)))
+        logger.info("Planificador iniciado con %d tareas (líder: %s)", len(self.jobs), self.is_leader)
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+        en_curso = [task for job in self.jobs.values() for task in job.running]
+        if en_curso:
+            _, pendientes = await asyncio.wait(en_curso, timeout=SCHEDULER_SHUTDOWN_GRACE_SECONDS)
+            for task in pendientes:
+                task.cancel()
+            await asyncio.gather(*pendientes, return_exceptions=True)
+
+        if self.is_leader:
+            try:
+                await self.leader_lock.release()
+            except Exception as e:
+                logger.warning(f"No se pudo liberar el lock de líder: {e}")
+            self.is_leader = False
+            scheduler_leader.set(0)
+
+    def status(self) -> dict:
+        return {"lider": self.is_leader, "tareas": [job.status() for job in self.jobs.values()]}
+
+    async def _update_leadership(self) -> None:
+        try:
+            lider = await self.leader_lock.acquire()
+        except Exception as e:
+            # Sin poder renovar no sabemos si seguimos siendo líder: mejor no correr singletons
+            logger.warning(f"No se pudo tomar/renovar el lock de líder: {e}")
+            lider = False
+        if lider != self.is_leader:
+            logger.info("Este worker %s líder del planificador", "ahora es" if lider else "dejó de ser")
+        self.is_leader = lider
+        scheduler_leader.set(1 if lider else 0)
+
+    async def _leader_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.leader_lock.ttl / 3)
+            await self._update_leadership()
+
+    async def _job_loop(self, job: Job) -> None:
+        wake = self._wake[job.name]
+        delay = 0.0 if job.run_at_start else job.next_delay()
+        while True:
+            job.next_run = datetime.now() + timedelta(seconds=delay)
+            pedida = False
+            try:
+                await asyncio.wait_for(wake.wait(), timeout=delay)
+                pedida = True
+            except asyncio.TimeoutError:
+                pass
+            if pedida and job.last_start is not None:
+                espera = job.min_interval - (time.monotonic() - job.last_start)
+                if espera > 0:
+                    job.next_run = datetime.now() + timedelta(seconds=espera)
+                    await asyncio.sleep(espera)
+            wake.clear()
+            self._launch(job, pedida)
+            delay = job.next_delay()
+
+    def _launch(self, job: Job, pedida: bool = False) -> None:
+        if job.singleton and not self.is_leader:
+            scheduler_job_skipped_total.inc(job=job.name, motivo="no_lider")
+            return
+        if len(job.running) >= job.max_instances:
+            if pedida:
+                # Lo que pidió el trigger (p. ej. un cambio de catálogo) puede no estar en la
+                # ejecución en curso: se repite apenas termine
+                job.pending = True
+            scheduler_job_skipped_total.inc(job=job.name, motivo="en_curso")
+            logger.info("Tarea %s salteada: la ejecución anterior sigue en curso", job.name)
+            return
+        job.last_start = time.monotonic()
+        task = asyncio.create_task(self._run(job))
+        job.running.add(task)
+        scheduler_job_running.set(len(job.running), job=job.name)
+
+        def _done(t: asyncio.Task):
+            job.running.discard(t)
+            scheduler_job_running.set(len(job.running), job=job.name)
+            if job.pending and not t.cancelled():
+                job.pending = False
+                self.trigger(job.name)
+
+        task.add_done_callback(_done)
+
+    async def _run(self, job: Job) -> None:
+        job.last_run = datetime.now()
+        start = time.perf_counter()
+        resultado, error = "ok", None
+        try:
+            await asyncio.wait_for(job.func(), timeout=job.timeout)
+        except asyncio.TimeoutError:
+            resultado, error = "timeout", f"Superó el timeout de {job.timeout:g} s"
+        except asyncio.CancelledError:
+            resultado, error = "cancelada", "Cancelada al apagar"
+            raise
+        except Exception as e:
+            resultado, error = "error", f"{type(e).__name__}: {e}"
+            logger.exception("Falló la tarea programada %s", job.name)
+        finally:
+            segundos = time.perf_counter() - start
+            job.runs += 1
+            job.last_duration = segundos
+            job.last_status = resultado
+            job.last_error = error
+            if resultado != "ok":
+                job.failures += 1
+            else:
+                scheduler_job_last_success.set(time.time(), job=job.name)
+            scheduler_job_runs_total.inc(job=job.name, resultado=resultado)
+            scheduler_job_seconds.observe(segundos, job=job.name)
+
+
+# Instancia de la app: main.py registra las tareas y la arranca en el lifespan
+scheduler = Scheduler()
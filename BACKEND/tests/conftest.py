@@ -10,8 +10,12 @@ from sqlalchemy.orm import sessionmaker
 # 1. IMPORTACIONES CLAVE DE TU APLICACIÓN
 # Asegurate de que estas rutas sean correctas según tu estructura.
 from BACKEND.main import app
-from BACKEND.database.database import get_db
+from BACKEND.database.database import get_db, get_db_read
+# La app importa sus módulos como `database.database` (sin el prefijo BACKEND),
+# así que también hay que pisar esa dependencia para que el override tenga efecto.
+from database.database import get_db as app_get_db, get_db_read as app_get_db_read
 from BACKEND.database.models import Base
+from database.query_metrics import instrument_engine
 
 # --- 2. CONFIGURACIÓN DE LA BASE DE DATOS DE PRUEBA ---
 # Se usa una base de datos SQLite en memoria: es rapidísima y se borra sola al final.
@@ -21,6 +25,8 @@ test_engine = create_async_engine(
     SQLALCHEMY_DATABASE_URL,
     connect_args={"check_same_thread": False},  # Requerido para SQLite
 )
+# Igual que el engine real, para que los tests vean las consultas por request
+instrument_engine(test_engine)
 
 # Creamos una "fábrica" de sesiones de prueba que usaremos en las fixtures.
 TestingSessionLocal = sessionmaker(
@@ -55,6 +61,10 @@ async def db_session() -> AsyncGenerator[AsyncSession, None]:
         # Borra todas las tablas para el siguiente test.
         await conn.run_sync(Base.metadata.drop_all)
 
+    # Cerramos las conexiones del pool: aiosqlite usa un hilo por conexión y,
+    # si queda abierto, el proceso de pytest no termina nunca.
+    await test_engine.dispose()
+
 # --- 4. FIXTURE PARA EL CLIENTE HTTP (PARA LLAMAR A TU API) ---
 @pytest_asyncio.fixture(scope="function")
 async def client(db_session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
@@ -68,6 +78,14 @@ async def client(db_session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
 
     # Aplicamos el "engaño": cuando la app pida la base de datos, le damos la de prueba.
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[app_get_db] = override_get_db
+    # Las lecturas (réplica) van a la misma base de prueba
+    app.dependency_overrides[get_db_read] = override_get_db
+    app.dependency_overrides[app_get_db_read] = override_get_db
+    # Los turnos del chatbot se guardan en segundo plano con su propia sesión:
+    # la apuntamos también a la base de prueba.
+    from services import conversation_writer
+    conversation_writer.set_session_factory(TestingSessionLocal)
 
     # Creamos un cliente HTTP que "habla" con tu app en memoria, sin levantar un servidor real.
     transport = ASGITransport(app=app)
@@ -75,4 +93,21 @@ async def client(db_session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
         yield ac
 
     # Al final del test, limpiamos el engaño para no afectar a otros tests.
-    app.dependency_overrides.clear()
\ No newline at end of file
+    app.dependency_overrides.clear()
+    conversation_writer.set_session_factory(conversation_writer.AsyncSessionLocal)
+    conversation_writer._buffer.clear()
+# --- 5. FIXTURE PARA EL CLIENTE HTTP CON USUARIO ADMIN ---
+@pytest_asyncio.fixture(scope="function")
+async def admin_client(client: AsyncClient) -> AsyncGenerator[AsyncClient, None]:
+    """
+    Igual que `client`, pero saltea la autenticación JWT de los endpoints de /api/admin
+    devolviendo siempre un usuario con rol admin.
+    """
+    from schemas.user_schemas import UserOut
+    from services.auth_services import get_current_admin_user
+
+    async def override_admin_user() -> UserOut:
+        return UserOut(_id="admin-test", email="admin@test.com", name="Admin", last_name="Test", role="admin")
+
+    app.dependency_overrides[get_current_admin_user] = override_admin_user
+    yield client
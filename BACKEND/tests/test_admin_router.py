@@ -0,0 +1,314 @@
+import json
+from datetime import date
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from sqlalchemy import select
+
+from BACKEND.database.models import Categoria, Gasto, Orden, Producto
+
+
+@pytest.mark.asyncio
+async def test_get_expenses_paginated_with_cursor(admin_client: AsyncClient, db_session: AsyncSession):
+    """Prueba que los gastos se paginan por cursor, del más nuevo al más viejo."""
+    db_session.add_all([
+        Gasto(descripcion=f"Gasto {i}", monto=10 * i, categoria="Varios", fecha=date(2025, 1, i))
+        for i in range(1, 6)
+    ])
+    await db_session.commit()
+
+    response = await admin_client.get("/api/admin/expenses", params={"limit": 2})
+    assert response.status_code == 200
+    page = response.json()
+    assert [g["descripcion"] for g in page["items"]] == ["Gasto 5", "Gasto 4"]
+    assert page["items"][0]["monto"] == 50.0
+    assert page["next_cursor"] is not None
+
+    response = await admin_client.get("/api/admin/expenses", params={"limit": 2, "cursor": page["next_cursor"]})
+    page = response.json()
+    assert [g["descripcion"] for g in page["items"]] == ["Gasto 3", "Gasto 2"]
+
+    response = await admin_client.get("/api/admin/expenses", params={"limit": 2, "cursor": page["next_cursor"]})
+    page = response.json()
+    assert [g["descripcion"] for g in page["items"]] == ["Gasto 1"]
+    assert page["next_cursor"] is None
+
+
+@pytest.mark.asyncio
+async def test_get_expenses_date_filter_and_projection(admin_client: AsyncClient, db_session: AsyncSession):
+    """Prueba los filtros por fecha y que `fields` solo devuelve las columnas pedidas (más el id)."""
+    db_session.add_all([
+        Gasto(descripcion="Enero", monto=100, fecha=date(2025, 1, 15)),
+        Gasto(descripcion="Febrero", monto=200, fecha=date(2025, 2, 15)),
+        Gasto(descripcion="Marzo", monto=300, fecha=date(2025, 3, 15)),
+    ])
+    await db_session.commit()
+
+    response = await admin_client.get(
+        "/api/admin/expenses",
+        params={"desde": "2025-02-01", "hasta": "2025-03-01", "fields": "monto"},
+    )
+    assert response.status_code == 200
+    items = response.json()["items"]
+    assert items == [{"id": items[0]["id"], "monto": 200.0}]
+
+
+@pytest.mark.asyncio
+async def test_get_expenses_paginates_by_date_then_id(admin_client: AsyncClient, db_session: AsyncSession):
+    """Prueba que el cursor es (fecha, id): ordena por fecha aunque el id no la siga y no saltea empates."""
+    db_session.add_all([
+        Gasto(descripcion="Marzo", monto=1, fecha=date(2025, 3, 1)),
+        Gasto(descripcion="Enero", monto=1, fecha=date(2025, 1, 1)),
+        Gasto(descripcion="Febrero A", monto=1, fecha=date(2025, 2, 1)),
+        Gasto(descripcion="Febrero B", monto=1, fecha=date(2025, 2, 1)),
+    ])
+    await db_session.commit()
+
+    vistos, cursor = [], None
+    while True:
+        params = {"limit": 1, "fields": "descripcion", **({"cursor": cursor} if cursor else {})}
+        page = (await admin_client.get("/api/admin/expenses", params=params)).json()
+        assert all(set(g) == {"id", "descripcion"} for g in page["items"])
+        vistos += [g["descripcion"] for g in page["items"]]
+        if not (cursor := page["next_cursor"]):
+            break
+    assert vistos == ["Marzo", "Febrero B", "Febrero A", "Enero"]
+
+    assert (await admin_client.get("/api/admin/expenses", params={"cursor": "12"})).status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_get_expenses_invalid_field(admin_client: AsyncClient):
+    """Prueba que pedir un campo inexistente devuelve 400."""
+    response = await admin_client.get("/api/admin/expenses", params={"fields": "hashed_password"})
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_get_sales_stream_ndjson(admin_client: AsyncClient, db_session: AsyncSession):
+    """Prueba que el modo stream devuelve todas las ventas como NDJSON."""
+    db_session.add_all([Orden(user_id=f"user-{i}", total=100 + i) for i in range(3)])
+    await db_session.commit()
+
+    response = await admin_client.get("/api/admin/sales", params={"stream": "true", "fields": "user_id,total"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["user_id"] for row in rows] == ["user-2", "user-1", "user-0"]
+    assert set(rows[0]) == {"id", "user_id", "total"}
+
+
+@pytest.mark.asyncio
+async def test_import_products_csv_upserts_and_reports_errors(admin_client: AsyncClient, db_session: AsyncSession):
+    """Prueba que la importación CSV inserta, actualiza por SKU y reporta errores por fila."""
+    categoria = Categoria(nombre="Remeras")
+    db_session.add(categoria)
+    await db_session.commit()
+    db_session.add(Producto(nombre="Remera Vieja", precio=100, stock=1, sku="REM-1", url="remera-1", categoria_id=categoria.id))
+    await db_session.commit()
+
+    csv_content = (
+        "nombre,precio,sku,stock,categoria_id,color\n"
+        f"Remera Nueva,150,REM-1,5,{categoria.id},negro\n"
+        f"Remera Blanca,120,REM-2,3,{categoria.id},\n"
+        "Remera Perdida,90,REM-3,1,999,\n"
+        f"Remera Rota,abc,REM-4,1,{categoria.id},\n"
+    )
+    response = await admin_client.post(
+        "/api/admin/products/import",
+        files={"file": ("productos.csv", csv_content.encode("utf-8"), "text/csv")},
+    )
+    assert response.status_code == 200
+    report = response.json()
+    assert report["procesados"] == 4
+    assert report["insertados"] == 1
+    assert report["actualizados"] == 1
+    assert sorted((e["fila"], e["sku"]) for e in report["errores"]) == [(4, "REM-3"), (5, "REM-4")]
+
+    result = await db_session.execute(select(Producto).order_by(Producto.sku).execution_options(populate_existing=True))
+    productos = {p.sku: p for p in result.scalars().all()}
+    assert productos["REM-1"].nombre == "Remera Nueva"
+    assert productos["REM-1"].url == "remera-1"
+    assert productos["REM-2"].url == "rem-2"
+    assert productos["REM-2"].color is None
+
+
+@pytest.mark.asyncio
+async def test_import_products_rejects_url_taken_by_another_product(admin_client: AsyncClient, db_session: AsyncSession):
+    """Un SKU nuevo con la url de otro producto se reporta y no pisa a ese producto."""
+    categoria = Categoria(nombre="Gorras")
+    db_session.add(categoria)
+    await db_session.commit()
+    db_session.add(Producto(nombre="Gorra Original", precio=100, stock=1, sku="GOR-1", url="gor-2", categoria_id=categoria.id))
+    await db_session.commit()
+
+    filas = [
+        {"nombre": "Gorra Nueva", "precio": 50, "sku": "GOR-2", "stock": 9, "categoria_id": categoria.id},
+        {"nombre": "Gorra Azul", "precio": 70, "sku": "GOR-3", "stock": 2, "categoria_id": categoria.id},
+    ]
+    response = await admin_client.post(
+        "/api/admin/products/import",
+        files={"file": ("productos.ndjson", "\n".join(json.dumps(f) for f in filas).encode("utf-8"), "application/x-ndjson")},
+    )
+    report = response.json()
+    assert report["insertados"] == 1
+    assert report["errores"] == [{"fila": 1, "sku": "GOR-2", "error": "La url 'gor-2' ya la usa el producto GOR-1"}]
+
+    result = await db_session.execute(select(Producto).order_by(Producto.sku).execution_options(populate_existing=True))
+    productos = {p.sku: p for p in result.scalars().all()}
+    assert productos["GOR-1"].nombre == "Gorra Original" and productos["GOR-1"].stock == 1
+    assert set(productos) == {"GOR-1", "GOR-3"}
+
+
+@pytest.mark.asyncio
+async def test_bulk_patch_products(admin_client: AsyncClient, db_session: AsyncSession):
+    """Prueba el PATCH masivo de precio y stock por SKU."""
+    categoria = Categoria(nombre="Buzos")
+    db_session.add(categoria)
+    await db_session.commit()
+    db_session.add_all([
+        Producto(nombre="Buzo A", precio=100, stock=1, sku="BUZ-A", url="buzo-a", categoria_id=categoria.id),
+        Producto(nombre="Buzo B", precio=200, stock=2, sku="BUZ-B", url="buzo-b", categoria_id=categoria.id),
+    ])
+    await db_session.commit()
+
+    response = await admin_client.patch("/api/admin/products/bulk", json=[
+        {"sku": "BUZ-A", "precio": 110},
+        {"sku": "BUZ-B", "precio": 220, "stock": 0},
+        {"sku": "BUZ-X", "stock": 5},
+        {"sku": "BUZ-A", "stock": None},
+    ])
+    assert response.status_code == 200
+    report = response.json()
+    assert report["actualizados"] == 2
+    assert report["errores"] == [
+        {"fila": 3, "sku": "BUZ-X", "error": "Producto no encontrado"},
+        {"fila": 4, "sku": "BUZ-A", "error": "stock: no puede ser null"},
+    ]
+
+    result = await db_session.execute(select(Producto).order_by(Producto.sku).execution_options(populate_existing=True))
+    productos = {p.sku: p for p in result.scalars().all()}
+    assert float(productos["BUZ-A"].precio) == 110
+    assert productos["BUZ-A"].stock == 1
+    assert float(productos["BUZ-B"].precio) == 220
+    assert productos["BUZ-B"].stock == 0
+
+
+@pytest.mark.asyncio
+async def test_product_metrics_are_cached_until_refresh(admin_client: AsyncClient, db_session: AsyncSession):
+    """Prueba que las métricas de productos se sirven del cache y se recalculan con refresh=true."""
+    from services import metrics_services
+    metrics_services._product_metrics = None
+
+    categoria = Categoria(nombre="Camisas")
+    db_session.add(categoria)
+    await db_session.commit()
+    db_session.add(Producto(nombre="Camisa Lino", precio=100, stock=3, sku="CAMI-1", url="camisa-1", categoria_id=categoria.id))
+    await db_session.commit()
+
+    response = await admin_client.get("/api/admin/metrics/products")
+    assert response.status_code == 200
+    assert response.json()["product_with_most_stock"] == "Camisa Lino"
+    assert response.json()["actualizado_en"] is not None
+
+    db_session.add(Producto(nombre="Camisa Oxford", precio=100, stock=30, sku="CAMI-2", url="camisa-2", categoria_id=categoria.id))
+    await db_session.commit()
+
+    response = await admin_client.get("/api/admin/metrics/products")
+    assert response.json()["product_with_most_stock"] == "Camisa Lino"
+
+    response = await admin_client.get("/api/admin/metrics/products", params={"refresh": "true"})
+    assert response.json()["product_with_most_stock"] == "Camisa Oxford"
+    metrics_services._product_metrics = None
+
+
+@pytest.fixture
+def mongo():
+    """Reemplaza MongoDB por el de los benchmarks (en memoria) para los endpoints de usuarios."""
+    from BACKEND.main import app
+    from benchmarks.standins import InMemoryMongo
+    from database.database import get_db_nosql
+
+    db = InMemoryMongo()
+
+    async def override_get_db_nosql():
+        yield db
+
+    app.dependency_overrides[get_db_nosql] = override_get_db_nosql
+    return db
+
+
+async def _crear_usuarios(mongo, *roles):
+    result = await mongo.users.insert_many([
+        {"email": f"u{i}@test.com", "name": "Test", "last_name": "Test", "role": role} for i, role in enumerate(roles)
+    ])
+    return [str(_id) for _id in result.inserted_ids]
+
+
+@pytest.mark.asyncio
+async def test_get_users_pages_newest_first(admin_client: AsyncClient, mongo):
+    """Prueba que los usuarios se listan del más nuevo al más viejo, como los listados SQL."""
+    ids = await _crear_usuarios(mongo, "user", "admin", "user")
+
+    page = (await admin_client.get("/api/admin/users", params={"limit": 2})).json()
+    assert [u["_id"] for u in page["items"]] == [ids[2], ids[1]]
+    page = (await admin_client.get("/api/admin/users", params={"limit": 2, "cursor": page["next_cursor"]})).json()
+    assert [u["_id"] for u in page["items"]] == [ids[0]] and page["next_cursor"] is None
+
+
+@pytest.mark.asyncio
+async def test_update_user_role_returns_updated_user_and_takes_effect(admin_client: AsyncClient, mongo):
+    from bson import ObjectId
+    from services.auth_services import get_user_from_token
+    from utils.security import create_access_token
+
+    [user_id] = await _crear_usuarios(mongo, "admin")
+    token = create_access_token({"sub": "u0@test.com"})
+    assert (await get_user_from_token(token, mongo)).role == "admin"
+
+    response = await admin_client.put(f"/api/admin/users/{user_id}", json={"role": "user"})
+    assert response.status_code == 200
+    assert response.json()["role"] == "user"
+    # Sin cache de usuarios: el próximo request con el mismo token ya ve el rol nuevo
+    assert (await get_user_from_token(token, mongo)).role == "user"
+
+    assert (await admin_client.put(f"/api/admin/users/{ObjectId()}", json={"role": "user"})).status_code == 404
+    assert (await admin_client.put("/api/admin/users/no-es-un-id", json={"role": "user"})).status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_bulk_update_user_roles_reports_counts_and_invalid_ids(admin_client: AsyncClient, mongo):
+    ids = await _crear_usuarios(mongo, "user", "admin")
+    response = await admin_client.put("/api/admin/users/roles", json={"asignaciones": [
+        {"user_id": ids[0], "role": "admin"},
+        {"user_id": ids[1], "role": "admin"},  # ya era admin: matchea pero no se modifica
+        {"user_id": "no-es-un-id", "role": "admin"},
+    ]})
+    assert response.status_code == 200
+    assert response.json() == {"matched": 2, "modified": 1, "invalid_ids": ["no-es-un-id"], "errors": []}
+    assert {u["role"] async for u in mongo.users.find({})} == {"admin"}
+
+
+@pytest.mark.asyncio
+async def test_bulk_update_user_roles_reports_partial_failures(admin_client: AsyncClient, mongo, monkeypatch):
+    from pymongo.errors import BulkWriteError
+
+    ids = await _crear_usuarios(mongo, "user", "user")
+
+    async def bulk_write_parcial(operaciones, ordered=True):
+        raise BulkWriteError({
+            "nMatched": 1, "nModified": 1,
+            "writeErrors": [{"index": 1, "code": 121, "errmsg": "Document failed validation"}],
+        })
+
+    monkeypatch.setattr(mongo.users, "bulk_write", bulk_write_parcial)
+    response = await admin_client.put("/api/admin/users/roles", json={"asignaciones": [
+        {"user_id": ids[0], "role": "admin"}, {"user_id": ids[1], "role": "admin"},
+    ]})
+    assert response.status_code == 200
+    assert response.json() == {
+        "matched": 1, "modified": 1, "invalid_ids": [],
+        "errors": [{"user_id": ids[1], "detail": "Document failed validation"}],
+    }
@@ -0,0 +1,31 @@
+import pytest
+from httpx import AsyncClient
+
+from BACKEND.main import app
+from database.database import get_db_nosql
+from benchmarks.standins import InMemoryMongo
+
+
+@pytest.mark.asyncio
+async def test_guest_cart_add_increment_and_remove(client: AsyncClient):
+    """Prueba el carrito de un invitado contra el MongoDB en memoria de los benchmarks."""
+    mongo = InMemoryMongo()
+
+    async def override_get_db_nosql():
+        yield mongo
+
+    app.dependency_overrides[get_db_nosql] = override_get_db_nosql
+    headers = {"X-Guest-Session-ID": "invitado-1"}
+    item = {"product_id": 7, "quantity": 1, "price": 1000.0, "name": "Remera"}
+
+    await client.post("/api/cart/items", json=item, headers=headers)
+    response = await client.post("/api/cart/items", json=item, headers=headers)
+    assert response.status_code == 200
+    cart = response.json()
+    assert isinstance(cart["_id"], str)
+    assert cart["items"] == [{**item, "quantity": 2, "image_url": None}]
+
+    response = await client.delete("/api/cart/items/7", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["items"] == []
+    assert await mongo.carts.count_documents({}) == 1
@@ -0,0 +1,31 @@
+from collections import namedtuple
+
+from services.catalog_search import CatalogIndex, tokenize
+
+ProductoFake = namedtuple("ProductoFake", "nombre descripcion material color talle")
+
+PRODUCTOS = [
+    ProductoFake("Remera Oversize", "Remera de algodón pesado", "algodón", "negro", "M"),
+    ProductoFake("Remera Slim", "Remera entallada", "algodón", "blanco", "S"),
+    ProductoFake("Pantalón Cargo", "Pantalón con bolsillos", "gabardina", "verde", "L"),
+    ProductoFake("Campera de Cuero", "Campera clásica", "cuero", "negro", "L"),
+]
+
+
+def test_tokenize_normalizes_accents_plurals_and_stopwords():
+    """Prueba que la tokenización ignora acentos, mayúsculas, plurales y palabras vacías."""
+    assert tokenize("¿Tienen PANTALONES en talles grandes?") == tokenize("pantalón talle grande")
+
+
+def test_search_ranks_relevant_products_first():
+    """Prueba que la búsqueda devuelve primero los productos que coinciden con la consulta."""
+    index = CatalogIndex(PRODUCTOS)
+    resultados = index.search("¿tenés remeras negras?", k=2)
+    assert [p.nombre for p in resultados][0] == "Remera Oversize"
+    assert all("Pantalón" not in p.nombre for p in resultados)
+
+
+def test_search_without_matches_returns_empty():
+    """Prueba que una consulta sin términos del catálogo no devuelve productos."""
+    index = CatalogIndex(PRODUCTOS)
+    assert index.search("hola, ¿cómo va?", k=3) == []
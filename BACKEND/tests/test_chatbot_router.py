@@ -0,0 +1,338 @@
+import json
+import asyncio
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from BACKEND.database.models import ConversacionIA
+from services import llm_client, response_cache, conversation_writer
+
+
+@pytest.fixture(autouse=True)
+def empty_response_cache():
+    """Cada test arranca con el cache de respuestas vacío."""
+    response_cache.clear()
+    yield
+    response_cache.clear()
+
+
+@pytest.fixture
+def stub_llm():
+    """Reemplaza el LLM por el backend stub (sin red) durante el test."""
+    llm_client.set_llm_client(llm_client.LLMClient(llm_client.StubBackend(latency_ms=0)))
+    yield
+    llm_client.set_llm_client(None)
+
+
+@pytest.mark.asyncio
+async def test_chat_query_answers_and_saves_conversation(client: AsyncClient, db_session: AsyncSession, stub_llm):
+    """Prueba que el chatbot responde y guarda la pregunta y la respuesta en la base."""
+    response = await client.post("/api/chatbot/query", json={"sesion_id": "sesion-1", "pregunta": "¿Hacen envíos?"})
+    assert response.status_code == 200
+    respuesta = response.json()["respuesta"]
+    assert "¿Hacen envíos?" in respuesta
+
+    # El turno se guarda en segundo plano: acá vaciamos el buffer a mano
+    assert await conversation_writer.flush() == 1
+    result = await db_session.execute(select(ConversacionIA).where(ConversacionIA.sesion_id == "sesion-1"))
+    conversaciones = result.scalars().all()
+    assert len(conversaciones) == 1
+    assert conversaciones[0].prompt == "¿Hacen envíos?"
+    assert conversaciones[0].respuesta == respuesta
+
+
+@pytest.mark.asyncio
+async def test_chat_query_stream_sends_deltas_and_saves_full_answer(client: AsyncClient, db_session: AsyncSession, stub_llm):
+    """Prueba que el streaming manda fragmentos por SSE y al final guarda la respuesta completa."""
+    response = await client.post("/api/chatbot/query/stream", json={"sesion_id": "sesion-sse", "pregunta": "¿Qué talles hay?"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    eventos = []
+    for bloque in response.text.strip().split("\n\n"):
+        evento, data = bloque.split("\n")
+        eventos.append((evento.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+
+    deltas = [data["texto"] for evento, data in eventos if evento == "delta"]
+    assert len(deltas) > 1
+    assert eventos[-1][0] == "done"
+    respuesta = eventos[-1][1]["respuesta"]
+    assert "".join(deltas) == respuesta
+
+    await conversation_writer.flush()
+    result = await db_session.execute(select(ConversacionIA).where(ConversacionIA.sesion_id == "sesion-sse"))
+    assert result.scalars().one().respuesta == respuesta
+
+
+@pytest.mark.asyncio
+async def test_chat_history_window_folds_old_turns_into_summary(client: AsyncClient, db_session: AsyncSession, monkeypatch):
+    """Prueba que al modelo solo le llegan los últimos turnos y los anteriores quedan en el resumen."""
+    from BACKEND.database.models import ResumenConversacionIA
+    from services import ia_services
+
+    monkeypatch.setattr(ia_services, "CHATBOT_HISTORY_TURNS", 2)
+
+    prompts = []
+    class RecordingBackend(llm_client.StubBackend):
+        async def generate(self, prompt: str) -> str:
+            prompts.append(prompt)
+            return await super().generate(prompt)
+
+    llm_client.set_llm_client(llm_client.LLMClient(RecordingBackend(latency_ms=0)))
+    try:
+        for i in range(5):
+            response = await client.post("/api/chatbot/query", json={"sesion_id": "sesion-larga", "pregunta": f"pregunta {i}"})
+            assert response.status_code == 200
+            await conversation_writer.flush()
+    finally:
+        llm_client.set_llm_client(None)
+
+    lineas = prompts[-1].splitlines()
+    # Ventana: solo los 2 últimos turnos completos
+    assert "Usuario: pregunta 2" in lineas
+    assert "Usuario: pregunta 3" in lineas
+    assert "Usuario: pregunta 1" not in lineas
+    # Los anteriores, plegados en el resumen
+    assert "Resumen de la conversación anterior:" in lineas
+    assert any(linea.startswith("- Usuario: pregunta 0 /") for linea in lineas)
+    assert any(linea.startswith("- Usuario: pregunta 1 /") for linea in lineas)
+
+    result = await db_session.execute(select(ResumenConversacionIA).where(ResumenConversacionIA.sesion_id == "sesion-larga"))
+    resumen = result.scalars().one()
+    assert "pregunta 1" in resumen.resumen
+
+
+@pytest.mark.asyncio
+async def test_chat_first_turn_answers_come_from_cache(client: AsyncClient, db_session: AsyncSession):
+    """Prueba que una pregunta de primer turno repetida (normalizada) no vuelve a llamar al LLM."""
+    from services import catalog_services
+
+    llamadas = []
+    class CountingBackend(llm_client.StubBackend):
+        async def generate(self, prompt: str) -> str:
+            llamadas.append(prompt)
+            return await super().generate(prompt)
+
+    llm_client.set_llm_client(llm_client.LLMClient(CountingBackend(latency_ms=0)))
+    try:
+        primera = await client.post("/api/chatbot/query", json={"sesion_id": "cache-1", "pregunta": "¿Cuánto tarda el envío?"})
+        segunda = await client.post("/api/chatbot/query", json={"sesion_id": "cache-2", "pregunta": "cuanto tarda el ENVIO"})
+        assert segunda.json()["respuesta"] == primera.json()["respuesta"]
+        assert len(llamadas) == 1
+
+        # Un segundo turno depende del historial: no se cachea
+        await client.post("/api/chatbot/query", json={"sesion_id": "cache-2", "pregunta": "cuanto tarda el envio"})
+        assert len(llamadas) == 2
+
+        # Si cambia el catálogo, la respuesta guardada deja de valer
+        catalog_services.invalidate_catalog()
+        await client.post("/api/chatbot/query", json={"sesion_id": "cache-3", "pregunta": "¿Cuánto tarda el envío?"})
+        assert len(llamadas) == 3
+    finally:
+        llm_client.set_llm_client(None)
+
+    assert response_cache.cache_lookups_total.value(canal="chat", resultado="hit") >= 1
+
+
+@pytest.mark.asyncio
+async def test_chat_turns_are_saved_in_batches_and_survive_llm_failures(client: AsyncClient, db_session: AsyncSession):
+    """Prueba que los turnos se guardan juntos en un solo lote y que la pregunta se guarda aunque la IA falle."""
+    class FailingBackend(llm_client.StubBackend):
+        async def generate(self, prompt: str) -> str:
+            raise RuntimeError("se cayó la IA")
+
+    llm_client.set_llm_client(llm_client.LLMClient(FailingBackend(latency_ms=0)))
+    try:
+        for i in range(3):
+            response = await client.post("/api/chatbot/query", json={"sesion_id": f"lote-{i}", "pregunta": f"pregunta {i}"})
+            assert response.status_code == 200
+    finally:
+        llm_client.set_llm_client(None)
+
+    # Nada se escribió todavía en la base durante los requests
+    result = await db_session.execute(select(ConversacionIA))
+    assert result.scalars().all() == []
+
+    def lotes():
+        samples = conversation_writer.flush_batch_size.samples()
+        return samples[0][1]["count"] if samples else 0
+
+    lotes_antes = lotes()
+    assert await conversation_writer.flush() == 3
+    assert lotes() == lotes_antes + 1
+
+    result = await db_session.execute(select(ConversacionIA).order_by(ConversacionIA.id))
+    guardadas = result.scalars().all()
+    assert [c.prompt for c in guardadas] == ["pregunta 0", "pregunta 1", "pregunta 2"]
+    assert all(c.respuesta for c in guardadas)  # el mensaje de disculpas del fallback
+
+
+@pytest.mark.asyncio
+async def test_llm_usage_is_recorded_per_call_and_exposed_to_admins(admin_client: AsyncClient, stub_llm):
+    """Prueba que cada llamada al LLM queda registrada con el peso de cada parte del prompt."""
+    from services import llm_usage
+
+    llm_usage.reset()
+    await admin_client.post("/api/chatbot/query", json={"sesion_id": "uso-1", "pregunta": "¿Hacen envíos?"})
+    await admin_client.post("/api/chatbot/query", json={"sesion_id": "uso-1", "pregunta": "¿Y a Córdoba?"})
+
+    response = await admin_client.get("/api/admin/metrics/llm")
+    assert response.status_code == 200
+    data = response.json()
+
+    chat = next(canal for canal in data["canales"] if canal["canal"] == "chat")
+    assert chat["llamadas"] == 2
+    assert chat["errores"] == {}
+    assert chat["prompt_tokens"] > 0 and chat["respuesta_tokens"] > 0
+    assert chat["prompt_chars_por_parte"]["pregunta"] == len("¿Hacen envíos?") + len("¿Y a Córdoba?")
+    assert chat["prompt_chars_por_parte"]["sistema"] > 0
+
+    ultima = data["recientes"][0]
+    assert ultima["canal"] == "chat" and ultima["modo"] == "completo"
+    # La segunda pregunta ya lleva el primer turno como historial
+    assert ultima["prompt_chars"]["historial"] > 0
+
+
+class GatedBackend(llm_client.StubBackend):
+    """Backend stub que no responde hasta que el test abre la compuerta."""
+    def __init__(self):
+        super().__init__(latency_ms=0)
+        self.llamadas = []
+        self.compuerta = asyncio.Event()
+
+    async def generate(self, prompt: str) -> str:
+        self.llamadas.append(prompt)
+        await self.compuerta.wait()
+        return await super().generate(prompt)
+
+
+@pytest.mark.asyncio
+async def test_chat_duplicate_questions_in_same_session_are_coalesced(client: AsyncClient, db_session: AsyncSession):
+    """Prueba que la misma pregunta repetida mientras la primera está en curso hace una sola llamada al LLM."""
+    backend = GatedBackend()
+    llm_client.set_llm_client(llm_client.LLMClient(backend))
+    try:
+        consulta = {"sesion_id": "doble-enter", "pregunta": "¿Tienen la remera negra en L?"}
+        pedidos = [asyncio.create_task(client.post("/api/chatbot/query", json=consulta)) for _ in range(3)]
+        while not backend.llamadas:
+            await asyncio.sleep(0.01)
+        backend.compuerta.set()
+        respuestas = await asyncio.gather(*pedidos)
+    finally:
+        llm_client.set_llm_client(None)
+
+    assert len(backend.llamadas) == 1
+    assert len({r.json()["respuesta"] for r in respuestas}) == 1
+    assert await conversation_writer.flush() == 1
+
+
+@pytest.mark.asyncio
+async def test_chat_rejects_with_429_when_saturated(client: AsyncClient, db_session: AsyncSession, monkeypatch):
+    """Prueba que con la cola llena el chatbot responde 429 con Retry-After en lugar de encolar."""
+    from services import chat_gate
+
+    monkeypatch.setattr(chat_gate, "CHATBOT_MAX_PENDING", 1)
+    backend = GatedBackend()
+    llm_client.set_llm_client(llm_client.LLMClient(backend))
+    try:
+        primera = asyncio.create_task(client.post("/api/chatbot/query", json={"sesion_id": "s-1", "pregunta": "hola"}))
+        while not backend.llamadas:
+            await asyncio.sleep(0.01)
+
+        rechazada = await client.post("/api/chatbot/query", json={"sesion_id": "s-2", "pregunta": "hola"})
+        assert rechazada.status_code == 429
+        assert int(rechazada.headers["Retry-After"]) > 0
+
+        backend.compuerta.set()
+        assert (await primera).status_code == 200
+    finally:
+        llm_client.set_llm_client(None)
+
+    # Al terminar se libera el lugar
+    assert (await client.post("/api/chatbot/query", json={"sesion_id": "s-2", "pregunta": "hola"})).status_code == 200
+
+
+class _SesionFalsa:
+    """Sesión que guarda las filas en una lista y falla según `error(filas)`."""
+
+    def __init__(self, guardadas, error):
+        self.guardadas, self.error = guardadas, error
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, stmt, filas):
+        excepcion = self.error(filas)
+        if excepcion is not None:
+            raise excepcion
+        self.guardadas.extend(filas)
+
+    async def commit(self):
+        pass
+
+
+@pytest.fixture
+def writer(monkeypatch):
+    """Buffer vacío y una base falsa para el escritor diferido."""
+    guardadas, falla = [], {"error": lambda filas: None}
+    monkeypatch.setattr(conversation_writer, "_session_factory", lambda: _SesionFalsa(guardadas, falla["error"]))
+    monkeypatch.setattr(conversation_writer, "_consecutive_failures", 0)
+    conversation_writer._buffer.clear()
+    yield guardadas, falla
+    conversation_writer._buffer.clear()
+
+
+def _turnos(*sesiones):
+    for sesion in sesiones:
+        conversation_writer.start_turn(sesion, "hola").complete("chau")
+
+
+@pytest.mark.asyncio
+async def test_flush_isolates_a_row_the_database_rejects(writer):
+    from sqlalchemy.exc import DataError
+
+    guardadas, falla = writer
+    falla["error"] = lambda filas: (
+        DataError("INSERT", {}, Exception("Data too long")) if any(f["sesion_id"] == "mala" for f in filas) else None
+    )
+    _turnos("buena-1", "mala", "buena-2")
+    descartados = conversation_writer.turns_dropped_total.value(motivo="rechazado")
+
+    assert await conversation_writer.flush() == 3
+    assert [f["sesion_id"] for f in guardadas] == ["buena-1", "buena-2"]
+    assert "creado_en" not in guardadas[0]
+    assert not conversation_writer._buffer
+    assert conversation_writer.turns_dropped_total.value(motivo="rechazado") == descartados + 1
+
+
+@pytest.mark.asyncio
+async def test_flush_keeps_turns_while_the_database_is_down(writer, monkeypatch):
+    from sqlalchemy.exc import OperationalError
+
+    guardadas, falla = writer
+    falla["error"] = lambda filas: OperationalError("INSERT", {}, Exception("Lost connection"))
+    _turnos("s-1", "s-2")
+
+    for _ in range(conversation_writer.CONVERSATION_FLUSH_FALLBACK_AFTER + 1):
+        assert await conversation_writer.flush() == 0
+    assert len(conversation_writer._buffer) == 2
+
+    # Con el buffer lleno los turnos nuevos no se encolan
+    monkeypatch.setattr(conversation_writer, "CONVERSATION_BUFFER_MAX", 2)
+    _turnos("s-3")
+    assert len(conversation_writer._buffer) == 2
+
+    falla["error"] = lambda filas: None
+    assert await conversation_writer.flush() == 2
+    assert [f["sesion_id"] for f in guardadas] == ["s-1", "s-2"]
+
+
+@pytest.mark.asyncio
+async def test_chat_query_rejects_session_id_longer_than_the_column(client: AsyncClient):
+    response = await client.post("/api/chatbot/query", json={"sesion_id": "x" * 256, "pregunta": "hola"})
+    assert response.status_code == 422
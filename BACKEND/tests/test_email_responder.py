@@ -0,0 +1,152 @@
+import asyncio
+import email
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from BACKEND.database.models import EmailRespondido
+from BACKEND.tests.conftest import TestingSessionLocal
+from workers import email_responder
+from workers.imap_client import AsyncIMAPClient, compress_uids
+from benchmarks.stub_servers import StubIMAPServer, StubSMTPServer, make_message
+
+
+async def _conectar(server: StubIMAPServer) -> AsyncIMAPClient:
+    imap = AsyncIMAPClient("127.0.0.1", server.port, use_ssl=False, timeout=5)
+    await imap.connect()
+    await imap.login(server.user, server.password)
+    await imap.select("INBOX")
+    return imap
+
+
+def test_compress_uids_builds_ranges():
+    assert compress_uids([9, 1, 2, 3, 7, 10]) == "1:3,7,9:10"
+
+
+@pytest.fixture
+async def mail_servers(monkeypatch):
+    """IMAP y SMTP locales, con el worker apuntando a la cuenta de prueba."""
+    imap_server = await StubIMAPServer().start()
+    smtp_server = await StubSMTPServer().start()
+    monkeypatch.setattr(email_responder, "EMAIL_ACCOUNT", imap_server.user)
+    yield imap_server, smtp_server
+    await imap_server.stop()
+    await smtp_server.stop()
+
+
+async def _respuesta_fija(db_session, msg):
+    return email_responder.build_reply(msg, f"Respuesta a: {msg['subject']}")
+
+
+def _sesiones_smtp(server: StubSMTPServer, cantidad: int):
+    return [email_responder.SMTPSession("127.0.0.1", server.port, "tienda", "secreto", start_tls=False) for _ in range(cantidad)]
+
+
+@pytest.mark.asyncio
+async def test_process_emails_fetches_in_batches_and_reuses_smtp_sessions(db_session: AsyncSession, mail_servers, monkeypatch):
+    """Prueba el pipeline: UID FETCH por lotes, respuestas en paralelo y una sola conexión SMTP por tarea de envío."""
+    imap_server, smtp_server = mail_servers
+    for i in range(120):
+        imap_server.deliver(make_message(f"cliente{i}@test.com", f"Consulta {i}", f"¿Tienen stock del producto {i}?"))
+    imap_server.messages[0]["seen"] = True  # uno ya leído: no se vuelve a procesar
+
+    monkeypatch.setattr(email_responder, "IMAP_FETCH_BATCH", 50)
+    imap = await _conectar(imap_server)
+    sesiones = _sesiones_smtp(smtp_server, 2)
+    try:
+        procesados = await email_responder.process_emails(
+            imap, sesiones, generator=_respuesta_fija, session_factory=TestingSessionLocal, generate_concurrency=4
+        )
+    finally:
+        for smtp in sesiones:
+            await smtp.close()
+        await imap.logout()
+
+    assert procesados == 119
+    fetches = [c for c in imap_server.commands if c.upper().startswith("UID FETCH")]
+    assert len(fetches) == 3  # 119 mensajes en lotes de 50
+    assert imap_server.unseen() == []
+
+    assert len(smtp_server.messages) == 119
+    assert smtp_server.connections == 2
+    enviado = email.message_from_bytes(smtp_server.messages[0])
+    assert enviado["Subject"].startswith("Re: Consulta") and enviado["In-Reply-To"]
+
+    result = await db_session.execute(select(EmailRespondido))
+    assert len(result.scalars().all()) == 119
+
+
+@pytest.mark.asyncio
+async def test_process_emails_does_not_reply_twice_to_the_same_message_id(db_session: AsyncSession, mail_servers):
+    """Prueba que si el worker se cayó antes de marcar el email como leído, al reiniciar no lo vuelve a contestar."""
+    imap_server, smtp_server = mail_servers
+    imap_server.deliver(make_message("cliente@test.com", "Envíos", "¿Hacen envíos?", message_id="<ya-contestado@test>"))
+    imap_server.deliver(make_message("otro@test.com", "Talles", "¿Qué talles hay?"))
+
+    # El ciclo anterior llegó a contestar el primero pero no a marcarlo como leído
+    db_session.add(EmailRespondido(message_id="<ya-contestado@test>", remitente="cliente@test.com"))
+    await db_session.commit()
+
+    imap = await _conectar(imap_server)
+    sesiones = _sesiones_smtp(smtp_server, 1)
+    try:
+        await email_responder.process_emails(imap, sesiones, generator=_respuesta_fija, session_factory=TestingSessionLocal)
+    finally:
+        await sesiones[0].close()
+        await imap.logout()
+
+    assert len(smtp_server.messages) == 1
+    assert email.message_from_bytes(smtp_server.messages[0])["To"] == "otro@test.com"
+    assert imap_server.unseen() == []  # el duplicado igual queda marcado como leído
+
+
+def test_get_email_body_falls_back_to_html_without_plain_text():
+    msg = email.message.EmailMessage()
+    msg.set_content("<p>¿Tienen <b>talle M</b>?</p><style>p {}</style>", subtype="html")
+    msg.add_attachment(b"adjunto", maintype="application", subtype="octet-stream", filename="a.bin")
+    assert email_responder.get_email_body(msg) == "¿Tienen  talle M ?"
+
+
+@pytest.mark.asyncio
+async def test_process_emails_stops_retrying_a_message_that_always_fails(db_session: AsyncSession, mail_servers, monkeypatch):
+    """Prueba que un email que falla siempre se reintenta EMAIL_MAX_ATTEMPTS veces y después se marca como leído."""
+    imap_server, smtp_server = mail_servers
+    imap_server.deliver(make_message("cliente@test.com", "Roto", "No se puede contestar", message_id="<roto@test>"))
+    monkeypatch.setattr(email_responder, "EMAIL_MAX_ATTEMPTS", 3)
+
+    async def falla(db_session, msg):
+        raise ValueError("respuesta imposible")
+
+    imap = await _conectar(imap_server)
+    try:
+        for _ in range(2):
+            assert await email_responder.process_emails(imap, [], generator=falla, session_factory=TestingSessionLocal) == 1
+            assert len(imap_server.unseen()) == 1
+        await email_responder.process_emails(imap, [], generator=falla, session_factory=TestingSessionLocal)
+        assert imap_server.unseen() == []
+    finally:
+        await imap.logout()
+
+    registro = (await db_session.execute(select(EmailRespondido))).scalar_one()
+    assert (registro.fallos, registro.liberado) == (3, False)
+    assert smtp_server.messages == []
+
+
+@pytest.mark.asyncio
+async def test_idle_wakes_up_when_new_mail_arrives():
+    """Prueba que el worker espera en IDLE y se despierta apenas llega un email, sin esperar al polling."""
+    server = await StubIMAPServer().start()
+    imap = await _conectar(server)
+    try:
+        assert "IDLE" in imap.capabilities
+        esperando = asyncio.create_task(imap.idle(timeout=5))
+        await asyncio.sleep(0.05)
+        server.deliver(make_message("cliente@test.com", "Hola", "¿Hacen envíos?"))
+        assert await asyncio.wait_for(esperando, timeout=1) is True
+
+        # Sin mensajes nuevos, IDLE termina por timeout
+        assert await imap.idle(timeout=0.05) is False
+    finally:
+        await imap.logout()
+        await server.stop()
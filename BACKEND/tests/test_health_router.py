@@ -1,3 +1,4 @@
+import asyncio
 import pytest
 from httpx import AsyncClient
 
@@ -17,3 +18,91 @@ async def test_health_check_nosql_ok(client: AsyncClient):
     response = await client.get("/health/db-nosql")
     assert response.status_code == 200
     assert response.json()["status"] == "ok"
+
+
+@pytest.mark.asyncio
+async def test_liveness(client: AsyncClient):
+    response = await client.get("/health/live")
+    assert response.status_code == 200
+    assert response.json()["status"] == "ok"
+
+
+@pytest.fixture
+def fake_checks(monkeypatch):
+    from services import health_services
+
+    llamadas = {"sql": 0}
+
+    async def ok_sql():
+        llamadas["sql"] += 1
+
+    async def ok_mongo():
+        return None
+
+    async def lento():
+        await asyncio.sleep(1)
+
+    monkeypatch.setattr(health_services, "HEALTH_CHECK_TIMEOUT_SECONDS", 0.05)
+    monkeypatch.setattr(health_services, "CHECKS", {"sql": ok_sql, "mongo": ok_mongo, "llm": lento})
+    health_services.reset_cache()
+    yield health_services, llamadas
+    health_services.reset_cache()
+
+
+@pytest.mark.asyncio
+async def test_readiness_degradado_y_cacheado(client: AsyncClient, fake_checks):
+    _, llamadas = fake_checks
+    response = await client.get("/health/ready")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "degradado"
+    assert data["cacheado"] is False
+    assert data["checks"]["llm"]["status"] == "timeout"
+    assert data["checks"]["sql"]["status"] == "ok"
+    assert all("latencia_ms" in check for check in data["checks"].values())
+
+    # El segundo pedido sale del cache sin volver a chequear
+    response = await client.get("/health/ready")
+    assert response.json()["cacheado"] is True
+    assert llamadas["sql"] == 1
+
+
+@pytest.mark.asyncio
+async def test_readiness_falla_critica(client: AsyncClient, fake_checks, monkeypatch):
+    health_services, _ = fake_checks
+
+    async def caida():
+        raise ConnectionError("sin conexión")
+
+    monkeypatch.setitem(health_services.CHECKS, "mongo", caida)
+    response = await client.get("/health/ready")
+    assert response.status_code == 503
+    data = response.json()
+    assert data["status"] == "error"
+    assert data["checks"]["mongo"] == {
+        "status": "error", "critico": True, "detalle": "ConnectionError: sin conexión",
+        "latencia_ms": data["checks"]["mongo"]["latencia_ms"],
+    }
+
+
+@pytest.mark.asyncio
+async def test_llm_and_payment_checks_do_not_import_the_sdks(monkeypatch):
+    """Prueba que los chequeos de LLM y pagos miran la configuración sin crear los clientes."""
+    import sys
+    from services import health_services, llm_client
+
+    monkeypatch.setattr(llm_client, "_client", None)
+    monkeypatch.setattr(llm_client, "LLM_BACKEND", "gemini")
+    monkeypatch.setattr(llm_client, "GEMINI_API_KEY", "clave")
+    monkeypatch.setenv("MERCADOPAGO_TOKEN", "token")
+    monkeypatch.delitem(sys.modules, "google.generativeai", raising=False)
+    monkeypatch.delitem(sys.modules, "mercadopago", raising=False)
+
+    assert await health_services.check_llm() == "gemini"
+    await health_services.check_payments()
+    assert llm_client._client is None
+    assert "google.generativeai" not in sys.modules and "mercadopago" not in sys.modules
+
+    monkeypatch.setattr(llm_client, "GEMINI_API_KEY", None)
+    with pytest.raises(llm_client.LLMUnavailableError):
+        await health_services.check_llm()
@@ -0,0 +1,82 @@
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from BACKEND.database.models import Categoria, Producto
+from services import catalog_services, ia_services
+
+
+@pytest.mark.asyncio
+async def test_catalog_context_is_rebuilt_only_when_catalog_changes(db_session: AsyncSession):
+    """Prueba que el catálogo del prompt se cachea y solo se reconstruye al cambiar la versión."""
+    categoria = Categoria(nombre="Pantalones")
+    db_session.add(categoria)
+    await db_session.commit()
+    db_session.add(Producto(nombre="Jean Negro", precio=5000, stock=2, sku="JEAN-1", url="jean-1", categoria_id=categoria.id))
+    await db_session.commit()
+
+    catalog_services.invalidate_catalog()
+    rebuilds = ia_services.catalog_rebuilds_total.value()
+
+    primero = await ia_services.get_catalog_context(db_session)
+    segundo = await ia_services.get_catalog_context(db_session)
+    assert "Jean Negro" in primero
+    assert segundo is primero
+    assert ia_services.catalog_rebuilds_total.value() == rebuilds + 1
+
+    db_session.add(Producto(nombre="Jean Azul", precio=5500, stock=1, sku="JEAN-2", url="jean-2", categoria_id=categoria.id))
+    await db_session.commit()
+    catalog_services.invalidate_catalog()
+
+    tercero = await ia_services.get_catalog_context(db_session)
+    assert "Jean Azul" in tercero
+    assert ia_services.catalog_rebuilds_total.value() == rebuilds + 2
+
+
+class _Replica:
+    """Sesión de réplica falsa que registra si se la usó."""
+
+    def __init__(self):
+        self.consultas = 0
+
+    async def execute(self, *args, **kwargs):
+        self.consultas += 1
+        raise ConnectionError("réplica sin el cambio")
+
+
+@pytest.mark.asyncio
+async def test_catalog_is_rebuilt_from_the_primary_after_a_change(db_session: AsyncSession):
+    """Después de una escritura el catálogo no se lee de la réplica (puede estar atrasada)."""
+    categoria = Categoria(nombre="Camperas")
+    db_session.add(categoria)
+    await db_session.commit()
+    db_session.add(Producto(nombre="Campera Roja", precio=9000, stock=1, sku="CAM-1", url="cam-1", categoria_id=categoria.id))
+    await db_session.commit()
+    catalog_services.invalidate_catalog()
+
+    replica = _Replica()
+    texto = await ia_services.get_catalog_context(replica, primary_db=db_session)
+    assert "Campera Roja" in texto
+    assert replica.consultas == 0
+
+    # Si solo venció el TTL (sin cambios), la reconstrucción sí va a la réplica
+    ia_services._catalog_context["built_at"] = float("-inf")
+    await ia_services.get_catalog_context(replica, primary_db=db_session)
+    assert replica.consultas == 1
+
+
+def test_cached_answers_expire_with_the_catalog_context(monkeypatch):
+    """Prueba que ninguna respuesta cacheada dura más que el TTL del contexto del catálogo (lo ven todos los canales)."""
+    from cachetools import TTLCache
+    from services import response_cache
+
+    assert response_cache.CHATBOT_RESPONSE_CACHE_TTL_SECONDS <= catalog_services.CATALOG_CONTEXT_TTL_SECONDS
+
+    reloj = [0.0]
+    cache = TTLCache(maxsize=10, ttl=response_cache.CHATBOT_RESPONSE_CACHE_TTL_SECONDS, timer=lambda: reloj[0])
+    monkeypatch.setattr(response_cache, "_cache", cache)
+    response_cache.put("¿Hacen envíos?", "Sí")
+    assert response_cache.get("hacen envios") == "Sí"
+
+    # Otro worker cambió los precios: este no ve la versión nueva, pero la respuesta vence con el catálogo
+    reloj[0] += catalog_services.CATALOG_CONTEXT_TTL_SECONDS
+    assert response_cache.get("hacen envios", "email") is None
@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+from services.llm_client import LLMClient, LLMTimeoutError, StubBackend
+
+
+class SlowBackend:
+    """Backend de prueba que registra cuántas llamadas corren a la vez."""
+    name = "slow"
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.running = 0
+        self.max_running = 0
+
+    async def generate(self, prompt: str) -> str:
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(self.delay)
+            return prompt
+        finally:
+            self.running -= 1
+
+
+@pytest.mark.asyncio
+async def test_stub_backend_is_deterministic():
+    """Prueba que el backend stub devuelve siempre lo mismo para el mismo prompt."""
+    client = LLMClient(StubBackend(latency_ms=0))
+    prompt = "Sistema\nUsuario: ¿Tienen buzos negros?\nJarvis:"
+    primera = await client.generate(prompt)
+    segunda = await client.generate(prompt)
+    assert primera == segunda
+    assert "¿Tienen buzos negros?" in primera
+
+
+@pytest.mark.asyncio
+async def test_client_limits_concurrency():
+    """Prueba que el limitador no deja pasar más llamadas simultáneas que las configuradas."""
+    backend = SlowBackend(delay=0.02)
+    client = LLMClient(backend, max_concurrency=2)
+    await asyncio.gather(*(client.generate(f"prompt {i}") for i in range(6)))
+    assert backend.max_running == 2
+
+
+@pytest.mark.asyncio
+async def test_client_timeout():
+    """Prueba que una llamada que tarda más que el timeout falla con LLMTimeoutError."""
+    client = LLMClient(SlowBackend(delay=1), timeout=0.01)
+    with pytest.raises(LLMTimeoutError):
+        await client.generate("prompt")
+
+
+@pytest.mark.asyncio
+async def test_stream_releases_slot_when_consumer_stops():
+    """Prueba que si el consumidor corta el stream se libera el lugar en el limitador."""
+    client = LLMClient(StubBackend(latency_ms=0), max_concurrency=1)
+    stream = client.stream("Usuario: una pregunta bastante larga para partir\nJarvis:")
+    primer_fragmento = await stream.__anext__()
+    assert primer_fragmento
+    await stream.aclose()
+
+    # Si el semáforo hubiera quedado tomado, esta llamada esperaría para siempre
+    respuesta = await asyncio.wait_for(client.generate("Usuario: hola\nJarvis:"), timeout=1)
+    assert "hola" in respuesta
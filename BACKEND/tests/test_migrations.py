@@ -0,0 +1,78 @@
+import pytest
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from database import migrate
+from database.models import Base
+
+
+def _schema(conn) -> dict:
+    inspector = inspect(conn)
+    return {
+        tabla: (
+            sorted(c["name"] for c in inspector.get_columns(tabla)),
+            sorted(i["name"] for i in inspector.get_indexes(tabla)),
+        )
+        for tabla in inspector.get_table_names()
+        if tabla != "schema_migrations"
+    }
+
+
+@pytest.mark.asyncio
+async def test_migrations_build_the_same_schema_as_the_models(tmp_path):
+    """Prueba que las migraciones dejan el mismo esquema que los modelos (si falla, falta una migración)."""
+    migrado = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'migrado.db'}")
+    modelos = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'modelos.db'}")
+    try:
+        aplicadas = await migrate.upgrade(migrado)
+        assert aplicadas == [m.VERSION for m in migrate.load_migrations()]
+        async with modelos.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+        async with migrado.connect() as a, modelos.connect() as b:
+            assert await a.run_sync(_schema) == await b.run_sync(_schema)
+
+        assert await migrate.upgrade(migrado) == []
+        await migrate.ensure_schema(migrado)
+    finally:
+        await migrado.dispose()
+        await modelos.dispose()
+
+
+@pytest.mark.asyncio
+async def test_startup_refuses_a_database_with_pending_migrations(tmp_path, monkeypatch):
+    """Prueba que el arranque no crea tablas por su cuenta salvo con DB_AUTO_MIGRATE."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'vieja.db'}")
+    try:
+        # Base creada por el create_all que hacía el lifespan antes de las migraciones
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        with pytest.raises(migrate.PendingMigrationsError):
+            await migrate.ensure_schema(engine)
+
+        monkeypatch.setattr(migrate, "DB_AUTO_MIGRATE", True)
+        await migrate.ensure_schema(engine)
+        assert await migrate.pending_migrations(engine) == []
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_migrations_bring_a_pre_migrations_database_up_to_the_models(tmp_path):
+    """Prueba que una base creada con el create_all de la versión publicada recibe los índices y tablas nuevos."""
+    from database.migrations import m0001_esquema_inicial
+
+    viejo = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'viejo.db'}")
+    modelos = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'modelos.db'}")
+    try:
+        async with viejo.begin() as conn:
+            await conn.run_sync(m0001_esquema_inicial.metadata.create_all)
+        await migrate.upgrade(viejo)
+        async with modelos.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+        async with viejo.connect() as a, modelos.connect() as b:
+            assert await a.run_sync(_schema) == await b.run_sync(_schema)
+    finally:
+        await viejo.dispose()
+        await modelos.dispose()
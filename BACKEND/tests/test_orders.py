@@ -0,0 +1,74 @@
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from BACKEND.database.models import Categoria, Orden, OrdenProducto, Producto
+from BACKEND.main import app
+from BACKEND.tests.conftest import test_engine
+
+
+async def crear_ordenes(db_session: AsyncSession, cantidad: int, user_id: str = "user-1"):
+    categoria = Categoria(nombre="Camperas")
+    db_session.add(categoria)
+    await db_session.flush()
+    productos = [
+        Producto(nombre=f"Campera {i}", precio=1000 + i, stock=5, sku=f"CAM-{i}", url=f"campera-{i}", categoria_id=categoria.id)
+        for i in range(3)
+    ]
+    db_session.add_all(productos)
+    await db_session.flush()
+    for i in range(cantidad):
+        orden = Orden(user_id=user_id, total=100 * (i + 1))
+        db_session.add(orden)
+        await db_session.flush()
+        db_session.add_all([
+            OrdenProducto(orden_id=orden.id, producto_id=producto.id, cantidad=i + 1) for producto in productos
+        ])
+    await db_session.commit()
+    db_session.expunge_all()
+
+
+@pytest.mark.asyncio
+async def test_sales_detail_uses_fixed_number_of_queries(admin_client: AsyncClient, db_session: AsyncSession):
+    """Prueba que el detalle de ventas trae órdenes, líneas y productos en 3 consultas, sin N+1."""
+    await crear_ordenes(db_session, 5)
+
+    statements = []
+    def contar(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(test_engine.sync_engine, "before_cursor_execute", contar)
+    try:
+        response = await admin_client.get("/api/admin/sales/detail", params={"limit": 4})
+    finally:
+        event.remove(test_engine.sync_engine, "before_cursor_execute", contar)
+
+    assert response.status_code == 200
+    page = response.json()
+    assert len(page["items"]) == 4
+    assert page["next_cursor"] is not None
+    assert len(page["items"][0]["productos"]) == 3
+    assert page["items"][0]["productos"][0]["producto"]["nombre"].startswith("Campera")
+    assert len(statements) == 3
+
+
+@pytest.mark.asyncio
+async def test_my_orders_only_returns_current_user_orders(client: AsyncClient, db_session: AsyncSession):
+    """Prueba que el historial de compras solo devuelve las órdenes del usuario logueado."""
+    from schemas.user_schemas import UserOut
+    from services.auth_services import get_current_user
+
+    await crear_ordenes(db_session, 2, user_id="user-1")
+    db_session.add(Orden(user_id="user-2", total=999))
+    await db_session.commit()
+
+    async def override_current_user() -> UserOut:
+        return UserOut(_id="user-1", email="cliente@test.com", name="Cliente", last_name="Test")
+
+    app.dependency_overrides[get_current_user] = override_current_user
+    response = await client.get("/api/orders/me")
+    assert response.status_code == 200
+    items = response.json()["items"]
+    assert [orden["total"] for orden in items] == [200.0, 100.0]
+    assert all(orden["user_id"] == "user-1" for orden in items)
@@ -0,0 +1,36 @@
+import pytest
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from database import pool_metrics
+
+
+@pytest.mark.asyncio
+async def test_instrumented_pool_reports_usage_waits_and_timeouts(tmp_path):
+    """Prueba que el pool instrumentado registra conexiones en uso, esperas y timeouts."""
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}",
+        poolclass=pool_metrics.InstrumentedQueuePool,
+        pool_size=1, max_overflow=0, pool_timeout=0.1, pool_pre_ping=True,
+    )
+    pool_metrics.instrument_pool(engine)
+    timeouts_antes = pool_metrics.db_pool_checkout_timeouts_total.value()
+
+    try:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            assert pool_metrics.db_pool_in_use.value() == 1
+
+            # El pool de 1 conexión está ocupado: el segundo pedido espera y da timeout
+            with pytest.raises(exc.TimeoutError):
+                async with engine.connect():
+                    pass
+            assert pool_metrics.db_pool_checkout_timeouts_total.value() == timeouts_antes + 1
+
+        assert pool_metrics.db_pool_in_use.value() == 0
+        estado = pool_metrics.pool_status(engine, {"pool_size": 1})
+        assert estado["en_uso"] == 0 and estado["libres"] == 1
+        esperas = pool_metrics.db_pool_checkout_seconds.samples()[0][1]
+        assert esperas["count"] >= 2
+    finally:
+        await engine.dispose()
@@ -22,8 +22,8 @@ async def test_get_products_with_data(client: AsyncClient, db_session: AsyncSess
 
     # Insertar productos con categoria_id válido
     db_session.add_all([
-        Producto(nombre="Camiseta Test", precio=100.0, stock=10, categoria_id=categoria.id, sku="SKU-CAM-TEST"),
-        Producto(nombre="Pantalón Test", precio=200.0, stock=5, categoria_id=categoria.id, sku="SKU-PAN-TEST"),
+        Producto(nombre="Camiseta Test", precio=100.0, stock=10, categoria_id=categoria.id, sku="SKU-CAM-TEST", url="camiseta-test"),
+        Producto(nombre="Pantalón Test", precio=200.0, stock=5, categoria_id=categoria.id, sku="SKU-PAN-TEST", url="pantalon-test"),
     ])
     await db_session.commit()
 
@@ -45,7 +45,7 @@ async def test_get_single_product_found(client: AsyncClient, db_session: AsyncSe
     await db_session.refresh(categoria)
 
     producto_unico = Producto(
-        nombre="Producto Único", precio=150.0, stock=3, categoria_id=categoria.id, sku="SKU-UNICO-1"
+        nombre="Producto Único", precio=150.0, stock=3, categoria_id=categoria.id, sku="SKU-UNICO-1", url="producto-unico"
     )
     db_session.add(producto_unico)
     await db_session.commit()
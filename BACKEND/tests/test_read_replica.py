@@ -0,0 +1,46 @@
+import pytest
+
+from database import database
+
+
+@pytest.fixture
+def replica(monkeypatch):
+    """Simula una réplica configurada cuyo atraso controla el test."""
+    estado = {"lag": 0.0, "consultas": 0}
+
+    async def fake_lag():
+        estado["consultas"] += 1
+        if isinstance(estado["lag"], Exception):
+            raise estado["lag"]
+        return estado["lag"]
+
+    monkeypatch.setattr(database, "read_engine", object())
+    monkeypatch.setattr(database, "_replica_lag", fake_lag)
+    monkeypatch.setattr(database, "DB_READ_MAX_LAG_SECONDS", 5)
+    monkeypatch.setattr(database, "_replica", {"ok": True, "checked_at": float("-inf")})
+    return estado
+
+
+@pytest.mark.asyncio
+async def test_sin_replica_usa_el_primario():
+    assert database.read_engine is database.engine
+    assert await database.get_read_sessionmaker() is database.AsyncSessionLocal
+
+
+@pytest.mark.asyncio
+async def test_replica_al_dia_y_chequeo_cacheado(replica):
+    assert await database.get_read_sessionmaker() is database.ReadSessionLocal
+    assert await database.get_read_sessionmaker() is database.ReadSessionLocal
+    assert replica["consultas"] == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("lag", [30.0, None, ConnectionError("réplica caída")])
+async def test_replica_atrasada_o_caida_vuelve_al_primario(replica, monkeypatch, lag):
+    replica["lag"] = lag
+    assert await database.get_read_sessionmaker() is database.AsyncSessionLocal
+
+    # Cuando vence el chequeo y la réplica se puso al día, las lecturas vuelven a ella
+    replica["lag"] = 1.0
+    monkeypatch.setattr(database, "DB_READ_LAG_CHECK_SECONDS", 0)
+    assert await database.get_read_sessionmaker() is database.ReadSessionLocal
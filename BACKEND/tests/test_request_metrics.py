@@ -0,0 +1,42 @@
+import pytest
+from httpx import AsyncClient
+
+from utils import metrics
+from utils.request_metrics import http_request_db_queries, http_requests_total
+
+
+@pytest.mark.asyncio
+async def test_requests_are_measured_per_route_with_their_queries(client: AsyncClient):
+    """Prueba que el middleware cuenta los requests por plantilla de ruta y las consultas SQL de cada uno."""
+    ruta = "/api/products/{product_id}"
+    antes = http_requests_total.value(method="GET", route=ruta, status=404)
+
+    response = await client.get("/api/products/999")
+    assert response.status_code == 404
+    assert http_requests_total.value(method="GET", route=ruta, status=404) == antes + 1
+
+    consultas = dict((tuple(labels.values()), value) for labels, value in http_request_db_queries.samples())
+    sql = consultas[(ruta, "sql")]
+    assert sql["count"] >= 1 and sql["sum"] >= 1
+    assert consultas[(ruta, "mongo")]["sum"] == 0
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_serves_prometheus_text(client: AsyncClient):
+    """Prueba que /metrics devuelve las métricas en formato de texto de Prometheus."""
+    await client.get("/api/products/")
+    response = await client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+
+    body = response.text
+    assert "# TYPE http_request_duration_seconds histogram" in body
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/api/products/",le="+Inf"}' in body
+    assert 'db_queries_total{db="sql",operacion="SELECT"}' in body
+
+
+def test_render_prometheus_escapes_label_values():
+    """Prueba que los valores de los labels se escapan según el formato de Prometheus."""
+    contador = metrics.counter("test_render_total", "Contador de prueba", ["valor"])
+    contador.inc(valor='dice "hola"\n')
+    assert 'test_render_total{valor="dice \\"hola\\"\\n"} 1' in metrics.render_prometheus()
@@ -0,0 +1,53 @@
+import marshal
+
+import pytest
+from httpx import AsyncClient
+
+from benchmarks.standins import InMemoryMongo
+from services import request_profiler
+from utils.security import create_access_token
+
+
+@pytest.fixture(autouse=True)
+def users(monkeypatch):
+    # El middleware busca al usuario del token en Mongo: usamos el de los benchmarks
+    mongo = InMemoryMongo()
+    monkeypatch.setattr(request_profiler, "get_nosql_database", lambda: mongo)
+    return mongo.users
+
+
+def _token(users, email: str, role: str) -> dict:
+    users._docs.append({"_id": f"id-{role}", "email": email, "name": "Test", "last_name": "Test", "role": role})
+    return {"Authorization": f"Bearer {create_access_token({'sub': email})}"}
+
+
+@pytest.mark.asyncio
+async def test_admin_can_profile_a_request_inline_or_store_it(admin_client: AsyncClient, users):
+    """Prueba que un admin recibe el reporte de cProfile o lo guarda para bajarlo después."""
+    headers = _token(users, "perfil-admin@test.com", "admin")
+
+    response = await admin_client.get("/api/products/", headers={**headers, "X-Profile": "inline"})
+    assert response.status_code == 200
+    assert response.headers["x-profile-status"] == "200"
+    assert "function calls" in response.text
+
+    response = await admin_client.get("/api/products/", params={"_profile": "store"}, headers=headers)
+    assert response.status_code == 200
+    assert response.json() == []
+    profile_id = response.headers["x-profile-id"]
+
+    listado = (await admin_client.get("/api/admin/profiles")).json()
+    assert listado[0]["id"] == profile_id and listado[0]["path"] == "/api/products/"
+    descarga = await admin_client.get(f"/api/admin/profiles/{profile_id}", params={"formato": "pstats"})
+    assert descarga.status_code == 200
+    assert marshal.loads(descarga.content)
+
+
+@pytest.mark.asyncio
+async def test_profile_flag_is_ignored_for_non_admins(client: AsyncClient, users):
+    """Prueba que el header de perfilado no tiene efecto si el usuario no es admin."""
+    headers = _token(users, "perfil-cliente@test.com", "cliente")
+    response = await client.get("/api/products/", headers={**headers, "X-Profile": "inline"})
+    assert response.status_code == 200
+    assert response.json() == []
+    assert "x-profile-id" not in response.headers
@@ -0,0 +1,139 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from benchmarks.standins import InMemoryMongo
+from services import cart_services
+from services.scheduler import CronSchedule, Job, LocalLeaderLock, MongoLeaderLock, Scheduler, scheduler_job_skipped_total
+
+
+def test_cron_next_after():
+    assert CronSchedule("30 4 * * *").next_after(datetime(2026, 10, 19, 5, 0)) == datetime(2026, 10, 20, 4, 30)
+    # Viernes 17:50 -> lunes 9:00
+    assert CronSchedule("*/15 9-17 * * 1-5").next_after(datetime(2026, 10, 23, 17, 50)) == datetime(2026, 10, 26, 9, 0)
+    # Con día del mes y de la semana alcanza con uno de los dos: el domingo 25 va antes que el 1°
+    assert CronSchedule("0 0 1 * 0").next_after(datetime(2026, 10, 19, 12, 0)) == datetime(2026, 10, 25, 0, 0)
+    with pytest.raises(ValueError):
+        CronSchedule("61 * * * *")
+
+
+@pytest.mark.asyncio
+async def test_interval_job_skips_overlapping_runs_and_records_failures():
+    sched = Scheduler(leader_lock=LocalLeaderLock())
+    lenta = sched.add_job(Job("test_lenta", lambda: asyncio.sleep(0.15), every=0.02, run_at_start=True))
+
+    async def falla():
+        raise RuntimeError("se cayó")
+
+    fallida = sched.add_job(Job("test_fallida", falla, every=0.02, run_at_start=True))
+    await sched.start()
+    await asyncio.sleep(0.1)
+    await sched.stop()
+
+    # La primera ejecución de la lenta seguía en curso: las demás se saltearon, y el stop la esperó
+    assert lenta.runs == 1 and lenta.last_status == "ok"
+    assert scheduler_job_skipped_total.value(job="test_lenta", motivo="en_curso") >= 2
+    assert fallida.failures == fallida.runs >= 2
+    assert fallida.last_error == "RuntimeError: se cayó"
+
+
+@pytest.mark.asyncio
+async def test_trigger_runs_job_early():
+    sched = Scheduler()
+    corridas = []
+
+    async def tarea():
+        corridas.append(1)
+
+    job = sched.add_job(Job("test_trigger", tarea, every=3600))
+    await sched.start()
+    await asyncio.sleep(0.01)
+    assert corridas == []
+    sched.trigger("test_trigger")
+    await asyncio.sleep(0.01)
+    await sched.stop()
+    assert corridas == [1] and job.status()["ejecuciones"] == 1
+
+
+@pytest.mark.asyncio
+async def test_trigger_during_a_run_repeats_the_job_when_it_finishes():
+    sched = Scheduler()
+    corridas = []
+
+    async def tarea():
+        corridas.append(1)
+        await asyncio.sleep(0.05)
+
+    job = sched.add_job(Job("test_trigger_en_curso", tarea, every=3600, run_at_start=True))
+    await sched.start()
+    await asyncio.sleep(0.01)
+    sched.trigger("test_trigger_en_curso")
+    sched.trigger("test_trigger_en_curso")
+    await asyncio.sleep(0.01)
+    assert corridas == [1] and job.pending
+    await asyncio.sleep(0.1)
+    await sched.stop()
+    # Los dos triggers que llegaron durante la primera ejecución se juntan en una sola repetición
+    assert corridas == [1, 1] and not job.pending
+
+
+@pytest.mark.asyncio
+async def test_triggers_within_min_interval_are_deferred_and_merged():
+    sched = Scheduler()
+    inicios = []
+
+    async def tarea():
+        inicios.append(asyncio.get_running_loop().time())
+
+    sched.add_job(Job("test_min_interval", tarea, every=3600, run_at_start=True, min_interval=0.1))
+    await sched.start()
+    await asyncio.sleep(0.01)
+    for _ in range(5):
+        sched.trigger("test_min_interval")
+        await asyncio.sleep(0.01)
+    assert len(inicios) == 1
+    await asyncio.sleep(0.15)
+    await sched.stop()
+    # Los cinco triggers terminan en una sola ejecución, recién pasado el intervalo mínimo
+    assert len(inicios) == 2 and inicios[1] - inicios[0] >= 0.09
+
+
+@pytest.mark.asyncio
+async def test_singleton_jobs_run_only_on_the_leader():
+    locks = InMemoryMongo().scheduler_locks
+    lider, otro = MongoLeaderLock(collection=locks), MongoLeaderLock(collection=locks)
+    corridas = []
+
+    async def tarea(nombre):
+        corridas.append(nombre)
+
+    schedulers = []
+    for nombre, lock in (("lider", lider), ("otro", otro)):
+        sched = Scheduler(leader_lock=lock)
+        sched.add_job(Job(f"test_singleton_{nombre}", lambda n=nombre: tarea(n), every=3600, singleton=True, run_at_start=True))
+        await sched.start()
+        schedulers.append(sched)
+    await asyncio.sleep(0.01)
+
+    assert corridas == ["lider"]
+    assert [s.is_leader for s in schedulers] == [True, False]
+
+    # Al apagar, el líder libera el lock y el otro worker puede tomarlo
+    await schedulers[0].stop()
+    assert await otro.acquire() is True
+    await schedulers[1].stop()
+
+
+@pytest.mark.asyncio
+async def test_expire_guest_carts():
+    db = InMemoryMongo()
+    viejo = datetime.now() - timedelta(days=cart_services.CART_GUEST_TTL_DAYS + 1)
+    await db.carts.insert_many([
+        {"guest_session_id": "abandonado", "items": [], "last_updated": viejo},
+        {"guest_session_id": "reciente", "items": [], "last_updated": datetime.now()},
+        {"user_id": "u1", "items": [], "last_updated": viejo},
+    ])
+    assert await cart_services.expire_guest_carts(db) == 1
+    restantes = await db.carts.find({}).to_list()
+    assert {c.get("guest_session_id") or c["user_id"] for c in restantes} == {"reciente", "u1"}
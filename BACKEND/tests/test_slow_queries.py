@@ -0,0 +1,41 @@
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from database import slow_queries
+from database.query_metrics import instrument_engine
+
+
+def test_normalize_statement_groups_equivalent_queries():
+    """Prueba que sentencias que solo difieren en valores o en el largo de un IN tienen la misma huella."""
+    a = slow_queries.normalize_statement("SELECT * FROM productos WHERE id IN (1, 2, 3) AND nombre = 'remera'")
+    b = slow_queries.normalize_statement("SELECT *  FROM productos\n WHERE id IN (?, ?) AND nombre = ?")
+    assert a == b == "SELECT * FROM productos WHERE id IN (?...) AND nombre = ?"
+    assert slow_queries.parameter_shape((1, "remera")) == ["int", "str"]
+
+
+@pytest.mark.asyncio
+async def test_slow_queries_are_kept_with_their_explain_plan(tmp_path, monkeypatch, admin_client: AsyncClient):
+    """Prueba que una consulta lenta queda en el log con su plan y se ve desde el endpoint de admin."""
+    monkeypatch.setattr(slow_queries, "SLOW_QUERY_THRESHOLD_MS", 0.000001)
+    slow_queries.reset()
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'lenta.db'}")
+    instrument_engine(engine)
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, nombre TEXT)"))
+            for nombre in ("a", "b"):
+                await conn.execute(text("SELECT id FROM items WHERE nombre = :nombre"), {"nombre": nombre})
+        await slow_queries.wait_for_explains()
+    finally:
+        await engine.dispose()
+
+    monkeypatch.setattr(slow_queries, "SLOW_QUERY_THRESHOLD_MS", 0)
+    response = await admin_client.get("/api/admin/metrics/slow-queries")
+    assert response.status_code == 200
+    select = next(q for q in response.json() if q["sentencia"] == "SELECT id FROM items WHERE nombre = ?")
+    assert select["cantidad"] == 2
+    assert select["parametros"] == ["str"]
+    assert select["explain"] and select["explain_error"] is None
+    slow_queries.reset()
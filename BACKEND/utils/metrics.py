@@ -0,0 +1,177 @@
+# En backend/utils/metrics.py
+
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+# Registro de métricas en memoria del proceso (contadores, gauges e histogramas).
+# Cada módulo declara sus métricas con `counter()`, `gauge()` o `histogram()`;
+# si ya existe una con el mismo nombre se devuelve la misma instancia.
+
+# Buckets por defecto (en segundos), pensados para latencias de requests y consultas
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_lock = threading.Lock()
+_registry: Dict[str, "Metric"] = {}
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, description: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], object] = {}
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        return tuple(str(labels.get(label, "")) for label in self.labelnames)
+
+    def samples(self):
+        """Devuelve [(dict de labels, valor)] con una copia de los valores actuales."""
+        with _lock:
+            return [(dict(zip(self.labelnames, key)), self._copy(value)) for key, value in self._values.items()]
+
+    def _copy(self, value):
+        return value
+
+    def reset(self):
+        with _lock:
+            self._values.clear()
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with _lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, description, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with _lock:
+            data = self._values.get(key)
+            if data is None:
+                data = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+                self._values[key] = data
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    data["buckets"][i] += 1
+            data["sum"] += value
+            data["count"] += 1
+
+    def _copy(self, value):
+        return {"buckets": list(value["buckets"]), "sum": value["sum"], "count": value["count"]}
+
+
+def _get_or_create(cls, name: str, description: str, labelnames: Iterable[str], **kwargs):
+    with _lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = cls(name, description, labelnames, **kwargs)
+            _registry[name] = metric
+        return metric
+
+
+def counter(name: str, description: str, labelnames: Iterable[str] = ()) -> Counter:
+    return _get_or_create(Counter, name, description, labelnames)
+
+
+def gauge(name: str, description: str, labelnames: Iterable[str] = ()) -> Gauge:
+    return _get_or_create(Gauge, name, description, labelnames)
+
+
+def histogram(name: str, description: str, labelnames: Iterable[str] = (), buckets: Optional[Iterable[float]] = None) -> Histogram:
+    return _get_or_create(Histogram, name, description, labelnames, buckets=buckets or DEFAULT_BUCKETS)
+
+
+def snapshot(prefix: str = "") -> dict:
+    """Foto de todas las métricas registradas (opcionalmente filtradas por prefijo), lista para JSON."""
+    result = {}
+    for name, metric in sorted(_registry.items()):
+        if not name.startswith(prefix):
+            continue
+        samples = []
+        for labels, value in metric.samples():
+            if metric.kind == "histogram":
+                value = {
+                    "count": value["count"],
+                    "sum": value["sum"],
+                    "avg": value["sum"] / value["count"] if value["count"] else 0.0,
+                    "buckets": dict(zip((str(b) for b in metric.buckets), value["buckets"])),
+                }
+            samples.append({"labels": labels, "value": value})
+        result[name] = {"type": metric.kind, "description": metric.description, "samples": samples}
+    return result
+
+
+# --- Exposición en formato de texto de Prometheus ---
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    partes = []
+    for name, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        partes.append(f'{name}="{value}"')
+    return "{" + ",".join(partes) + "}"
+
+
+def render_prometheus() -> str:
+    """Todas las métricas registradas en el formato de texto que lee Prometheus (versión 0.0.4)."""
+    lines = []
+    for name, metric in sorted(_registry.items()):
+        description = metric.description.replace("\\", "\\\\").replace("\n", "\\n")
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+        for labels, value in metric.samples():
+            if metric.kind != "histogram":
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                continue
+            # Los buckets ya son acumulativos: cada observación suma en todos los `le` que la cubren
+            for bound, count in zip(metric.buckets, value["buckets"]):
+                lines.append(f"{name}_bucket{_format_labels({**labels, 'le': _format_value(float(bound))})} {count}")
+            lines.append(f"{name}_bucket{_format_labels({**labels, 'le': '+Inf'})} {value['count']}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(value['sum'])}")
+            lines.append(f"{name}_count{_format_labels(labels)} {value['count']}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,71 @@
+# En backend/utils/pagination.py
+
+import json
+from typing import Any, AsyncIterator, Iterable, Optional, Set, Tuple
+
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+
+# --- CONFIGURACIÓN DE PAGINACIÓN ---
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+# Cantidad de filas que se traen de la base por tanda cuando se stremea una exportación
+STREAM_BATCH_SIZE = 500
+
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str]) -> Optional[Set[str]]:
+    """
+    Convierte el parámetro `fields` ("id,total,creado_en") en un set validado.
+    Devuelve None si no se pidió proyección (se devuelven todos los campos).
+    """
+    if not fields:
+        return None
+
+    allowed = set(allowed)
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    invalid = requested - allowed
+    if invalid:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Campos inválidos: {', '.join(sorted(invalid))}. Permitidos: {', '.join(sorted(allowed))}"
+        )
+    return requested
+
+
+def parse_int_cursor(cursor: Optional[str]) -> Optional[int]:
+    """Valida un cursor numérico (el último id visto en la página anterior)."""
+    if cursor is None:
+        return None
+    try:
+        return int(cursor)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor inválido")
+
+
+def keyset_cursor(valor, last_id: int) -> str:
+    """Cursor de un listado ordenado por (columna, id): "<valor ISO>_<id>" de la última fila vista."""
+    return f"{valor}_{last_id}"
+
+
+def parse_keyset_cursor(cursor: Optional[str], tipo: type) -> Optional[Tuple[Any, int]]:
+    """Valida un cursor de `keyset_cursor` y devuelve (valor, id), con el valor como `tipo` (date o datetime)."""
+    if cursor is None:
+        return None
+    valor, _, last_id = cursor.rpartition("_")
+    try:
+        return tipo.fromisoformat(valor), int(last_id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor inválido")
+
+
+def ndjson_response(items: AsyncIterator[dict]) -> StreamingResponse:
+    """
+    Arma una respuesta NDJSON (un objeto JSON por línea) a partir de un iterador asíncrono.
+    Así las exportaciones grandes no se cargan enteras en memoria.
+    """
+    async def body():
+        async for item in items:
+            yield json.dumps(jsonable_encoder(item), ensure_ascii=False) + "\n"
+
+    return StreamingResponse(body(), media_type="application/x-ndjson")
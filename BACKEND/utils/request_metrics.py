@@ -0,0 +1,96 @@
+# En backend/utils/request_metrics.py
+
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from utils import metrics
+
+# Latencia y códigos de respuesta por ruta, más cuántas consultas a las bases hace cada
+# request. Los hooks de SQLAlchemy y Motor (database/query_metrics.py) suman en el
+# `RequestStats` del request en curso, que viaja en un ContextVar.
+
+# Buckets para "consultas por request": un endpoint que hace 50 es un N+1 casi seguro
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+http_requests_total = metrics.counter(
+    "http_requests_total", "Requests HTTP atendidos, por ruta y código de respuesta", ["method", "route", "status"]
+)
+http_request_duration_seconds = metrics.histogram(
+    "http_request_duration_seconds", "Latencia de los requests HTTP hasta terminar de enviar la respuesta", ["method", "route"]
+)
+http_requests_in_progress = metrics.gauge("http_requests_in_progress", "Requests HTTP en curso")
+http_request_db_queries = metrics.histogram(
+    "http_request_db_queries", "Consultas a la base por request", ["route", "db"], buckets=QUERY_COUNT_BUCKETS
+)
+http_request_db_seconds = metrics.histogram(
+    "http_request_db_seconds", "Tiempo total de consultas a la base por request", ["route", "db"]
+)
+
+# Bases que se reportan siempre (aunque el request no haya hecho consultas)
+DATABASES = ("sql", "mongo")
+
+
+class RequestStats:
+    """Consultas hechas durante un request, por base: {"sql": [cantidad, segundos], ...}."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.queries = {db: [0, 0.0] for db in DATABASES}
+
+    def add(self, db: str, seconds: float) -> None:
+        stats = self.queries.setdefault(db, [0, 0.0])
+        stats[0] += 1
+        stats[1] += seconds
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_stats() -> Optional[RequestStats]:
+    """Las estadísticas del request en curso, o None fuera de un request (tareas de fondo, workers)."""
+    return _current.get()
+
+
+def _route_label(scope) -> str:
+    # FastAPI deja la ruta que matcheó en el scope: usamos su plantilla ("/api/products/{product_id}")
+    # y no el path real, para no crear una serie por cada id.
+    route = scope.get("route")
+    return getattr(route, "path", None) or "sin_ruta"
+
+
+class MetricsMiddleware:
+    """Middleware ASGI que mide cada request HTTP (incluye el envío completo de las respuestas en streaming)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope["path"])
+        token = _current.set(stats)
+        status = 500
+        start = time.perf_counter()
+        http_requests_in_progress.inc()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duracion = time.perf_counter() - start
+            http_requests_in_progress.dec()
+            _current.reset(token)
+            route = _route_label(scope)
+            http_requests_total.inc(method=scope["method"], route=route, status=status)
+            http_request_duration_seconds.observe(duracion, method=scope["method"], route=route)
+            for db, (cantidad, segundos) in stats.queries.items():
+                http_request_db_queries.observe(cantidad, route=route, db=db)
+                http_request_db_seconds.observe(segundos, route=route, db=db)
@@ -1,12 +1,20 @@
 import asyncio
+import hashlib
 import imaplib
 import email
+import html
 import logging
 import os
-import smtplib
+import re
 import sys
+import time
+from email.message import EmailMessage
 from email.utils import parseaddr
+from typing import AsyncIterator, List, Optional, Sequence, Tuple
+import aiosmtplib
 from dotenv import load_dotenv
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
 
 # --- Agrego ruta raíz del proyecto para importar módulos ---
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
@@ -15,113 +23,450 @@ if project_root not in sys.path:
 
 from services import ia_services
 from database.database import AsyncSessionLocal
+from database.models import EmailRespondido
+from utils import metrics
+from workers.imap_client import AsyncIMAPClient, IMAPError
 
 # --- Configuración ---
 load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-IMAP_SERVER = "imap.gmail.com"
+IMAP_SERVER = os.getenv("IMAP_SERVER", "imap.gmail.com")
+IMAP_PORT = int(os.getenv("IMAP_PORT", 993))
+IMAP_SSL = os.getenv("IMAP_SSL", "true").lower() == "true"
 EMAIL_ACCOUNT = os.getenv("EMAIL_SENDER")
 EMAIL_PASSWORD = os.getenv("EMAIL_APP_PASSWORD")
-SMTP_SERVER = "smtp.gmail.com"
-SMTP_PORT = 587
+SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", 587))
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "true").lower() == "true"
+SMTP_TIMEOUT_SECONDS = int(os.getenv("SMTP_TIMEOUT_SECONDS", 30))
+
+# Pipeline de cada ciclo: tareas que generan respuestas con la IA y tareas que las envían
+# (cada una con su propia sesión SMTP autenticada, que se reutiliza entre envíos)
+EMAIL_GENERATE_CONCURRENCY = int(os.getenv("EMAIL_GENERATE_CONCURRENCY", 8))
+EMAIL_SEND_CONCURRENCY = int(os.getenv("EMAIL_SEND_CONCURRENCY", 2))
+# Tamaño de las colas entre etapas (si se llenan, la etapa anterior espera)
+EMAIL_QUEUE_SIZE = int(os.getenv("EMAIL_QUEUE_SIZE", 100))
+
+# Cuántos mensajes se traen por cada UID FETCH
+IMAP_FETCH_BATCH = int(os.getenv("IMAP_FETCH_BATCH", 50))
+# Cuánto se queda en IDLE antes de renovarlo (el RFC 2177 pide menos de 29 minutos)
+IMAP_IDLE_TIMEOUT_SECONDS = int(os.getenv("IMAP_IDLE_TIMEOUT_SECONDS", 25 * 60))
+# Si el servidor no soporta IDLE, cada cuánto se vuelve a chequear
+EMAIL_POLL_SECONDS = int(os.getenv("EMAIL_POLL_SECONDS", 120))
+# Espera antes de reconectar después de un error de conexión
+EMAIL_RECONNECT_SECONDS = int(os.getenv("EMAIL_RECONNECT_SECONDS", 30))
+# Después de tantos intentos fallidos el email se marca como leído y no se reintenta más
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", 5))
+
+# --- Métricas ---
+email_ingest_messages_total = metrics.counter(
+    "email_ingest_messages_total", "Emails traídos del servidor IMAP por resultado", ["resultado"]
+)
+email_ingest_fetches_total = metrics.counter(
+    "email_ingest_fetches_total", "Comandos UID FETCH mandados al servidor IMAP"
+)
+email_ingest_cycle_seconds = metrics.histogram(
+    "email_ingest_cycle_seconds", "Duración de cada ciclo de ingesta de emails"
+)
+email_ingest_cycle_messages = metrics.histogram(
+    "email_ingest_cycle_messages", "Emails procesados por ciclo", buckets=(0, 1, 5, 10, 50, 100, 500, 1000)
+)
+email_ingest_throughput = metrics.gauge(
+    "email_ingest_throughput", "Emails por segundo procesados en el último ciclo"
+)
+email_ingest_lag_seconds = metrics.histogram(
+    "email_ingest_lag_seconds", "Tiempo entre que el email llegó al servidor y se procesó",
+    buckets=(1, 5, 15, 60, 300, 900, 3600, 14400, 86400),
+)
+email_duplicates_total = metrics.counter(
+    "email_duplicates_total", "Emails salteados porque su Message-ID ya se había contestado"
+)
+email_stage_seconds = metrics.histogram(
+    "email_stage_seconds", "Duración de cada etapa del pipeline por email", ["etapa"]
+)
+smtp_connections_total = metrics.counter(
+    "smtp_connections_total", "Conexiones SMTP abiertas (handshake + login)"
+)
+email_ingest_wakeups_total = metrics.counter(
+    "email_ingest_wakeups_total", "Motivo por el que se despertó el worker", ["motivo"]
+)
+
+
+def _decode_part(part) -> str:
+    payload = part.get_payload(decode=True) or b""
+    return payload.decode(part.get_content_charset() or 'utf-8', 'ignore')
+
+
+def _html_to_text(contenido: str) -> str:
+    contenido = re.sub(r"(?is)<(script|style)\b.*?</\1>", " ", contenido)
+    contenido = re.sub(r"(?i)<br\s*/?>|</p>|</div>", "\n", contenido)
+    return html.unescape(re.sub(r"<[^>]+>", " ", contenido)).strip()
 
 
 def get_email_body(msg):
-    """Extrae cuerpo texto plano del email."""
-    if msg.is_multipart():
-        for part in msg.walk():
-            if part.get_content_type() == "text/plain":
-                return part.get_payload(decode=True).decode('utf-8', 'ignore')
-    return msg.get_payload(decode=True).decode('utf-8', 'ignore')
+    """Extrae cuerpo texto plano del email (o el HTML sin etiquetas si no trae texto plano)."""
+    html_part = None
+    for part in msg.walk():
+        if part.is_multipart() or part.get_content_disposition() == "attachment":
+            continue
+        if part.get_content_type() == "text/plain":
+            return _decode_part(part)
+        if part.get_content_type() == "text/html" and html_part is None:
+            html_part = part
+    return _html_to_text(_decode_part(html_part)) if html_part is not None else ""
+
+
+def build_reply(original: email.message.Message, body: str) -> EmailMessage:
+    """Arma la respuesta, en el mismo hilo que el email original."""
+    msg = EmailMessage()
+    msg["From"] = EMAIL_ACCOUNT
+    msg["To"] = parseaddr(original["from"])[1]
+    msg["Subject"] = f"Re: {original['subject'] or ''}"
+    if original["Message-ID"]:
+        msg["In-Reply-To"] = original["Message-ID"]
+        msg["References"] = original["Message-ID"]
+    msg.set_content(body)
+    return msg
+
+
+class SMTPSession:
+    """
+    Conexión SMTP autenticada que se abre una vez y se reutiliza para todos los envíos de
+    una tarea (en lugar de hacer handshake TLS + login por cada respuesta). Si el servidor
+    cortó la conexión por inactividad, se reconecta y se reintenta una vez.
+    Con `reuse=False` se cierra después de cada envío (como el worker original).
+    """
+
+    def __init__(self, host: str = None, port: int = None, user: str = None, password: str = None,
+                 start_tls: bool = None, reuse: bool = True):
+        self.host = host or SMTP_SERVER
+        self.port = port or SMTP_PORT
+        self.user = user if user is not None else EMAIL_ACCOUNT
+        self.password = password if password is not None else EMAIL_PASSWORD
+        self.start_tls = SMTP_STARTTLS if start_tls is None else start_tls
+        self.reuse = reuse
+        self._smtp: Optional[aiosmtplib.SMTP] = None
 
+    async def _connect(self) -> aiosmtplib.SMTP:
+        if self._smtp is None or not self._smtp.is_connected:
+            smtp = aiosmtplib.SMTP(
+                hostname=self.host, port=self.port, start_tls=self.start_tls, timeout=SMTP_TIMEOUT_SECONDS
+            )
+            await smtp.connect()
+            if self.user:
+                await smtp.login(self.user, self.password)
+            smtp_connections_total.inc()
+            self._smtp = smtp
+        return self._smtp
 
-async def send_reply(sender_email, subject, body):
-    """Envía email respuesta asíncrona."""
+    async def send(self, msg: EmailMessage):
+        try:
+            for intento in range(2):
+                smtp = await self._connect()
+                try:
+                    await smtp.send_message(msg)
+                    return
+                except aiosmtplib.SMTPServerDisconnected:
+                    self._smtp = None
+                    if intento:
+                        raise
+        finally:
+            if not self.reuse:
+                await self.close()
+
+    async def close(self):
+        if self._smtp is not None:
+            try:
+                await self._smtp.quit()
+            except aiosmtplib.SMTPException:
+                pass
+            self._smtp = None
+
+
+async def send_reply(smtp: SMTPSession, msg: EmailMessage):
+    """Envía la respuesta por la sesión SMTP de la tarea."""
+    await smtp.send(msg)
+    logger.info(f"Respuesta enviada a {msg['To']}")
+
+
+def message_key(msg: email.message.Message) -> str:
+    """Message-ID del email (o un hash de remitente, fecha y asunto si no trae)."""
+    message_id = (msg["Message-ID"] or "").strip()
+    if message_id:
+        return message_id[:255]
+    firma = f"{msg['from']}|{msg['date']}|{msg['subject']}".encode("utf-8", "ignore")
+    return "sha1:" + hashlib.sha1(firma).hexdigest()
+
+
+async def claim_message(db_session, message_id: str, remitente: str) -> bool:
+    """
+    Registra el email como contestado antes de enviar la respuesta. Devuelve False si ya
+    estaba registrado (se contestó en un ciclo anterior, aunque no se llegó a marcar leído,
+    o se agotaron sus intentos). Un email liberado por un fallo anterior se vuelve a tomar.
+    """
+    db_session.add(EmailRespondido(message_id=message_id, remitente=remitente[:255]))
     try:
-        msg = email.message.Message()
-        msg['From'] = EMAIL_ACCOUNT
-        msg['To'] = sender_email
-        msg['Subject'] = f"Re: {subject}"
-        msg.add_header('Content-Type', 'text/plain; charset=UTF-8')
-        msg.set_payload(body.encode('utf-8'))
-
-        server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
-        server.starttls()
-        server.login(EMAIL_ACCOUNT, EMAIL_PASSWORD)
-        server.send_message(msg)
-        server.quit()
-        logger.info(f"Respuesta enviada a {sender_email}")
-    except Exception as e:
-        logger.error(f"Error al enviar email de respuesta: {e}")
+        await db_session.commit()
+        return True
+    except IntegrityError:
+        await db_session.rollback()
+    result = await db_session.execute(
+        update(EmailRespondido)
+        .where(EmailRespondido.message_id == message_id, EmailRespondido.liberado.is_(True))
+        .values(liberado=False)
+    )
+    await db_session.commit()
+    return result.rowcount == 1
 
 
-async def process_emails():
-    """Procesa emails no leídos, obtiene respuesta IA y contesta."""
+async def release_claim(db_session, message_id: str) -> bool:
+    """
+    Si la respuesta no se pudo generar o enviar, cuenta el fallo y libera el email para
+    reintentarlo en el próximo ciclo. Devuelve False si ya falló EMAIL_MAX_ATTEMPTS veces:
+    entonces queda tomado y el email se marca como leído para no reintentarlo más.
+    """
     try:
-        mail = imaplib.IMAP4_SSL(IMAP_SERVER)
-        mail.login(EMAIL_ACCOUNT, EMAIL_PASSWORD)
-        mail.select("inbox")
-        _, data = mail.search(None, "UNSEEN")
-        mail_ids = data[0].split()
+        fallos = (await db_session.execute(
+            select(EmailRespondido.fallos).where(EmailRespondido.message_id == message_id)
+        )).scalar_one() + 1
+        reintentar = fallos < EMAIL_MAX_ATTEMPTS
+        await db_session.execute(
+            update(EmailRespondido)
+            .where(EmailRespondido.message_id == message_id)
+            .values(fallos=fallos, liberado=reintentar)
+        )
+        await db_session.commit()
+    except Exception as e:
+        await db_session.rollback()
+        logger.error(f"No se pudo liberar el email {message_id} para reintentarlo: {e}")
+        return True
+    if not reintentar:
+        logger.error(f"El email {message_id} falló {fallos} veces: se marca como leído y no se reintenta más.")
+    return reintentar
 
-        if not mail_ids:
-            logger.info("No hay emails nuevos.")
-            mail.logout()
-            return
 
-        logger.info(f"Se encontraron {len(mail_ids)} emails nuevos.")
+def parse_internaldate(raw: Optional[bytes]) -> Optional[float]:
+    """INTERNALDATE del servidor ("17-Jul-2025 02:44:25 -0300") como timestamp."""
+    if not raw:
+        return None
+    fecha = imaplib.Internaldate2tuple(b'INTERNALDATE "' + raw + b'"')
+    return time.mktime(fecha) if fecha else None
 
-        async with AsyncSessionLocal() as db_session:
-            for mail_id in mail_ids:
-                try:
-                    _, data = mail.fetch(mail_id, "(RFC822)")
-                    msg = email.message_from_bytes(data[0][1])
 
-                    body = get_email_body(msg)
-                    sender_email = parseaddr(msg["from"])[1]
-                    subject = msg["subject"]
+async def fetch_unseen(imap: AsyncIMAPClient, batch_size: int = None) -> AsyncIterator[List[Tuple[int, Optional[float], email.message.Message]]]:
+    """Busca los UIDs no leídos y los trae de a `batch_size` (IMAP_FETCH_BATCH) por cada UID FETCH."""
+    batch_size = batch_size or IMAP_FETCH_BATCH
+    uids = await imap.uid_search("UNSEEN")
+    for i in range(0, len(uids), batch_size):
+        email_ingest_fetches_total.inc()
+        lote = await imap.uid_fetch(uids[i:i + batch_size])
+        yield [(uid, parse_internaldate(fecha), email.message_from_bytes(raw)) for uid, fecha, raw in lote]
 
-                    logger.info(f"Procesando email de: {sender_email}")
 
-                    # Obtener catálogo y prompt sistema
-                    catalog = await ia_services.get_catalog_from_db(db_session)
-                    system_prompt = ia_services.get_chatbot_system_prompt()
-                    full_system_prompt = f"{system_prompt}\n\n{catalog}"
+async def generate_reply(db_session, msg: email.message.Message) -> EmailMessage:
+    """Obtiene la respuesta de la IA para un email y arma el mensaje a enviar."""
+    body = get_email_body(msg)
+    sender_email = parseaddr(msg["from"])[1]
 
-                    # Construir historial para Gemini: empty porque email
-                    gemini_history = []
+    logger.info(f"Procesando email de: {sender_email}")
 
-                    # Usar get_gemini_response adecuadamente: (system_prompt, history, pregunta)
-                    ai_response = ia_services.get_gemini_response(full_system_prompt, gemini_history, body)
+    # Obtener los productos relevantes del catálogo (cacheado por versión) y prompt sistema
+    catalog = await ia_services.get_catalog_context_for_query(db_session, body)
+    system_prompt = ia_services.get_chatbot_system_prompt()
+    full_system_prompt = f"{system_prompt}\n\n{catalog}"
 
-                    # Enviar respuesta
-                    await send_reply(sender_email, subject, ai_response)
+    # Construir historial para Gemini: empty porque email
+    gemini_history = []
 
-                    # Marcar como leído
-                    mail.store(mail_id, '+FLAGS', '\\Seen')
+    # Usar get_gemini_response adecuadamente: (system_prompt, history, pregunta).
+    # Los emails no tienen historial, así que comparten el cache de respuestas con el chat
+    ai_response = await ia_services.get_gemini_response(
+        full_system_prompt, gemini_history, body, use_cache=True, canal="email"
+    )
+    return build_reply(msg, ai_response)
 
+
+async def process_emails(
+    imap: AsyncIMAPClient,
+    smtp_sessions: Sequence[SMTPSession],
+    generator=generate_reply,
+    session_factory=AsyncSessionLocal,
+    generate_concurrency: int = None,
+) -> int:
+    """
+    Un ciclo de ingesta como pipeline de tres etapas conectadas por colas acotadas:
+    1. traer los no leídos del IMAP en lotes (un UID FETCH por lote),
+    2. generar las respuestas con la IA (`generate_concurrency` tareas en paralelo,
+       cada una con su sesión de DB), registrando antes el Message-ID para no contestar
+       dos veces,
+    3. enviarlas (una tarea por sesión SMTP de `smtp_sessions`).
+    Al final marca como leídos, con un solo UID STORE, los contestados, los duplicados y los
+    que agotaron sus EMAIL_MAX_ATTEMPTS intentos.
+    Devuelve la cantidad de emails traídos.
+    """
+    start = time.perf_counter()
+    generate_concurrency = generate_concurrency or EMAIL_GENERATE_CONCURRENCY
+    a_generar: asyncio.Queue = asyncio.Queue(maxsize=EMAIL_QUEUE_SIZE)
+    a_enviar: asyncio.Queue = asyncio.Queue(maxsize=EMAIL_QUEUE_SIZE)
+    para_marcar: List[int] = []
+
+    def registrar(uid: int, recibido_en: Optional[float], resultado: str):
+        email_ingest_messages_total.inc(resultado=resultado)
+        if recibido_en is not None:
+            email_ingest_lag_seconds.observe(max(0.0, time.time() - recibido_en))
+
+    async def fallo(db_session, uid: int, recibido_en: Optional[float], message_id: str):
+        if await release_claim(db_session, message_id):
+            registrar(uid, recibido_en, "error")
+        else:
+            para_marcar.append(uid)
+            registrar(uid, recibido_en, "descartado")
+
+    async def generar():
+        async with session_factory() as db_session:
+            while (item := await a_generar.get()) is not None:
+                uid, recibido_en, msg = item
+                message_id = message_key(msg)
+                try:
+                    if not await claim_message(db_session, message_id, parseaddr(msg["from"])[1]):
+                        email_duplicates_total.inc()
+                        para_marcar.append(uid)
+                        registrar(uid, recibido_en, "duplicado")
+                        continue
+                    inicio = time.perf_counter()
+                    respuesta = await generator(db_session, msg)
+                    email_stage_seconds.observe(time.perf_counter() - inicio, etapa="generar")
+                except Exception as e:
+                    logger.error(f"Error al generar la respuesta del email UID {uid}: {e}")
+                    await fallo(db_session, uid, recibido_en, message_id)
+                    continue
+                await a_enviar.put((uid, recibido_en, message_id, respuesta))
+
+    async def enviar(smtp: SMTPSession):
+        async with session_factory() as db_session:
+            while (item := await a_enviar.get()) is not None:
+                uid, recibido_en, message_id, respuesta = item
+                inicio = time.perf_counter()
+                try:
+                    await send_reply(smtp, respuesta)
                 except Exception as e:
-                    logger.error(f"Error al procesar email ID {mail_id}: {e}")
+                    logger.error(f"Error al enviar la respuesta del email UID {uid}: {e}")
+                    await fallo(db_session, uid, recibido_en, message_id)
+                    continue
+                email_stage_seconds.observe(time.perf_counter() - inicio, etapa="enviar")
+                para_marcar.append(uid)
+                registrar(uid, recibido_en, "ok")
+
+    generadores = [asyncio.create_task(generar()) for _ in range(generate_concurrency)]
+    enviadores = [asyncio.create_task(enviar(smtp)) for smtp in smtp_sessions]
+    traidos = 0
+    try:
+        async for lote in fetch_unseen(imap):
+            for item in lote:
+                await a_generar.put(item)
+            traidos += len(lote)
+    finally:
+        # Fin de la ingesta: cada etapa termina cuando vacía su cola
+        for _ in generadores:
+            await a_generar.put(None)
+        await asyncio.gather(*generadores, return_exceptions=True)
+        for _ in enviadores:
+            await a_enviar.put(None)
+        await asyncio.gather(*enviadores, return_exceptions=True)
 
-        mail.logout()
+    # Marcar como leídos
+    await imap.uid_mark_seen(para_marcar)
+
+    duracion = time.perf_counter() - start
+    email_ingest_cycle_seconds.observe(duracion)
+    email_ingest_cycle_messages.observe(traidos)
+    email_ingest_throughput.set(traidos / duracion if duracion > 0 else 0.0)
+    if traidos:
+        logger.info(f"Se procesaron {traidos} emails en {duracion:.1f} s.")
+    else:
+        logger.info("No hay emails nuevos.")
+    return traidos
 
-    except Exception as e:
-        logger.error(f"Error en el ciclo principal del worker: {e}")
+
+async def wait_for_new_mail(imap: AsyncIMAPClient):
+    """Espera mensajes nuevos con IDLE (push) o, si el servidor no lo soporta, con un sleep."""
+    if "IDLE" in imap.capabilities:
+        llegaron = await imap.idle(IMAP_IDLE_TIMEOUT_SECONDS)
+        email_ingest_wakeups_total.inc(motivo="idle" if llegaron else "idle_timeout")
+    else:
+        await asyncio.sleep(EMAIL_POLL_SECONDS)
+        email_ingest_wakeups_total.inc(motivo="poll")
+
+
+async def connect_imap() -> AsyncIMAPClient:
+    imap = AsyncIMAPClient(IMAP_SERVER, IMAP_PORT, use_ssl=IMAP_SSL)
+    await imap.connect()
+    await imap.login(EMAIL_ACCOUNT, EMAIL_PASSWORD)
+    await imap.select("INBOX")
+    return imap
+
+
+# --- Como tarea programada de la app ---
+# Con EMAIL_RESPONDER_IN_APP=true no hace falta levantar este script: main.py registra una
+# tarea singleton del planificador (services/scheduler.py) que hace un ciclo cada
+# EMAIL_POLL_SECONDS. La conexión IMAP y las sesiones SMTP se mantienen entre ejecuciones;
+# ante un error de conexión se descartan y la próxima ejecución reconecta. A diferencia del
+# script, no usa IDLE: la tarea termina al final de cada ciclo.
+_imap: Optional[AsyncIMAPClient] = None
+_smtp_sessions: List[SMTPSession] = []
+
+
+async def ingest_job():
+    global _imap
+    if not _smtp_sessions:
+        _smtp_sessions.extend(SMTPSession() for _ in range(EMAIL_SEND_CONCURRENCY))
+    try:
+        if _imap is None:
+            _imap = await connect_imap()
+        await process_emails(_imap, _smtp_sessions)
+    except (IMAPError, OSError, asyncio.TimeoutError):
+        await close_connections()
+        raise
+
+
+async def close_connections():
+    """Cierra la conexión IMAP y las sesiones SMTP de la tarea programada (la llama el lifespan al apagar)."""
+    global _imap
+    imap, _imap = _imap, None
+    if imap is not None:
+        try:
+            await imap.logout()
+        except Exception as e:
+            logger.warning(f"Error al cerrar la conexión IMAP: {e}")
+    for smtp in _smtp_sessions:
+        await smtp.close()
 
 
 async def main():
     logger.info("Iniciando worker de emails... Presiona CTRL+C para detener.")
+    # Las sesiones SMTP viven mientras viva el worker: se reutilizan entre ciclos
+    smtp_sessions = [SMTPSession() for _ in range(EMAIL_SEND_CONCURRENCY)]
     while True:
+        imap = None
         try:
-            await process_emails()
-            logger.info("Esperando 2 minutos para el próximo chequeo...")
-            await asyncio.sleep(120)
-        except KeyboardInterrupt:
-            logger.info("Deteniendo el worker de emails.")
-            break
+            imap = await connect_imap()
+            while True:
+                await process_emails(imap, smtp_sessions)
+                await wait_for_new_mail(imap)
+        except (IMAPError, OSError, asyncio.TimeoutError) as e:
+            logger.error(f"Error de conexión con el servidor IMAP: {e}. Reintentando en {EMAIL_RECONNECT_SECONDS} s.")
+        except Exception as e:
+            logger.error(f"Error en el ciclo principal del worker: {e}")
+        finally:
+            if imap is not None:
+                await imap.logout()
+        await asyncio.sleep(EMAIL_RECONNECT_SECONDS)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        logger.info("Deteniendo el worker de emails.")
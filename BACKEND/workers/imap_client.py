@@ -0,0 +1,178 @@
+# En backend/workers/imap_client.py
+
+import re
+import ssl
+import asyncio
+import logging
+from typing import List, Optional, Sequence, Tuple
+
+# Cliente IMAP asíncrono mínimo (asyncio streams) con lo que necesita el worker de emails:
+# LOGIN, SELECT, UID SEARCH, UID FETCH por rangos, UID STORE e IDLE. `imaplib` es
+# bloqueante y no soporta IDLE, y no queremos sumar una dependencia por cinco comandos.
+
+logger = logging.getLogger(__name__)
+
+_LITERAL_RE = re.compile(rb"\{(\d+)\}\r\n$")
+_UID_RE = re.compile(rb"UID (\d+)")
+_INTERNALDATE_RE = re.compile(rb'INTERNALDATE "([^"]+)"')
+
+
+class IMAPError(Exception):
+    """El servidor respondió NO/BAD o cortó la conexión."""
+
+
+def compress_uids(uids: Sequence[int]) -> str:
+    """Arma un set de UIDs compacto para IMAP: [1, 2, 3, 7, 9, 10] -> "1:3,7,9:10"."""
+    partes = []
+    ordenados = sorted(set(uids))
+    i = 0
+    while i < len(ordenados):
+        j = i
+        while j + 1 < len(ordenados) and ordenados[j + 1] == ordenados[j] + 1:
+            j += 1
+        partes.append(str(ordenados[i]) if i == j else f"{ordenados[i]}:{ordenados[j]}")
+        i = j + 1
+    return ",".join(partes)
+
+
+class AsyncIMAPClient:
+    def __init__(self, host: str, port: int = 993, use_ssl: bool = True, timeout: float = 30):
+        self.host = host
+        self.port = port
+        self.use_ssl = use_ssl
+        self.timeout = timeout
+        self.capabilities: set = set()
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._tag = 0
+
+    # --- Conexión y lectura de respuestas ---
+
+    async def connect(self):
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port, ssl=ssl.create_default_context() if self.use_ssl else None),
+            timeout=self.timeout,
+        )
+        greeting = await self._readline()
+        if not greeting.startswith(b"* OK"):
+            raise IMAPError(f"Saludo inesperado del servidor IMAP: {greeting!r}")
+        _, untagged = await self.command("CAPABILITY")
+        for line, _ in untagged:
+            if line.upper().startswith(b"* CAPABILITY"):
+                self.capabilities = set(line.decode().upper().split()[2:])
+
+    async def _readline(self, timeout: Optional[float] = None) -> bytes:
+        line = await asyncio.wait_for(self._reader.readline(), timeout=timeout or self.timeout)
+        if not line:
+            raise IMAPError("El servidor IMAP cerró la conexión")
+        return line
+
+    async def _read_item(self, timeout: Optional[float] = None) -> Tuple[bytes, List[bytes]]:
+        """Lee una respuesta completa: la línea (sin los literales) y los literales {n} que traiga."""
+        line = await self._readline(timeout)
+        literals = []
+        while (match := _LITERAL_RE.search(line)):
+            literal = await asyncio.wait_for(self._reader.readexactly(int(match.group(1))), timeout=self.timeout)
+            literals.append(literal)
+            line = line[:match.start()] + b"{}" + await self._readline()
+        return line.rstrip(b"\r\n"), literals
+
+    async def _send(self, data: bytes):
+        self._writer.write(data)
+        await self._writer.drain()
+
+    async def command(self, *args: str) -> Tuple[bytes, List[Tuple[bytes, List[bytes]]]]:
+        """Manda un comando y devuelve (línea final, respuestas sin tag). Lanza IMAPError si no es OK."""
+        self._tag += 1
+        tag = f"A{self._tag:04d}".encode()
+        await self._send(tag + b" " + " ".join(args).encode() + b"\r\n")
+        untagged = []
+        while True:
+            line, literals = await self._read_item()
+            if line.startswith(tag + b" "):
+                status = line[len(tag) + 1:]
+                if not status.startswith(b"OK"):
+                    raise IMAPError(f"{args[0]} falló: {status.decode(errors='replace')}")
+                return status, untagged
+            untagged.append((line, literals))
+
+    # --- Comandos ---
+
+    async def login(self, user: str, password: str):
+        await self.command("LOGIN", _quote(user), _quote(password))
+
+    async def select(self, mailbox: str = "INBOX"):
+        await self.command("SELECT", _quote(mailbox))
+
+    async def uid_search(self, criteria: str = "UNSEEN") -> List[int]:
+        _, untagged = await self.command("UID", "SEARCH", criteria)
+        uids = []
+        for line, _ in untagged:
+            if line.upper().startswith(b"* SEARCH"):
+                uids.extend(int(uid) for uid in line.split()[2:])
+        return uids
+
+    async def uid_fetch(self, uids: Sequence[int]) -> List[Tuple[int, Optional[bytes], bytes]]:
+        """
+        Trae varios mensajes en un solo UID FETCH, sin marcarlos como leídos (BODY.PEEK).
+        Devuelve [(uid, INTERNALDATE crudo o None, mensaje RFC822)].
+        """
+        _, untagged = await self.command("UID", "FETCH", compress_uids(uids), "(UID INTERNALDATE BODY.PEEK[])")
+        mensajes = []
+        for line, literals in untagged:
+            uid = _UID_RE.search(line)
+            if b" FETCH " not in line or not uid or not literals:
+                continue
+            fecha = _INTERNALDATE_RE.search(line)
+            mensajes.append((int(uid.group(1)), fecha.group(1) if fecha else None, literals[0]))
+        return mensajes
+
+    async def uid_mark_seen(self, uids: Sequence[int]):
+        if uids:
+            await self.command("UID", "STORE", compress_uids(uids), "+FLAGS.SILENT", "(\\Seen)")
+
+    async def idle(self, timeout: float) -> bool:
+        """
+        Espera en IDLE hasta que el servidor avise de mensajes nuevos o pase `timeout`.
+        Devuelve True si llegó algo. Requiere la capability IDLE.
+        """
+        self._tag += 1
+        tag = f"A{self._tag:04d}".encode()
+        await self._send(tag + b" IDLE\r\n")
+        line = await self._readline()
+        if not line.startswith(b"+"):
+            raise IMAPError(f"El servidor rechazó IDLE: {line!r}")
+
+        hay_nuevos = False
+        deadline = asyncio.get_running_loop().time() + timeout
+        try:
+            while True:
+                restante = deadline - asyncio.get_running_loop().time()
+                if restante <= 0:
+                    break
+                line, _ = await self._read_item(restante)
+                if line.upper().endswith(b"EXISTS") or line.upper().endswith(b"RECENT"):
+                    hay_nuevos = True
+                    break
+        except asyncio.TimeoutError:
+            pass
+
+        await self._send(b"DONE\r\n")
+        while True:
+            line, _ = await self._read_item()
+            if line.startswith(tag + b" "):
+                return hay_nuevos
+
+    async def logout(self):
+        if self._writer is None:
+            return
+        try:
+            await self.command("LOGOUT")
+        except Exception:
+            pass  # Si la conexión ya estaba rota no hay nada que cerrar del lado del servidor
+        finally:
+            self._writer.close()
+
+
+def _quote(value: str) -> str:
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'